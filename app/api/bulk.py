@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.services.bulk_import import detect_format, import_file
+
+# Acima deste tamanho o corpo recebido vai para um arquivo temporário em disco
+LIMITE_MEMORIA_UPLOAD = 1024 * 1024
+
+
+async def run_bulk_import(request: Request, db: Session, entidade: str, formato: str = None):
+    """
+    Recebe o arquivo no corpo da requisição (CSV ou NDJSON) em blocos, sem
+    montá-lo inteiro na memória, e executa a importação fora do event loop.
+    Também aceita um formulário multipart/form-data com o arquivo no campo
+    "arquivo" (requer python-multipart).
+
+    Responde 200 com o resumo quando tudo foi gravado e 422 com o relatório
+    de erros por linha quando a importação foi desfeita.
+    """
+    content_type = request.headers.get("content-type") or ""
+    with tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_UPLOAD) as arquivo:
+        if content_type.startswith("multipart/form-data"):
+            # O Starlette já grava o upload num arquivo temporário
+            formulario = await request.form()
+            upload = formulario.get("arquivo")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Envie o arquivo no campo 'arquivo' do formulário"
+                )
+            if not formato and (upload.filename or "").lower().endswith((".ndjson", ".jsonl")):
+                formato = "ndjson"
+            content_type = upload.content_type
+            await run_in_threadpool(shutil.copyfileobj, upload.file, arquivo)
+            await formulario.close()
+        else:
+            async for bloco in request.stream():
+                arquivo.write(bloco)
+
+        try:
+            formato = detect_format(content_type, formato)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        arquivo.seek(0)
+        resultado = await run_in_threadpool(import_file, db, entidade, arquivo, formato)
+
+    print(f"Importação de {entidade}: {resultado.importados}/{resultado.total} registros, {resultado.total_erros} erro(s)")
+    codigo = status.HTTP_200_OK if resultado.sucesso else status.HTTP_422_UNPROCESSABLE_ENTITY
+    return JSONResponse(status_code=codigo, content=resultado.to_dict())
@@ -0,0 +1,250 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, List, Optional
+import traceback
+
+from app.api.endpoints.horarios import _raise_if_conflicts
+from app.api.endpoints.regras import _raise_if_invalid
+from app.api.pagination import keyset_page
+from app.api.response_cache import cached_item
+from app.models.database import get_async_db, get_async_read_db
+from app.models.disciplina import Disciplina
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.regra import Regra
+from app.models.turma import Turma
+from app.schemas.disciplina import DisciplinaCreate, DisciplinaResponse, DisciplinaUpdate
+from app.schemas.horario import HorarioCreate, HorarioResponse, HorarioUpdate
+from app.schemas.professor import ProfessorCreate, ProfessorResponse, ProfessorUpdate
+from app.schemas.regra import RegraCreate, RegraResponse, RegraUpdate
+from app.schemas.turma import TurmaCreate, TurmaResponse, TurmaUpdate
+from app.services.conflict_index import conflict_index
+from app.services.name_matcher import professor_name_index
+from app.services.solver.rules import rule_compiler
+
+# Versões assíncronas dos routers de CRUD, montadas em /api/async. As
+# escritas usam a AsyncSession diretamente; listagem e busca por id
+# reaproveitam a paginação e o cache de respostas dos routers síncronos
+# via run_sync, que roda o código síncrono sobre a conexão assíncrona.
+
+router = APIRouter()
+
+
+def _erro_500(acao: str, e: Exception) -> HTTPException:
+    print(f"Erro ao {acao}: {str(e)}")
+    print(f"Detalhes do erro: {traceback.format_exc()}")
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Erro ao {acao}: {str(e)}"
+    )
+
+
+def crud_router(model, create_schema, update_schema, response_schema, singular: str, plural: str,
+                mensagem_404: str, apos_escrita: Optional[Callable[[], None]] = None,
+                validar: Optional[Callable[[object], None]] = None,
+                somente_leitura: bool = False) -> APIRouter:
+    """
+    Monta um router assíncrono com listagem, busca, criação, atualização e
+    remoção para um modelo.
+
+    Args:
+        model: Modelo ORM
+        create_schema / update_schema / response_schema: Schemas Pydantic
+        singular / plural: Nomes usados nas mensagens de erro
+        mensagem_404: Detalhe da resposta quando o registro não existe
+        apos_escrita: Chamado depois de cada escrita confirmada
+            (ex: invalidar um índice em memória)
+        validar: Chamado com o registro antes de gravar uma criação ou
+            atualização; rejeita o registro levantando HTTPException
+        somente_leitura: Monta só a listagem e a busca por id
+    """
+    crud = APIRouter()
+
+    @crud.get("/", response_model=List[response_schema])
+    async def listar(request: Request, skip: int = 0, limit: int = 100,
+                     cursor: Optional[str] = None, rapido: bool = False,
+                     db: AsyncSession = Depends(get_async_read_db)):
+        try:
+            return await db.run_sync(
+                lambda sessao: keyset_page(request, sessao, model, response_schema, cursor, skip, limit, rapido=rapido)
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise _erro_500(f"buscar {plural}", e)
+
+    @crud.get("/{item_id}", response_model=response_schema)
+    async def buscar(request: Request, item_id: int, db: AsyncSession = Depends(get_async_read_db)):
+        try:
+            return await db.run_sync(
+                lambda sessao: cached_item(request, sessao, model, response_schema, item_id, mensagem_404)
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise _erro_500(f"buscar {singular}", e)
+
+    if somente_leitura:
+        return crud
+
+    @crud.post("/", response_model=response_schema, status_code=status.HTTP_201_CREATED)
+    async def criar(dados: create_schema, db: AsyncSession = Depends(get_async_db)):
+        try:
+            item = model(**dados.model_dump())
+            if validar:
+                validar(item)
+            db.add(item)
+            await db.commit()
+            await db.refresh(item)
+            if apos_escrita:
+                apos_escrita()
+            return item
+        except HTTPException:
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise _erro_500(f"criar {singular}", e)
+
+    @crud.put("/{item_id}", response_model=response_schema)
+    async def atualizar(item_id: int, dados: update_schema, db: AsyncSession = Depends(get_async_db)):
+        try:
+            item = await db.get(model, item_id)
+            if item is None:
+                raise HTTPException(status_code=404, detail=mensagem_404)
+
+            for key, value in dados.model_dump(exclude_unset=True).items():
+                setattr(item, key, value)
+            if validar:
+                validar(item)
+
+            await db.commit()
+            await db.refresh(item)
+            if apos_escrita:
+                apos_escrita()
+            return item
+        except HTTPException:
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise _erro_500(f"atualizar {singular}", e)
+
+    @crud.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
+    async def remover(item_id: int, db: AsyncSession = Depends(get_async_db)):
+        try:
+            item = await db.get(model, item_id)
+            if item is None:
+                raise HTTPException(status_code=404, detail=mensagem_404)
+
+            await db.delete(item)
+            await db.commit()
+            if apos_escrita:
+                apos_escrita()
+            return None
+        except HTTPException:
+            raise
+        except Exception as e:
+            await db.rollback()
+            raise _erro_500(f"excluir {singular}", e)
+
+    return crud
+
+
+router.include_router(
+    crud_router(Professor, ProfessorCreate, ProfessorUpdate, ProfessorResponse, "professor", "professores",
+                "Professor não encontrado", apos_escrita=professor_name_index.invalidate),
+    prefix="/professores", tags=["professores (async)"]
+)
+router.include_router(
+    crud_router(Disciplina, DisciplinaCreate, DisciplinaUpdate, DisciplinaResponse, "disciplina", "disciplinas",
+                "Disciplina não encontrada"),
+    prefix="/disciplinas", tags=["disciplinas (async)"]
+)
+router.include_router(
+    crud_router(Turma, TurmaCreate, TurmaUpdate, TurmaResponse, "turma", "turmas", "Turma não encontrada"),
+    prefix="/turmas", tags=["turmas (async)"]
+)
+router.include_router(
+    crud_router(Regra, RegraCreate, RegraUpdate, RegraResponse, "regra", "regras", "Regra não encontrada",
+                apos_escrita=rule_compiler.invalidate,
+                validar=lambda regra: _raise_if_invalid(regra.tipo, regra.condicoes)),
+    prefix="/regras", tags=["regras (async)"]
+)
+
+# Horários: leituras pelo router genérico; escritas verificam choques no
+# índice de conflitos. A exclusão entre escritas é a trava da versão de
+# horarios no banco (conflict_index.begin_write), que vale para todos os
+# workers; o RLock do índice só protege a memória e nunca fica retido
+# durante uma consulta, que no run_sync devolve o controle ao event loop
+horarios = crud_router(Horario, HorarioCreate, HorarioUpdate, HorarioResponse, "horário", "horários",
+                       "Horário não encontrado", somente_leitura=True)
+
+
+def _gravar_horario(sessao, dados, horario_id: Optional[int] = None) -> Horario:
+    """Verifica choques e grava (cria ou atualiza) o horário, com a versão de horarios travada."""
+    conflict_index.begin_write(sessao)
+    if horario_id is None:
+        db_horario = Horario(**dados)
+        _raise_if_conflicts(conflict_index.check(sessao, dados))
+        sessao.add(db_horario)
+    else:
+        db_horario = sessao.get(Horario, horario_id)
+        if db_horario is None:
+            raise HTTPException(status_code=404, detail="Horário não encontrado")
+        completos = {c: getattr(db_horario, c) for c in HorarioCreate.model_fields}
+        completos.update(dados)
+        _raise_if_conflicts(conflict_index.check(sessao, completos, ignorar_id=horario_id))
+        for key, value in dados.items():
+            setattr(db_horario, key, value)
+    conflict_index.commit_write(sessao, horario=db_horario)
+    return db_horario
+
+
+def _remover_horario(sessao, horario_id: int):
+    conflict_index.begin_write(sessao)
+    db_horario = sessao.get(Horario, horario_id)
+    if db_horario is None:
+        raise HTTPException(status_code=404, detail="Horário não encontrado")
+    sessao.delete(db_horario)
+    conflict_index.commit_write(sessao, removido_id=horario_id)
+
+
+@horarios.post("/", response_model=HorarioResponse, status_code=status.HTTP_201_CREATED)
+async def create_horario(horario: HorarioCreate, db: AsyncSession = Depends(get_async_db)):
+    """Cria um novo horário."""
+    try:
+        dados = horario.model_dump()
+        return await db.run_sync(_gravar_horario, dados)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise _erro_500("criar horário", e)
+
+
+@horarios.put("/{horario_id}", response_model=HorarioResponse)
+async def update_horario(horario_id: int, horario: HorarioUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Atualiza um horário existente."""
+    try:
+        alteracoes = horario.model_dump(exclude_unset=True)
+        return await db.run_sync(_gravar_horario, alteracoes, horario_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise _erro_500("atualizar horário", e)
+
+
+@horarios.delete("/{horario_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_horario(horario_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Remove um horário."""
+    try:
+        await db.run_sync(_remover_horario, horario_id)
+        return None
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise _erro_500("excluir horário", e)
+
+
+router.include_router(horarios, prefix="/horarios", tags=["horarios (async)"])
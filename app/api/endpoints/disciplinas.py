@@ -1,20 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import traceback
 
-from app.models.database import get_db
+from app.api.bulk import run_bulk_import
+from app.api.pagination import keyset_page
+from app.api.response_cache import cached_item
+from app.models.database import get_db, get_read_db
 from app.models.disciplina import Disciplina
 from app.schemas.disciplina import DisciplinaCreate, DisciplinaResponse, DisciplinaUpdate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DisciplinaResponse])
-def read_disciplinas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_disciplinas(request: Request, skip: int = 0, limit: int = 100,
+                     cursor: Optional[str] = None, rapido: bool = False,
+                     db: Session = Depends(get_read_db)):
     """Recupera a lista de disciplinas."""
     try:
-        disciplinas = db.query(Disciplina).offset(skip).limit(limit).all()
-        return disciplinas
+        return keyset_page(request, db, Disciplina, DisciplinaResponse, cursor, skip, limit, rapido=rapido)
+    except HTTPException:
+        raise
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Erro ao buscar disciplinas: {str(e)}")
@@ -45,14 +51,21 @@ def create_disciplina(disciplina: DisciplinaCreate, db: Session = Depends(get_db
             detail=f"Erro ao criar disciplina: {str(e)}"
         )
 
+@router.post("/import")
+async def import_disciplinas(request: Request, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Importa disciplinas em massa a partir de um arquivo CSV ou NDJSON enviado no
+    corpo da requisição (Content-Type text/csv ou application/x-ndjson, ou o
+    parâmetro formato). Tudo ou nada: com qualquer linha inválida nada é
+    gravado e a resposta traz os erros por linha.
+    """
+    return await run_bulk_import(request, db, "disciplinas", formato)
+
 @router.get("/{disciplina_id}", response_model=DisciplinaResponse)
-def read_disciplina(disciplina_id: int, db: Session = Depends(get_db)):
+def read_disciplina(request: Request, disciplina_id: int, db: Session = Depends(get_read_db)):
     """Recupera informações de uma disciplina específica."""
     try:
-        disciplina = db.query(Disciplina).filter(Disciplina.id == disciplina_id).first()
-        if disciplina is None:
-            raise HTTPException(status_code=404, detail="Disciplina não encontrada")
-        return disciplina
+        return cached_item(request, db, Disciplina, DisciplinaResponse, disciplina_id, "Disciplina não encontrada")
     except HTTPException:
         raise
     except Exception as e:
@@ -3,40 +3,86 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends, HTTPException, status, Body 
-from typing import Dict, Any
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
+import asyncio
+import json
+import time
 import traceback
 
-from ...models.database import get_db
-from ...services.grade_service import grade_service
+from ...models.database import get_db, get_read_db, SessionLocal
+from ...services.grade_service import ScheduleValidationError, grade_service
+from ...services.timetable_view import weekly_view
+from ...services.weekly_grids import weekly_grids
+from ...services.jobs import job_queue, QueueFullError, FINALIZADOS
 
 # Modelos Pydantic
 class RefineRequest(BaseModel):
     feedback: str
 
+class GenerateRequest(BaseModel):
+    dias: Optional[List[str]] = None
+    horarios: Optional[List[str]] = None
+    salas: Optional[List[str]] = None
+    # Divide carga_horaria para obter as aulas semanais (padrão 1: a carga
+    # já é semanal); use as semanas do período quando ela for a carga total
+    semanas_letivas: Optional[int] = Field(None, ge=1)
+    seed: Optional[int] = None
+    max_iteracoes: Optional[int] = None
+    iteracoes_melhoria: Optional[int] = None
+    tempo_limite: Optional[float] = None
+    # Otimização paralela: tentativas com seeds diferentes num pool de processos
+    tentativas: Optional[int] = Field(None, ge=1, le=256)
+    workers: Optional[int] = Field(None, ge=1, le=64)
+
+class ScoreRequest(BaseModel):
+    # Entradas no formato de /grade/save; sem elas, pontua a grade salva
+    entries: Optional[List[Dict[str, Any]]] = None
+    dias: Optional[List[str]] = None
+    horarios: Optional[List[str]] = None
+    semanas_letivas: Optional[int] = None
+
 router = APIRouter()
 
-@router.post("/generate", response_model=Dict[str, Any])
-def generate_schedule(db: Session = Depends(get_db)):
-    """Gera uma grade escolar otimizada."""
+@router.post("/generate", response_model=Dict[str, Any], deprecated=True)
+def generate_schedule(
+    params: Optional[GenerateRequest] = Body(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Gera uma grade escolar otimizada.
+
+    Legado: ocupa um worker da API até o motor terminar. Prefira
+    POST /grade/jobs/generate, que enfileira a geração e responde 202.
+    """
     try:
-        result = grade_service.generate_initial_schedule(db)
+        result = grade_service.generate_initial_schedule(
+            db, params.model_dump(exclude_none=True) if params else None
+        )
         if "error" in result:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=result["message"]
             )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erro ao gerar grade: {str(e)}")
 
-@router.post("/refine", response_model=Dict[str, Any])
+@router.post("/refine", response_model=Dict[str, Any], deprecated=True)
 def refine_schedule(
     feedback: str = Body(...),
     db: Session = Depends(get_db)
 ):
-    """Refina uma grade escolar existente com base no feedback."""
+    """
+    Refina uma grade escolar existente com base no feedback.
+
+    Legado: ocupa um worker da API durante a chamada ao LLM e o reparo.
+    Prefira POST /grade/jobs/refine, que enfileira o refinamento.
+    """
     try:
         print(f"Recebendo feedback para refinamento: {feedback}")
         result = grade_service.refine_schedule_with_feedback(feedback, db)
@@ -46,6 +92,8 @@ def refine_schedule(
                 detail=result["message"]
             )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Falha ao refinar a grade: {str(e)}")
@@ -57,7 +105,7 @@ def save_schedule(
 ):
     """Salva uma grade otimizada no banco de dados."""
     try:
-        print(f"Tentando salvar grade com dados: {schedule_data}")
+        print(f"Tentando salvar grade com {len(schedule_data.get('entries', []))} entradas")
         success, message = grade_service.save_schedule_to_database(db, schedule_data)
         
         if not success:
@@ -67,6 +115,13 @@ def save_schedule(
                 detail=f"Falha ao salvar a grade no banco de dados: {message}"
             )
         return {"message": message}
+    except ScheduleValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"mensagem": e.mensagem, "erros": e.erros}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Erro ao salvar grade: {str(e)}")
@@ -76,16 +131,198 @@ def save_schedule(
             detail=f"Falha ao salvar a grade no banco de dados: {str(e)}"
         )
 
+@router.post("/score", response_model=Dict[str, Any])
+def score_schedule(
+    params: Optional[ScoreRequest] = Body(None),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Pontua uma grade (gerada, refinada ou a salva no banco) para comparar
+    execuções: restrições rígidas violadas e custos flexíveis por componente.
+    """
+    try:
+        dados = params.model_dump(exclude_none=True) if params else {}
+        entries = dados.pop("entries", None)
+        return grade_service.score_schedule(db, entries=entries, params=dados)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Parâmetros inválidos: {str(e)}")
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao pontuar grade: {str(e)}"
+        )
+
+@router.get("/view", response_model=Dict[str, Any])
+def read_timetable_view(
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    sala: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Grade semanal de uma turma, de um professor ou de uma sala, com os dados
+    de professor, turma e disciplina de cada aula já incluídos. As grades de
+    professor e de turma vêm materializadas (uma busca pela chave); a de
+    sala é montada numa única consulta.
+    """
+    if sum(f is not None for f in (turma_id, professor_id, sala)) != 1:
+        raise HTTPException(status_code=400, detail="Informe apenas um entre turma_id, professor_id ou sala")
+    try:
+        if professor_id is not None:
+            resultado = weekly_grids.get(db, "professor", professor_id)
+        elif turma_id is not None:
+            resultado = weekly_grids.get(db, "turma", turma_id)
+        else:
+            resultado = weekly_view(db, sala=sala)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao montar a grade semanal: {str(e)}"
+        )
+    if resultado is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Professor não encontrado" if professor_id is not None else "Turma não encontrada"
+        )
+    return resultado
+
+@router.get("/llm-cache", response_model=Dict[str, Any])
+def read_llm_cache_stats():
+    """Retorna os contadores de acerto e falha do cache de respostas do LLM."""
+    from ...services.ai_service import ai_service
+    return ai_service.cache.stats()
+
 @router.post("/index-rules", response_model=Dict[str, Any])
 def index_rules():
     """Indexa todas as regras para RAG."""
     try:
         from ...services.rag_service import rag_service
-        rag_service.index_rules()
-        return {"message": "Regras indexadas com sucesso!"}
+        resultado = rag_service.index_rules()
+        if not resultado.get("success"):
+            return resultado
+        return {**resultado, "message": "Regras indexadas com sucesso!", "detalhes": resultado["message"]}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao indexar regras: {str(e)}"
         )
+
+def _submit_job(tipo: str, func):
+    """Enfileira um job e responde imediatamente com o id."""
+    try:
+        job = job_queue.submit(tipo, func)
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    return {"job_id": job.id, "status": job.status}
+
+def _generate_job(params: Optional[GenerateRequest]):
+    dados = params.model_dump(exclude_none=True) if params else None
+    
+    def executar(contexto):
+        db = SessionLocal()
+        try:
+            return grade_service.generate_initial_schedule(
+                db, dados, deve_parar=contexto.deve_parar, progresso=contexto.reportar
+            )
+        finally:
+            db.close()
+    
+    return executar
+
+def _sse(evento: str, dados: Dict[str, Any]) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, default=str)}\n\n"
+
+async def _stream_job_events(job_id: str):
+    """Emite eventos SSE de progresso até o job terminar."""
+    ultimo_progresso = None
+    ultimo_status = None
+    ultimo_envio = time.monotonic()
+    while True:
+        job = job_queue.get(job_id)
+        if job is None:
+            yield _sse("erro", {"detail": "Job não encontrado"})
+            return
+        if job.status != ultimo_status:
+            ultimo_status = job.status
+            ultimo_envio = time.monotonic()
+            yield _sse("status", {"job_id": job.id, "status": job.status})
+        if job.progresso is not None and job.progresso != ultimo_progresso:
+            ultimo_progresso = job.progresso
+            ultimo_envio = time.monotonic()
+            yield _sse("progresso", ultimo_progresso)
+        if job.status in FINALIZADOS:
+            yield _sse("fim", job.to_dict())
+            return
+        if time.monotonic() - ultimo_envio > 15:
+            # Comentário SSE para manter a conexão aberta em proxies
+            ultimo_envio = time.monotonic()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(0.5)
+
+def _event_stream(job_id: str) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate/stream")
+def generate_schedule_stream(params: Optional[GenerateRequest] = Body(None)):
+    """
+    Inicia a geração em segundo plano e transmite o progresso via
+    Server-Sent Events (melhor custo, violações rígidas restantes,
+    iterações por segundo e tempo decorrido). O evento "fim" traz a grade.
+    """
+    job = _submit_job("generate", _generate_job(params))
+    return _event_stream(job["job_id"])
+
+@router.post("/jobs/generate", response_model=Dict[str, Any], status_code=status.HTTP_202_ACCEPTED)
+def submit_generate_job(params: Optional[GenerateRequest] = Body(None)):
+    """Enfileira a geração de uma grade e retorna o id do job."""
+    return _submit_job("generate", _generate_job(params))
+
+@router.post("/jobs/refine", response_model=Dict[str, Any], status_code=status.HTTP_202_ACCEPTED)
+def submit_refine_job(feedback: str = Body(...)):
+    """Enfileira o refinamento da grade com base no feedback e retorna o id do job."""
+    def executar(contexto):
+        db = SessionLocal()
+        try:
+            return grade_service.refine_schedule_with_feedback(feedback, db)
+        finally:
+            db.close()
+    
+    return _submit_job("refine", executar)
+
+@router.get("/jobs/{job_id}", response_model=Dict[str, Any])
+def read_job(job_id: str):
+    """Consulta o status e o resultado de um job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
+
+@router.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str):
+    """Transmite o progresso de um job via Server-Sent Events."""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return _event_stream(job_id)
+
+@router.post("/jobs/{job_id}/accept", response_model=Dict[str, Any])
+def accept_job(job_id: str):
+    """Encerra a geração agora e fica com a melhor grade obtida até o momento."""
+    job = job_queue.accept(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}", response_model=Dict[str, Any])
+def cancel_job(job_id: str):
+    """Cancela um job pendente ou interrompe um job em execução."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.to_dict()
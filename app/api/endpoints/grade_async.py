@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional
+import traceback
+
+from app.api.endpoints.grade import GenerateRequest
+from app.models.database import get_async_db, get_async_read_db
+from app.services.grade_service import ScheduleValidationError, grade_service
+
+# Versões assíncronas de /grade/generate, /grade/refine e /grade/save. O
+# motor e as chamadas ao LLM rodam numa thread sem segurar conexão do pool;
+# o acesso ao banco usa a AsyncSession.
+
+router = APIRouter()
+
+@router.post("/generate", response_model=Dict[str, Any])
+async def generate_schedule(
+    params: Optional[GenerateRequest] = Body(None),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Gera uma grade escolar otimizada."""
+    try:
+        result = await grade_service.generate_initial_schedule_async(
+            db, params.model_dump(exclude_none=True) if params else None
+        )
+        if "error" in result:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=result["message"]
+            )
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar grade: {str(e)}")
+
+@router.post("/refine", response_model=Dict[str, Any])
+async def refine_schedule(
+    feedback: str = Body(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Refina uma grade escolar existente com base no feedback."""
+    try:
+        print(f"Recebendo feedback para refinamento: {feedback}")
+        result = await grade_service.refine_schedule_with_feedback_async(feedback, db)
+        if "error" in result:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=result["message"]
+            )
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Falha ao refinar a grade: {str(e)}")
+
+@router.post("/save", response_model=Dict[str, Any])
+async def save_schedule(
+    schedule_data: Dict[str, Any],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Salva uma grade otimizada no banco de dados."""
+    try:
+        print(f"Tentando salvar grade com {len(schedule_data.get('entries', []))} entradas")
+        success, message = await grade_service.save_schedule_to_database_async(db, schedule_data)
+        
+        if not success:
+            print(f"Falha ao salvar grade: {message}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Falha ao salvar a grade no banco de dados: {message}"
+            )
+        return {"message": message}
+    except ScheduleValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"mensagem": e.mensagem, "erros": e.erros}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_details = traceback.format_exc()
+        print(f"Erro ao salvar grade: {str(e)}")
+        print(f"Detalhes do erro: {error_details}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Falha ao salvar a grade no banco de dados: {str(e)}"
+        )
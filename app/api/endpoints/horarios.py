@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 import traceback
 
-from app.models.database import get_db
+from app.api.pagination import keyset_page
+from app.api.response_cache import cached_item
+from app.models.database import get_db, get_read_db
 from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
 from app.schemas.horario import HorarioCreate, HorarioResponse, HorarioUpdate
+from app.services.conflict_index import conflict_index, find_all_conflicts
+from app.services.export_service import iter_horarios, stream_csv, stream_ics, stream_ndjson
 
 router = APIRouter()
 
+def _raise_if_conflicts(conflitos):
+    """Interrompe a escrita se o horário chocar com outro já cadastrado."""
+    if conflitos:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Horário em conflito com aulas já cadastradas", "conflitos": conflitos}
+        )
+
 @router.get("/", response_model=List[HorarioResponse])
-def read_horarios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_horarios(request: Request, skip: int = 0, limit: int = 100,
+                  cursor: Optional[str] = None, rapido: bool = False,
+                  db: Session = Depends(get_read_db)):
     """Recupera a lista de horários."""
     try:
-        horarios = db.query(Horario).offset(skip).limit(limit).all()
-        return horarios
+        return keyset_page(request, db, Horario, HorarioResponse, cursor, skip, limit, rapido=rapido)
+    except HTTPException:
+        raise
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Erro ao buscar horários: {str(e)}")
@@ -24,17 +43,84 @@ def read_horarios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
             detail=f"Erro ao buscar horários: {str(e)}"
         )
 
+@router.get("/conflicts")
+def read_conflicts(db: Session = Depends(get_db)):
+    """Lista todos os choques de professor, turma ou sala da grade atual."""
+    try:
+        rows = db.query(
+            Horario.id, Horario.dia_semana, Horario.hora_inicio, Horario.hora_fim,
+            Horario.sala, Horario.professor_id, Horario.turma_id
+        ).all()
+        conflitos = find_all_conflicts(row._asdict() for row in rows)
+        return {"total": len(conflitos), "conflitos": conflitos}
+    except Exception as e:
+        error_details = traceback.format_exc()
+        print(f"Erro ao buscar conflitos: {str(e)}")
+        print(f"Detalhes do erro: {error_details}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar conflitos: {str(e)}"
+        )
+
+@router.get("/export")
+def export_horarios(formato: str = "ndjson", professor_id: Optional[int] = None, turma_id: Optional[int] = None):
+    """
+    Exporta a grade completa (com nomes de professor, turma e disciplina) em
+    streaming, como NDJSON ou CSV, opcionalmente filtrada por professor ou
+    turma.
+    """
+    formato = formato.lower()
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Formato deve ser 'ndjson' ou 'csv'")
+    linhas = iter_horarios(professor_id=professor_id, turma_id=turma_id)
+    if formato == "csv":
+        return StreamingResponse(
+            stream_csv(linhas),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="horarios.csv"'}
+        )
+    return StreamingResponse(stream_ndjson(linhas), media_type="application/x-ndjson")
+
+@router.get("/export/ics")
+def export_horarios_ics(professor_id: Optional[int] = None, turma_id: Optional[int] = None,
+                        inicio: Optional[date] = None, ate: Optional[date] = None,
+                        db: Session = Depends(get_read_db)):
+    """
+    Exporta em iCalendar (.ics) as aulas de um professor ou de uma turma,
+    como eventos semanais recorrentes a partir de `inicio` até `ate`.
+    """
+    if (professor_id is None) == (turma_id is None):
+        raise HTTPException(status_code=400, detail="Informe professor_id ou turma_id")
+    if professor_id is not None:
+        professor = db.query(Professor.nome).filter(Professor.id == professor_id).first()
+        if professor is None:
+            raise HTTPException(status_code=404, detail="Professor não encontrado")
+        nome, arquivo = f"Aulas - {professor.nome}", f"professor-{professor_id}.ics"
+    else:
+        turma = db.query(Turma.codigo).filter(Turma.id == turma_id).first()
+        if turma is None:
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
+        nome, arquivo = f"Aulas - Turma {turma.codigo}", f"turma-{turma_id}.ics"
+    linhas = iter_horarios(professor_id=professor_id, turma_id=turma_id)
+    return StreamingResponse(
+        stream_ics(linhas, nome, inicio=inicio, ate=ate),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{arquivo}"'}
+    )
+
 @router.post("/", response_model=HorarioResponse, status_code=status.HTTP_201_CREATED)
 def create_horario(horario: HorarioCreate, db: Session = Depends(get_db)):
     """Cria um novo horário."""
     try:
         print(f"Tentando criar horário: {horario}")
+        _raise_if_conflicts(conflict_index.check(db, horario.dict()))
         db_horario = Horario(**horario.dict())
         db.add(db_horario)
-        db.commit()
-        db.refresh(db_horario)
+        conflict_index.commit_write(db, horario=db_horario)
         print(f"Horário criado com sucesso: {db_horario}")
         return db_horario
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         error_details = traceback.format_exc()
@@ -46,13 +132,10 @@ def create_horario(horario: HorarioCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/{horario_id}", response_model=HorarioResponse)
-def read_horario(horario_id: int, db: Session = Depends(get_db)):
+def read_horario(request: Request, horario_id: int, db: Session = Depends(get_read_db)):
     """Recupera informações de um horário específico."""
     try:
-        horario = db.query(Horario).filter(Horario.id == horario_id).first()
-        if horario is None:
-            raise HTTPException(status_code=404, detail="Horário não encontrado")
-        return horario
+        return cached_item(request, db, Horario, HorarioResponse, horario_id, "Horário não encontrado")
     except HTTPException:
         raise
     except Exception as e:
@@ -68,15 +151,20 @@ def read_horario(horario_id: int, db: Session = Depends(get_db)):
 def update_horario(horario_id: int, horario: HorarioUpdate, db: Session = Depends(get_db)):
     """Atualiza um horário existente."""
     try:
+        # Trava antes de ler: o horário não muda entre a leitura e a gravação
+        conflict_index.begin_write(db)
         db_horario = db.query(Horario).filter(Horario.id == horario_id).first()
         if db_horario is None:
             raise HTTPException(status_code=404, detail="Horário não encontrado")
         
+        dados = {c: getattr(db_horario, c) for c in HorarioCreate.model_fields}
+        dados.update(horario.dict(exclude_unset=True))
+        _raise_if_conflicts(conflict_index.check(db, dados, ignorar_id=horario_id))
+        
         for key, value in horario.dict(exclude_unset=True).items():
             setattr(db_horario, key, value)
         
-        db.commit()
-        db.refresh(db_horario)
+        conflict_index.commit_write(db, horario=db_horario)
         return db_horario
     except HTTPException:
         raise
@@ -94,12 +182,13 @@ def update_horario(horario_id: int, horario: HorarioUpdate, db: Session = Depend
 def delete_horario(horario_id: int, db: Session = Depends(get_db)):
     """Remove um horário."""
     try:
+        conflict_index.begin_write(db)
         horario = db.query(Horario).filter(Horario.id == horario_id).first()
         if horario is None:
             raise HTTPException(status_code=404, detail="Horário não encontrado")
         
         db.delete(horario)
-        db.commit()
+        conflict_index.commit_write(db, removido_id=horario_id)
         return None
     except HTTPException:
         raise
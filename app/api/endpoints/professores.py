@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import traceback
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.models.database import get_db
+from app.api.bulk import run_bulk_import
+from app.api.pagination import keyset_page
+from app.api.response_cache import cached_item
+from app.models.database import get_db, get_read_db
 from app.models.professor import Professor
 from app.schemas.professor import ProfessorCreate, ProfessorResponse, ProfessorUpdate
+from app.services.name_matcher import professor_name_index
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ProfessorResponse])
-def read_professores(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_professores(request: Request, skip: int = 0, limit: int = 100,
+                     cursor: Optional[str] = None, rapido: bool = False,
+                     db: Session = Depends(get_read_db)):
     """Recupera a lista de professores."""
-    professores = db.query(Professor).offset(skip).limit(limit).all()
-    return professores
+    return keyset_page(request, db, Professor, ProfessorResponse, cursor, skip, limit, rapido=rapido)
 
 @router.post("/", response_model=ProfessorResponse, status_code=status.HTTP_201_CREATED)
 def create_professor(professor: ProfessorCreate, db: Session = Depends(get_db)):
@@ -23,6 +30,7 @@ def create_professor(professor: ProfessorCreate, db: Session = Depends(get_db)):
         db.add(db_professor)
         db.commit()
         db.refresh(db_professor)
+        professor_name_index.invalidate()
         print(f"Professor criado com sucesso: {db_professor}")
         return db_professor
     except Exception as e:
@@ -36,13 +44,22 @@ def create_professor(professor: ProfessorCreate, db: Session = Depends(get_db)):
             detail=f"Erro ao criar professor: {str(e)}"
         )
 
+@router.post("/import")
+async def import_professores(request: Request, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Importa professores em massa a partir de um arquivo CSV ou NDJSON enviado no
+    corpo da requisição (Content-Type text/csv ou application/x-ndjson, ou o
+    parâmetro formato). Tudo ou nada: com qualquer linha inválida nada é
+    gravado e a resposta traz os erros por linha.
+    """
+    resposta = await run_bulk_import(request, db, "professores", formato)
+    professor_name_index.invalidate()
+    return resposta
+
 @router.get("/{professor_id}", response_model=ProfessorResponse)
-def read_professor(professor_id: int, db: Session = Depends(get_db)):
+def read_professor(request: Request, professor_id: int, db: Session = Depends(get_read_db)):
     """Recupera informações de um professor específico."""
-    professor = db.query(Professor).filter(Professor.id == professor_id).first()
-    if professor is None:
-        raise HTTPException(status_code=404, detail="Professor não encontrado")
-    return professor
+    return cached_item(request, db, Professor, ProfessorResponse, professor_id, "Professor não encontrado")
 
 @router.put("/{professor_id}", response_model=ProfessorResponse)
 def update_professor(professor_id: int, professor: ProfessorUpdate, db: Session = Depends(get_db)):
@@ -56,6 +73,7 @@ def update_professor(professor_id: int, professor: ProfessorUpdate, db: Session
     
     db.commit()
     db.refresh(db_professor)
+    professor_name_index.invalidate()
     return db_professor
 
 @router.delete("/{professor_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -67,4 +85,5 @@ def delete_professor(professor_id: int, db: Session = Depends(get_db)):
     
     db.delete(professor)
     db.commit()
+    professor_name_index.invalidate()
     return None
\ No newline at end of file
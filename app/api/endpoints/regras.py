@@ -1,20 +1,36 @@
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from typing import List, Optional
 import traceback
 
-from app.models.database import get_db
+from app.api.bulk import run_bulk_import
+from app.api.pagination import keyset_page
+from app.api.response_cache import cached_item
+from app.models.database import get_db, get_read_db
 from app.models.regra import Regra
 from app.schemas.regra import RegraCreate, RegraResponse, RegraUpdate
+from app.services.solver.rules import rule_compiler, validate_rule
 
 router = APIRouter()
 
+def _raise_if_invalid(tipo: Optional[str], condicoes):
+    """Rejeita (422) regras cujas condições o motor não consegue interpretar."""
+    erros = validate_rule(tipo, condicoes)
+    if erros:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"mensagem": "Condições da regra inválidas", "erros": erros}
+        )
+
 @router.get("/", response_model=List[RegraResponse])
-def read_regras(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_regras(request: Request, skip: int = 0, limit: int = 100,
+                cursor: Optional[str] = None, rapido: bool = False,
+                db: Session = Depends(get_read_db)):
     """Recupera a lista de regras."""
     try:
-        regras = db.query(Regra).offset(skip).limit(limit).all()
-        return regras
+        return keyset_page(request, db, Regra, RegraResponse, cursor, skip, limit, rapido=rapido)
+    except HTTPException:
+        raise
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Erro ao buscar regras: {str(e)}")
@@ -29,12 +45,15 @@ def create_regra(regra: RegraCreate, db: Session = Depends(get_db)):
     """Cria uma nova regra."""
     try:
         print(f"Tentando criar regra: {regra}")
+        _raise_if_invalid(regra.tipo, regra.condicoes)
         db_regra = Regra(**regra.dict())
         db.add(db_regra)
         db.commit()
         db.refresh(db_regra)
         print(f"Regra criada com sucesso: {db_regra}")
         return db_regra
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         error_details = traceback.format_exc()
@@ -45,14 +64,21 @@ def create_regra(regra: RegraCreate, db: Session = Depends(get_db)):
             detail=f"Erro ao criar regra: {str(e)}"
         )
 
+@router.post("/import")
+async def import_regras(request: Request, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Importa regras em massa a partir de um arquivo CSV ou NDJSON enviado no
+    corpo da requisição (Content-Type text/csv ou application/x-ndjson, ou o
+    parâmetro formato). Tudo ou nada: com qualquer linha inválida nada é
+    gravado e a resposta traz os erros por linha.
+    """
+    return await run_bulk_import(request, db, "regras", formato)
+
 @router.get("/{regra_id}", response_model=RegraResponse)
-def read_regra(regra_id: int, db: Session = Depends(get_db)):
+def read_regra(request: Request, regra_id: int, db: Session = Depends(get_read_db)):
     """Recupera informações de uma regra específica."""
     try:
-        regra = db.query(Regra).filter(Regra.id == regra_id).first()
-        if regra is None:
-            raise HTTPException(status_code=404, detail="Regra não encontrada")
-        return regra
+        return cached_item(request, db, Regra, RegraResponse, regra_id, "Regra não encontrada")
     except HTTPException:
         raise
     except Exception as e:
@@ -71,11 +97,14 @@ def update_regra(regra_id: int, regra: RegraUpdate, db: Session = Depends(get_db
     if db_regra is None:
         raise HTTPException(status_code=404, detail="Regra não encontrada")
     
-    for key, value in regra.dict(exclude_unset=True).items():
+    alteracoes = regra.dict(exclude_unset=True)
+    _raise_if_invalid(alteracoes.get("tipo", db_regra.tipo), alteracoes.get("condicoes", db_regra.condicoes))
+    for key, value in alteracoes.items():
         setattr(db_regra, key, value)
     
     db.commit()
     db.refresh(db_regra)
+    rule_compiler.invalidate(regra_id)
     return db_regra
 
 @router.delete("/{regra_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -87,4 +116,5 @@ def delete_regra(regra_id: int, db: Session = Depends(get_db)):
     
     db.delete(regra)
     db.commit()
+    rule_compiler.invalidate(regra_id)
     return None
\ No newline at end of file
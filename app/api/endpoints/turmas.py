@@ -1,20 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import traceback
 
-from app.models.database import get_db
+from app.api.bulk import run_bulk_import
+from app.api.pagination import keyset_page
+from app.api.response_cache import cached_item
+from app.models.database import get_db, get_read_db
 from app.models.turma import Turma
 from app.schemas.turma import TurmaCreate, TurmaResponse, TurmaUpdate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[TurmaResponse])
-def read_turmas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_turmas(request: Request, skip: int = 0, limit: int = 100,
+                cursor: Optional[str] = None, rapido: bool = False,
+                db: Session = Depends(get_read_db)):
     """Recupera a lista de turmas."""
     try:
-        turmas = db.query(Turma).offset(skip).limit(limit).all()
-        return turmas
+        return keyset_page(request, db, Turma, TurmaResponse, cursor, skip, limit, rapido=rapido)
+    except HTTPException:
+        raise
     except Exception as e:
         error_details = traceback.format_exc()
         print(f"Erro ao buscar turmas: {str(e)}")
@@ -45,13 +51,20 @@ def create_turma(turma: TurmaCreate = Body(...), db: Session = Depends(get_db)):
             detail=f"Erro ao criar turma: {str(e)}"
         )
 
+@router.post("/import")
+async def import_turmas(request: Request, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Importa turmas em massa a partir de um arquivo CSV ou NDJSON enviado no
+    corpo da requisição (Content-Type text/csv ou application/x-ndjson, ou o
+    parâmetro formato). Tudo ou nada: com qualquer linha inválida nada é
+    gravado e a resposta traz os erros por linha.
+    """
+    return await run_bulk_import(request, db, "turmas", formato)
+
 @router.get("/{turma_id}", response_model=TurmaResponse)
-def read_turma(turma_id: int, db: Session = Depends(get_db)):
+def read_turma(request: Request, turma_id: int, db: Session = Depends(get_read_db)):
     """Recupera informações de uma turma específica."""
-    turma = db.query(Turma).filter(Turma.id == turma_id).first()
-    if turma is None:
-        raise HTTPException(status_code=404, detail="Turma não encontrada")
-    return turma
+    return cached_item(request, db, Turma, TurmaResponse, turma_id, "Turma não encontrada")
 
 @router.put("/{turma_id}", response_model=TurmaResponse)
 def update_turma(turma_id: int, turma: TurmaUpdate, db: Session = Depends(get_db)):
@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import Query, Session
+
+from app.api.response_cache import not_modified, response_cache
+from app.models.tabela_versao import get_version
+from app.services.fast_json import columns_for, rows_from_select
+
+# Limite máximo de itens por página
+LIMITE_MAXIMO = 1000
+
+
+def encode_cursor(ultimo_id: int) -> str:
+    """Cursor opaco que aponta para depois do último id retornado."""
+    bruto = json.dumps({"id": ultimo_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(preenchido))["id"])
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido")
+
+
+def list_etag(tabela: str, versao: int, *parametros: Any) -> str:
+    """ETag de uma listagem: versão da tabela mais os parâmetros da página."""
+    assinatura = hashlib.sha256(json.dumps([tabela, versao, *parametros], default=str).encode("utf-8")).hexdigest()[:16]
+    return f'W/"{tabela}-{versao}-{assinatura}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    if cabecalho.strip() == "*":
+        return True
+    fraca = etag[2:] if etag.startswith("W/") else etag
+    for candidato in cabecalho.split(","):
+        candidato = candidato.strip()
+        if candidato == etag or (candidato[2:] if candidato.startswith("W/") else candidato) == fraca:
+            return True
+    return False
+
+
+def keyset_page(request: Request, db: Session, model, response_model,
+                cursor: Optional[str], skip: int, limit: int, query: Optional[Query] = None,
+                rapido: bool = False) -> Response:
+    """
+    Página de uma listagem ordenada por id, servida pelo cache de respostas.
+
+    Com `cursor`, filtra id > último id da página anterior (keyset), o que
+    custa o mesmo em qualquer profundidade; sem cursor, `skip` ainda é
+    aceito por compatibilidade. O cursor da próxima página vai no cabeçalho
+    X-Next-Cursor (e em Link). Se o If-None-Match bater com a versão atual
+    da tabela, responde 304 sem consultar os registros.
+
+    Com `rapido`, as linhas saem de um select() do Core só com as colunas
+    do schema de resposta e são serializadas sem validação do Pydantic
+    (ver fast_json). Ignorado quando `query` é informada.
+    """
+    limit = max(1, min(limit, LIMITE_MAXIMO))
+    ultimo_id = decode_cursor(cursor) if cursor else None
+    versao = get_version(db, model.__tablename__)
+    etag = list_etag(model.__tablename__, versao, ultimo_id, None if cursor else skip, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    rapido = rapido and query is None
+
+    def gerar(response: Response) -> List[Any]:
+        if rapido:
+            consulta = select(*columns_for(model, response_model))
+        else:
+            consulta = query if query is not None else db.query(model)
+        consulta = consulta.order_by(model.id)
+        if ultimo_id is not None:
+            consulta = consulta.filter(model.id > ultimo_id)
+        elif skip:
+            consulta = consulta.offset(skip)
+        # Busca um item a mais para saber se existe próxima página
+        consulta = consulta.limit(limit + 1)
+        itens = rows_from_select(db, consulta) if rapido else consulta.all()
+        response.headers["ETag"] = etag
+        if len(itens) > limit:
+            itens = itens[:limit]
+            proximo = encode_cursor(itens[-1]["id"] if rapido else itens[-1].id)
+            response.headers["X-Next-Cursor"] = proximo
+            response.headers["Link"] = f'<{request.url.include_query_params(cursor=proximo).remove_query_params("skip")}>; rel="next"'
+        return itens
+
+    return response_cache.serve(request, db, model.__tablename__, versao, gerar, List[response_model], confiavel=rapido)
@@ -0,0 +1,165 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from app.models.tabela_versao import get_version
+from app.services import fast_json
+
+try:
+    import brotli
+except ImportError:  # Dependência opcional: sem ela o cache guarda só gzip
+    brotli = None
+
+# Corpos menores que isto não compensam ser comprimidos
+TAMANHO_MINIMO_COMPRESSAO = 512
+
+
+@dataclass
+class CachedBody:
+    """Resposta já serializada e comprimida para uma rota e query."""
+
+    versao: int
+    corpo: bytes
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def _aceita(request: Request, codificacao: str) -> bool:
+    for parte in request.headers.get("accept-encoding", "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        if nome.strip().lower() == codificacao:
+            return parametros.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+class ResponseCache:
+    """
+    Cache de respostas dos GET de CRUD, lido antes de consultar os dados.
+
+    A chave é a rota mais a query string; cada entrada guarda a versão da
+    tabela (tabela_versoes) com que foi gerada, então qualquer escrita na
+    tabela invalida as entradas dela sem nenhuma varredura. O corpo fica
+    pronto em JSON, gzip e (se o pacote brotli existir) brotli, e é servido
+    na codificação aceita pelo cliente.
+    """
+
+    def __init__(self, max_entries: int = 512, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entradas: "OrderedDict[tuple, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _chave(request: Request) -> tuple:
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    def _responder(self, request: Request, entrada: CachedBody, origem: str) -> Response:
+        headers = dict(entrada.headers, Vary="Accept-Encoding")
+        headers["X-Cache"] = origem
+        if entrada.br is not None and _aceita(request, "br"):
+            corpo, headers["Content-Encoding"] = entrada.br, "br"
+        elif entrada.gzip is not None and _aceita(request, "gzip"):
+            corpo, headers["Content-Encoding"] = entrada.gzip, "gzip"
+        else:
+            corpo = entrada.corpo
+        return Response(content=corpo, media_type="application/json", headers=headers)
+
+    def serve(self, request: Request, db: Session, tabela: str, versao: Optional[int],
+              gerar: Callable[[Response], Any], response_model: Any, confiavel: bool = False) -> Response:
+        """
+        Responde a partir do cache ou gera, serializa, comprime e guarda.
+
+        Args:
+            request: Requisição atual
+            db: Sessão usada para ler a versão da tabela
+            tabela: Tabela de que a resposta depende
+            versao: Versão já lida pelo chamador (None para ler aqui)
+            gerar: Função que carrega os dados; recebe um Response onde pode
+                definir cabeçalhos a guardar junto (ETag, X-Next-Cursor...).
+                Exceções, como HTTPException 404, não são guardadas.
+            response_model: Tipo usado para validar e serializar os dados
+            confiavel: Os dados já vêm do banco no formato de response_model
+                (dicionários de um select do Core): pula a validação do
+                Pydantic e serializa direto com fast_json
+        """
+        if versao is None:
+            versao = get_version(db, tabela)
+        chave = self._chave(request)
+        if self.enabled:
+            with self._lock:
+                entrada = self._entradas.get(chave)
+                if entrada is not None and entrada.versao == versao:
+                    self._entradas.move_to_end(chave)
+                    self.hits += 1
+                    return self._responder(request, entrada, "HIT")
+                self.misses += 1
+
+        cabecalhos = Response()
+        dados = gerar(cabecalhos)
+        if confiavel:
+            corpo = fast_json.dumps(dados)
+        else:
+            adaptador = TypeAdapter(response_model)
+            corpo = adaptador.dump_json(adaptador.validate_python(dados, from_attributes=True))
+        entrada = CachedBody(
+            versao=versao,
+            corpo=corpo,
+            headers={k: v for k, v in cabecalhos.headers.items() if k.lower() != "content-length"},
+        )
+        if len(corpo) >= TAMANHO_MINIMO_COMPRESSAO:
+            entrada.gzip = gzip.compress(corpo, compresslevel=6)
+            if brotli is not None:
+                entrada.br = brotli.compress(corpo, quality=5)
+        if self.enabled:
+            with self._lock:
+                self._entradas[chave] = entrada
+                self._entradas.move_to_end(chave)
+                while len(self._entradas) > self.max_entries:
+                    self._entradas.popitem(last=False)
+        return self._responder(request, entrada, "MISS")
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        consultas = self.hits + self.misses
+        return {
+            "entradas": len(self._entradas),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / consultas, 4) if consultas else 0.0,
+            "brotli": brotli is not None,
+        }
+
+
+def cached_item(request: Request, db: Session, model, response_model, item_id: int, mensagem_404: str) -> Response:
+    """GET de um registro por id através do cache de respostas."""
+    def gerar(response: Response):
+        item = db.query(model).filter(model.id == item_id).first()
+        if item is None:
+            raise HTTPException(status_code=404, detail=mensagem_404)
+        return item
+
+    return response_cache.serve(request, db, model.__tablename__, None, gerar, response_model)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+# Instância singleton do cache de respostas
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX", "512")),
+    enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "nao", "no", "off"),
+)
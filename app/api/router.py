@@ -1,45 +1,42 @@
+import importlib
+import time
+
 from fastapi import APIRouter
 
 api_router = APIRouter()
 
-# Importar e incluir router de professores
-try:
-    from app.api.endpoints import professores
-    api_router.include_router(professores.router, prefix="/professores", tags=["professores"])
-except Exception as e:
-    print(f"Erro ao importar router de professores: {e}")
-
-# Importar e incluir router de disciplinas
-try:
-    from app.api.endpoints import disciplinas
-    api_router.include_router(disciplinas.router, prefix="/disciplinas", tags=["disciplinas"])
-except Exception as e:
-    print(f"Erro ao importar router de disciplinas: {e}")
-
-# Importar e incluir router de turmas
-try:
-    from app.api.endpoints import turmas
-    api_router.include_router(turmas.router, prefix="/turmas", tags=["turmas"])
-except Exception as e:
-    print(f"Erro ao importar router de turmas: {e}")
-
-# Importar e incluir router de horários
-try:
-    from app.api.endpoints import horarios
-    api_router.include_router(horarios.router, prefix="/horarios", tags=["horarios"])
-except Exception as e:
-    print(f"Erro ao importar router de horários: {e}")
+# (módulo em app.api.endpoints, prefixo, tags)
+ROUTERS = [
+    ("professores", "/professores", ["professores"]),
+    ("disciplinas", "/disciplinas", ["disciplinas"]),
+    ("turmas", "/turmas", ["turmas"]),
+    ("horarios", "/horarios", ["horarios"]),
+    ("regras", "/regras", ["regras"]),
+    ("grade", "/grade", ["Grade"]),
+    # Variantes assíncronas (AsyncSession; exigem asyncpg ou psycopg 3)
+    ("crud_async", "/async", []),
+    ("grade_async", "/async/grade", ["Grade (async)"]),
+]
 
-# Importar e incluir router de regras
-try:
-    from app.api.endpoints import regras
-    api_router.include_router(regras.router, prefix="/regras", tags=["regras"])
-except Exception as e:
-    print(f"Erro ao importar router de regras: {e}")
+# Resultado da importação de cada router, exibido em /health/startup: um
+# router com erro continua fora da API, mas não passa despercebido
+router_report = []
 
-# Importar e incluir router de grade
-try:
-    from app.api.endpoints import grade
-    api_router.include_router(grade.router, prefix="/grade", tags=["Grade"])
-except Exception as e:
-    print(f"Erro ao importar router de grade: {e}")
+for modulo, prefixo, tags in ROUTERS:
+    inicio = time.perf_counter()
+    try:
+        endpoint = importlib.import_module(f"app.api.endpoints.{modulo}")
+        api_router.include_router(endpoint.router, prefix=prefixo, tags=tags)
+        router_report.append({
+            "router": modulo,
+            "status": "ok",
+            "tempo_segundos": round(time.perf_counter() - inicio, 4),
+        })
+    except Exception as e:
+        print(f"Erro ao importar router de {modulo}: {e}")
+        router_report.append({
+            "router": modulo,
+            "status": "erro",
+            "erro": f"{type(e).__name__}: {e}",
+            "tempo_segundos": round(time.perf_counter() - inicio, 4),
+        })
@@ -9,6 +9,8 @@ class Disciplina(Base):
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
     codigo = Column(String, unique=True, index=True, nullable=False)
+    # Em horas; o motor de grade a lê como aulas semanais, a menos que a
+    # geração informe semanas_letivas (ver SolverConfig)
     carga_horaria = Column(Integer, nullable=False)
     
     # Relacionamentos
@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from app.models.database import Base
+
+class GradeSemanal(Base):
+    """Grade semanal materializada de um professor ou de uma turma (ver weekly_grids)."""
+    __tablename__ = "grades_semanais"
+
+    tipo = Column(String(16), primary_key=True)  # "professor" ou "turma"
+    entidade_id = Column(Integer, primary_key=True)
+    dados = Column(JSONB, nullable=True)  # Mesmo formato de /grade/view; None = invalidada
+    versao = Column(Integer, default=0, nullable=False)  # Incrementada a cada invalidação da chave
+    geracao = Column(BigInteger, default=0, nullable=False)  # Geração global com que foi montada
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"GradeSemanal(tipo='{self.tipo}', entidade_id={self.entidade_id})"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from app.models.database import Base
+
+class RegraIndexada(Base):
+    """Manifesto da indexação vetorial: o que já foi embutido para cada regra."""
+    __tablename__ = "regras_indexadas"
+
+    # Vectorstore a que a entrada se refere ("backend:coleção"): trocar de
+    # RAG_BACKEND ou de coleção começa um manifesto vazio e reindexa tudo
+    indice = Column(String(255), primary_key=True)
+    # Sem chave estrangeira: a entrada sobrevive à remoção da regra até o
+    # próximo index_rules apagar os vetores correspondentes
+    regra_id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    vector_ids = Column(JSONB, nullable=False)  # IDs dos trechos no vectorstore
+    indexado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"RegraIndexada(indice='{self.indice}', regra_id={self.regra_id}, content_hash='{self.content_hash[:12]}')"
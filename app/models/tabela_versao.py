@@ -0,0 +1,135 @@
+from typing import Iterable
+from sqlalchemy import BigInteger, Column, String, event, insert, select, update
+from sqlalchemy.orm import Session
+from app.models.database import Base
+
+class TabelaVersao(Base):
+    """
+    Versão de cada tabela, incrementada na mesma transação de qualquer
+    escrita nela. Serve de ETag barato para as listagens.
+    """
+    __tablename__ = "tabela_versoes"
+
+    tabela = Column(String, primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"TabelaVersao(tabela='{self.tabela}', versao={self.versao})"
+
+
+_tabela_versoes = TabelaVersao.__table__
+
+
+def bump_versions(conexao, tabelas: Iterable[str]):
+    """
+    Incrementa a versão das tabelas informadas. Deve ser chamada na
+    transação da escrita (sessão ou conexão) para que a nova versão só
+    fique visível junto com os dados.
+
+    Em PostgreSQL e SQLite é um único upsert (INSERT ... ON CONFLICT DO
+    UPDATE): duas primeiras escritas concorrentes na mesma tabela não
+    disputam o INSERT da linha de versão.
+    """
+    tabelas = sorted(set(tabelas) - {_tabela_versoes.name})
+    if not tabelas:
+        return
+    if isinstance(conexao, Session):
+        conexao = conexao.connection()
+    dialeto = conexao.dialect.name
+    if dialeto in ("postgresql", "sqlite"):
+        if dialeto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        comando = upsert(_tabela_versoes)
+        comando = comando.on_conflict_do_update(
+            index_elements=[_tabela_versoes.c.tabela],
+            set_={"versao": _tabela_versoes.c.versao + 1},
+        )
+        conexao.execute(comando, [{"tabela": tabela, "versao": 1} for tabela in tabelas])
+        return
+    # Outros bancos: UPDATE e, se a linha ainda não existe, INSERT
+    for tabela in tabelas:
+        resultado = conexao.execute(
+            update(_tabela_versoes)
+            .where(_tabela_versoes.c.tabela == tabela)
+            .values(versao=_tabela_versoes.c.versao + 1)
+        )
+        if resultado.rowcount == 0:
+            conexao.execute(insert(_tabela_versoes).values(tabela=tabela, versao=1))
+
+
+def lock_version(conexao, tabela: str) -> int:
+    """
+    Trava a linha de versão da tabela até o fim da transação e devolve a
+    versão atual. Escritas que chamam esta função antes de verificar e
+    gravar ficam serializadas entre workers e processos: a segunda espera o
+    commit (ou rollback) da primeira e então lê a versão nova.
+
+    PostgreSQL usa SELECT ... FOR UPDATE; no SQLite, que não tem travas de
+    linha, um UPDATE sem efeito toma a trava de escrita do banco.
+    """
+    if isinstance(conexao, Session):
+        conexao = conexao.connection()
+    dialeto = conexao.dialect.name
+    coluna = _tabela_versoes.c.tabela
+    if dialeto in ("postgresql", "sqlite"):
+        if dialeto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        conexao.execute(
+            upsert(_tabela_versoes).values(tabela=tabela, versao=0).on_conflict_do_nothing(index_elements=[coluna])
+        )
+    if dialeto == "sqlite":
+        conexao.execute(
+            update(_tabela_versoes).where(coluna == tabela).values(versao=_tabela_versoes.c.versao)
+        )
+        return conexao.execute(select(_tabela_versoes.c.versao).where(coluna == tabela)).scalar() or 0
+    versao = conexao.execute(
+        select(_tabela_versoes.c.versao).where(coluna == tabela).with_for_update()
+    ).scalar()
+    if versao is None:
+        # Outros bancos: a linha criada aqui fica travada por esta transação
+        conexao.execute(insert(_tabela_versoes).values(tabela=tabela, versao=0))
+        versao = 0
+    return versao
+
+
+def get_version(db: Session, tabela: str) -> int:
+    """Versão atual da tabela (0 se nunca foi alterada)."""
+    return db.execute(
+        select(_tabela_versoes.c.versao).where(_tabela_versoes.c.tabela == tabela)
+    ).scalar() or 0
+
+
+def _tabela_do_objeto(obj):
+    tabela = getattr(type(obj), "__table__", None)
+    return tabela.name if tabela is not None else None
+
+
+@event.listens_for(Session, "after_flush")
+def _versionar_flush(session, flush_context):
+    """Incrementa as versões das tabelas tocadas pelo flush de objetos ORM."""
+    tabelas = {
+        _tabela_do_objeto(obj)
+        for obj in list(session.new) + list(session.deleted)
+    }
+    tabelas.update(
+        _tabela_do_objeto(obj)
+        for obj in session.dirty
+        if session.is_modified(obj)
+    )
+    tabelas.discard(None)
+    if tabelas:
+        bump_versions(session.connection(), tabelas)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _versionar_bulk(orm_execute_state):
+    """Cobre insert/update/delete em massa executados via sessão (ex: query.delete())."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table is not _tabela_versoes:
+        bump_versions(orm_execute_state.session.connection(), [mapper.local_table.name])
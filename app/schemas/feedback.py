@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any
+
+class RegraExtraida(BaseModel):
+    """Regra extraída do feedback em linguagem natural."""
+    professor: str = Field(description="Nome do professor ao qual a regra se aplica")
+    restricao: str = Field("Não especificada", description="Descrição curta da restrição ou preferência")
+    dias_permitidos: List[str] = Field(default_factory=list, description="Dias da semana em que o professor pode dar aula")
+    horario_maximo: str = Field("Não especificado", description="Horário limite no formato HH:MM")
+    acao: str = Field("Nenhuma ação", description="Ação necessária na grade")
+    dados_extras: Dict[str, Any] = Field(default_factory=dict, description="Informações adicionais, como o motivo")
+
+class RegrasExtraidas(BaseModel):
+    """Argumentos da função chamada pelo LLM: só as regras do feedback."""
+    regras: List[RegraExtraida] = Field(default_factory=list, description="Regras, restrições e preferências mencionadas")
+
+class FeedbackEstruturado(BaseModel):
+    """Resposta estruturada do LLM para um feedback sobre a grade."""
+    professores: List[str] = Field(default_factory=list, description="Nomes dos professores mencionados no feedback")
+    regras: List[RegraExtraida] = Field(default_factory=list, description="Regras, restrições e preferências mencionadas")
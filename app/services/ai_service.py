@@ -1,90 +1,163 @@
 import os
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
-from openai import OpenAI
+from pydantic import ValidationError
 
 from app.models.database import SessionLocal
 from app.models.professor import Professor
 from app.models.turma import Turma
 from app.models.horario import Horario
 from app.models.regra import Regra
+from app.schemas.feedback import FeedbackEstruturado, RegrasExtraidas
+from app.services.llm_cache import cache_from_env
+from app.services.name_matcher import professor_name_index
+from app.services.text_utils import normalize_text
 
 # Remova a importação do rag_service daqui
 
+# Versões dos templates de prompt; alterar um prompt exige trocar a versão
+# para que o cache não devolva respostas geradas pelo texto antigo
+PROMPT_FEEDBACK_VERSAO = "feedback-v2"
+
+# Nomes que o modelo usa quando a regra não cita um professor
+_SEM_PROFESSOR = {"", "desconhecido", "nao especificado", "nenhum"}
+
+# Função exposta ao modelo; os argumentos seguem o schema de RegrasExtraidas.
+# Os professores mencionados são detectados localmente (name_matcher)
+FERRAMENTA_FEEDBACK = {
+    "type": "function",
+    "function": {
+        "name": "registrar_regras",
+        "description": "Registra as regras extraídas do feedback sobre a grade escolar.",
+        "parameters": RegrasExtraidas.model_json_schema(),
+    },
+}
+
 class AIService:
     def __init__(self):
-        """Inicializa o serviço de IA com a API da OpenAI."""
+        """
+        Inicializa o serviço de IA com a API da OpenAI.
+        
+        O cliente da OpenAI só é criado no primeiro uso (ou em warm_up), para
+        não pesar na subida da API.
+        """
+        self.cache = cache_from_env()
+        self.model = "gpt-4-turbo"
+        self._client = None
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             print("AVISO: OPENAI_API_KEY não configurada nas variáveis de ambiente")
-            return
-        
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = "gpt-4-turbo"
-        print("AI Service inicializado com OpenAI")
 
-    def extract_rules_from_feedback(self, feedback: str) -> Dict[str, Any]:
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key)
+            print("AI Service inicializado com OpenAI")
+        return self._client
+
+    @client.setter
+    def client(self, valor):
+        self._client = valor
+
+    def warm_up(self):
+        """Cria o cliente da OpenAI antes da primeira requisição."""
+        if self.api_key:
+            self.client
+
+    def analisar_feedback(self, feedback: str, professores: Optional[List[str]] = None) -> FeedbackEstruturado:
         """
-        Extrai regras estruturadas a partir do feedback em linguagem natural.
+        Extrai as regras do feedback numa única chamada com function
+        calling. Os professores não são pedidos ao modelo: vêm do índice
+        local (extrair_professores_do_texto) e entram no prompt para que as
+        regras usem os nomes cadastrados.
+
+        A resposta é validada contra RegrasExtraidas antes de ir para o
+        cache, então uma resposta malformada nunca é reaproveitada.
+
+        Raises:
+            ValueError: se o modelo não chamar a função ou devolver
+                argumentos fora do schema
         """
-        try:
-            prompt = f"""
-            Analise o seguinte feedback do usuário sobre uma grade escolar e extraia regras estruturadas:
-            
-            "{feedback}"
-            
-            Extraia todas as regras, restrições e preferências mencionadas no formato JSON.
-            Cada regra deve ter: professor, restrição, dias permitidos, horário máximo e ação necessária.
-            
-            Exemplo de formato:
-            [
-              {{
-                "professor": "Carlos Silva",
-                "restricao": "Não pode dar aulas",
-                "dias_permitidos": ["Segunda", "Quarta", "Sexta"],
-                "horario_maximo": "18:00",
-                "acao": "Realocar aulas",
-                "dados_extras": {{"motivo": "Compromisso pessoal"}}
-              }}
-            ]
-            """
-            
+        professores = list(professores or [])
+        identificados = ""
+        if professores:
+            identificados = (
+                "Professores cadastrados mencionados no feedback (use estes nomes no campo professor): "
+                + ", ".join(professores)
+            )
+        prompt = f"""
+        Analise o seguinte feedback do usuário sobre uma grade escolar:
+        
+        "{feedback}"
+        
+        {identificados}
+        
+        Chame a função registrar_regras com todas as regras, restrições e
+        preferências encontradas. Cada regra deve ter: professor, restrição,
+        dias permitidos, horário máximo e ação necessária.
+        """
+        chave = self.cache.make_key(
+            self.model, "feedback", PROMPT_FEEDBACK_VERSAO,
+            feedback + "\nProfessores: " + ", ".join(sorted(professores))
+        )
+        
+        def calcular():
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "system", "content": prompt}],
+                tools=[FERRAMENTA_FEEDBACK],
+                tool_choice={"type": "function", "function": {"name": "registrar_regras"}},
                 max_tokens=1000
             )
-            
-            return {"success": True, "rules": response.choices[0].message.content}
+            chamadas = response.choices[0].message.tool_calls or []
+            if not chamadas:
+                raise ValueError("O modelo não retornou as regras do feedback")
+            try:
+                resultado = RegrasExtraidas.model_validate_json(chamadas[0].function.arguments)
+            except ValidationError as e:
+                raise ValueError(f"Resposta do modelo fora do formato esperado: {e}") from e
+            return resultado.model_dump()
+        
+        regras = RegrasExtraidas.model_validate(self.cache.get_or_compute(chave, calcular))
+        return FeedbackEstruturado(professores=professores, regras=regras.regras)
+
+    def extract_rules_from_feedback(self, feedback: str) -> Dict[str, Any]:
+        """
+        Extrai regras estruturadas a partir do feedback em linguagem natural.
+        """
+        try:
+            analise = self.analisar_feedback(feedback)
+            regras = [regra.model_dump() for regra in analise.regras]
+            return {"success": True, "rules": json.dumps(regras, ensure_ascii=False)}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def extrair_professores_do_texto(self, feedback: str) -> List[str]:
+    def extrair_professores_do_texto(self, feedback: str, db: Session = None) -> List[str]:
         """
-        Usa a IA para identificar nomes de professores mencionados no feedback.
-        Retorna uma lista com os nomes detectados.
-        """
-        prompt = f"""
-        Extraia os nomes dos professores mencionados na seguinte mensagem e retorne apenas os nomes como uma lista em JSON:
+        Identifica, sem chamar o LLM, os professores cadastrados mencionados
+        no feedback, pelo índice local de nomes.
+        Retorna uma lista com os nomes cadastrados, na ordem do texto.
         
-        Mensagem: "{feedback}"
-
-        Exemplo de resposta esperada:
-        ["João", "Maria", "Carlos"]
+        Não há mais consulta ao LLM quando o índice não encontra ninguém: um
+        nome fora do cadastro não é professor da grade, e o prompt de
+        analisar_feedback já pede as regras com os nomes citados no texto.
+        Uma regra que cite um nome não resolvido pelo índice continua sendo
+        reportada como professor não cadastrado (refine_schedule_with_feedback).
         """
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "system", "content": prompt}],
-            max_tokens=200
-        )
-
+        sessao = db or SessionLocal()
         try:
-            professores = json.loads(response.choices[0].message.content)
-            return professores if isinstance(professores, list) else []
-        except json.JSONDecodeError:
-            return []
+            mencoes = professor_name_index.find_mentions(sessao, feedback)
+        finally:
+            if db is None:
+                sessao.close()
+        nomes = []
+        for mencao in mencoes:
+            for _, nome in mencao.professores:
+                if nome not in nomes:
+                    nomes.append(nome)
+        return nomes
 
     def adicionar_professor(self, db: Session, nome: str, email: str, area: str) -> Dict[str, Any]:
         """
@@ -95,30 +168,53 @@ class AIService:
             db.add(novo_professor)
             db.commit()
             db.refresh(novo_professor)
+            professor_name_index.invalidate()
             return {"success": True, "message": f"Professor {nome} adicionado com sucesso!"}
         except Exception as e:
             db.rollback()
             return {"success": False, "error": f"Erro ao adicionar professor: {str(e)}"}
     
-    def refine_schedule_with_feedback(self, feedback: str, db: Session) -> Dict[str, Any]:
+    def refine_schedule_with_feedback(self, feedback: str, db: Session,
+                                      analise: Optional[FeedbackEstruturado] = None,
+                                      professores: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Usa IA para interpretar o feedback e refinar a grade. 
         
         Caso alguma informação já exista na base de dados, continuar, caso contrário, pergunta ao usuário se deseja cadastrá-lo. Por exemplo: Lucas é um professor! Mas Lucas não 
         consta na base de dados, então pergunta se quer adiciona-lo!
+        
+        `analise` permite passar o resultado de analisar_feedback já obtido
+        fora da sessão (caminho assíncrono), sem chamar o LLM aqui.
+        `professores` são os cadastrados mencionados, já detectados (ex: no
+        feedback original, antes do enriquecimento pelo RAG); sem eles, a
+        detecção local roda sobre `feedback`.
         """
         print(f"Feedback recebido pela IA: {feedback}")
         
-        # Verificar se existem professores mencionados que não estão cadastrados
-        professores_no_feedback = self.extrair_professores_do_texto(feedback)
+        # Professores detectados localmente; o LLM só extrai as regras
+        if analise is None:
+            if professores is None:
+                professores = self.extrair_professores_do_texto(feedback, db)
+            try:
+                analise = self.analisar_feedback(feedback, professores)
+            except Exception as e:
+                print(f"Erro ao analisar feedback: {e}")
+                return {"error": "Erro ao extrair regras da IA.", "message": "Falha ao refinar a grade."}
+        
+        # Verificar se as regras citam professores que não estão cadastrados
+        professores_nas_regras = []
+        for regra in analise.regras:
+            nome = (regra.professor or "").strip()
+            if normalize_text(nome) not in _SEM_PROFESSOR and nome not in professores_nas_regras:
+                professores_nas_regras.append(nome)
         
-        if professores_no_feedback:
-            # Verificando se esses professores existem no banco de dados
-            professores_existentes = {prof.nome for prof in db.query(Professor).all()}
+        if professores_nas_regras:
+            # O índice local resolve os nomes ignorando acentos, caixa e nomes
+            # parciais; só o que ele não reconhece é tratado como novo
             professores_para_cadastrar = []
             
-            for professor in professores_no_feedback:
-                if professor not in professores_existentes:
+            for professor in professores_nas_regras:
+                if not professor_name_index.resolve(db, professor):
                     professores_para_cadastrar.append(professor)
             
             # Se houver professores não cadastrados, perguntar ao usuário
@@ -129,34 +225,33 @@ class AIService:
                             "Você deseja adicioná-los? Se sim, forneça nome, e-mail e área de atuação para cada professor."
                 }
         
-        # Aqui a IA interpreta o feedback e extrai regras
-        regras_extraidas = self.extract_rules_from_feedback(feedback)
-        
-        if not regras_extraidas.get("success"):
-            return {"error": "Erro ao extrair regras da IA.", "message": "Falha ao refinar a grade."}
-        
-        try:
-            regras = json.loads(regras_extraidas.get("rules", "[]"))
-        except json.JSONDecodeError:
-            return {"error": "Erro ao decodificar regras extraídas", "message": "Falha ao interpretar as regras."}
-        
         # Salvar as regras no banco usando uma nova função interna
-        for regra in regras:
-            self._salvar_regra_no_banco(
+        regras_salvas = []
+        for regra in analise.regras:
+            nova_regra = self._salvar_regra_no_banco(
                 db,
-                professor=regra.get("professor", "Desconhecido"),
-                restricao=regra.get("restricao", "Não especificada"),
-                dias_permitidos=regra.get("dias_permitidos", []),
-                horario_maximo=regra.get("horario_maximo", "Não especificado"),
-                acao=regra.get("acao", "Nenhuma ação"),
-                dados_extras=regra.get("dados_extras", {})
+                professor=regra.professor or "Desconhecido",
+                restricao=regra.restricao,
+                dias_permitidos=regra.dias_permitidos,
+                horario_maximo=regra.horario_maximo,
+                acao=regra.acao,
+                dados_extras=regra.dados_extras
             )
+            if nova_regra is not None:
+                regras_salvas.append({
+                    "id": nova_regra.id,
+                    "nome": nova_regra.nome,
+                    "descricao": nova_regra.descricao,
+                    "tipo": nova_regra.tipo,
+                    "condicoes": nova_regra.condicoes
+                })
         
         print("Regras extraídas e salvas com sucesso!")
         
         return {
             "success": True,
             "schedule": "Grade refinada com as novas regras!",
+            "regras": regras_salvas,
             "message": "Grade refinada com sucesso!"
         }
         
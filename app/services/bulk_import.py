@@ -0,0 +1,373 @@
+import codecs
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.disciplina import Disciplina
+from app.models.professor import Professor, professor_disciplina
+from app.models.regra import Regra
+from app.models.turma import Turma
+from app.schemas.disciplina import DisciplinaCreate
+from app.schemas.professor import ProfessorCreate
+from app.schemas.regra import RegraCreate
+from app.schemas.turma import TurmaBase
+from app.services.name_matcher import professor_name_index
+from app.services.solver.rules import validate_rule
+
+FORMATO_CSV = "csv"
+FORMATO_NDJSON = "ndjson"
+
+# Registros validados, resolvidos e inseridos por vez
+TAMANHO_LOTE = 1000
+# Linhas com erro listadas no relatório (o total é sempre contado)
+MAX_ERROS_RELATORIO = 1000
+
+
+class TurmaImport(TurmaBase):
+    """Turma na importação: a disciplina pode vir pelo id ou pelo código."""
+    disciplina_id: Optional[int] = None
+    disciplina_codigo: Optional[str] = None
+
+
+class ProfessorImport(ProfessorCreate):
+    """Professor na importação, com as disciplinas que leciona (ids ou códigos)."""
+    disciplinas: List[str] = []
+
+
+@dataclass
+class ImportResult:
+    """Resultado de uma importação em massa (tudo ou nada)."""
+
+    entidade: str
+    total: int = 0
+    importados: int = 0
+    erros: List[Dict[str, Any]] = field(default_factory=list)
+    total_erros: int = 0
+    tempo_segundos: float = 0.0
+
+    @property
+    def sucesso(self) -> bool:
+        return self.total_erros == 0
+
+    def erro(self, linha: int, mensagens: List[str]):
+        self.total_erros += 1
+        if len(self.erros) < MAX_ERROS_RELATORIO:
+            self.erros.append({"linha": linha, "erros": mensagens})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "success": self.sucesso,
+            "entidade": self.entidade,
+            "total": self.total,
+            "importados": self.importados,
+            "total_erros": self.total_erros,
+            "erros": self.erros,
+            "erros_truncados": self.total_erros > len(self.erros),
+            "tempo_segundos": self.tempo_segundos,
+            "message": (
+                f"{self.importados} registros importados"
+                if self.sucesso else
+                f"Importação cancelada: {self.total_erros} linha(s) com erro; nada foi gravado"
+            ),
+        }
+
+
+def detect_format(content_type: Optional[str], formato: Optional[str] = None) -> str:
+    """Formato do arquivo pelo parâmetro explícito ou pelo Content-Type (padrão: CSV)."""
+    escolhido = (formato or "").strip().lower()
+    if not escolhido:
+        tipo = (content_type or "").split(";")[0].strip().lower()
+        escolhido = FORMATO_NDJSON if tipo in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines") else FORMATO_CSV
+    if escolhido in ("jsonl", "json-lines"):
+        escolhido = FORMATO_NDJSON
+    if escolhido not in (FORMATO_CSV, FORMATO_NDJSON):
+        raise ValueError(f"Formato de importação não suportado: {formato}")
+    return escolhido
+
+
+def iter_records(arquivo: IO[bytes], formato: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Lê o arquivo linha a linha, sem carregá-lo inteiro na memória.
+
+    Yields:
+        Tuplas (número da linha, registro ou None, mensagem de erro ou None)
+    """
+    texto = codecs.getreader("utf-8-sig")(arquivo)
+    if formato == FORMATO_CSV:
+        leitor = csv.DictReader(texto)
+        for registro in leitor:
+            registro = {
+                (chave or "").strip(): (valor.strip() if isinstance(valor, str) else valor)
+                for chave, valor in registro.items()
+            }
+            # Colunas vazias valem como ausentes (usa o padrão do schema)
+            yield leitor.line_num, {k: v for k, v in registro.items() if k and v not in ("", None)}, None
+        return
+
+    for linha, conteudo in enumerate(texto, start=1):
+        if not conteudo.strip():
+            continue
+        try:
+            registro = json.loads(conteudo)
+        except json.JSONDecodeError as e:
+            yield linha, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(registro, dict):
+            yield linha, None, "Cada linha deve conter um objeto JSON"
+            continue
+        yield linha, registro, None
+
+
+def _mensagens_validacao(erro: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in e['loc']) or 'registro'}: {e['msg']}" for e in erro.errors()]
+
+
+def _lotes(registros: Iterator, tamanho: int) -> Iterator[List]:
+    lote = []
+    for item in registros:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class _Importador:
+    """
+    Base dos importadores: valida cada registro com o schema, resolve em
+    lote as chaves únicas e estrangeiras e insere com executemany.
+    """
+
+    entidade = ""
+    modelo = None
+    schema = BaseModel
+    chave_unica: Optional[str] = None
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.vistos = set()  # chaves únicas já presentes no arquivo
+
+    def normalizar(self, registro: Dict[str, Any]) -> Dict[str, Any]:
+        return registro
+
+    def resolver(self, validos: List[Tuple[int, BaseModel]], resultado: ImportResult) -> List[Tuple[int, BaseModel]]:
+        """Checa chaves únicas contra o arquivo e o banco; devolve só os registros aceitos."""
+        if not self.chave_unica:
+            return validos
+        coluna = getattr(self.modelo, self.chave_unica)
+        valores = {getattr(item, self.chave_unica) for _, item in validos}
+        existentes = {
+            valor for (valor,) in self.db.execute(select(coluna).where(coluna.in_(valores)))
+        } if valores else set()
+        aceitos = []
+        for linha, item in validos:
+            valor = getattr(item, self.chave_unica)
+            if valor in existentes:
+                resultado.erro(linha, [f"{self.chave_unica}: '{valor}' já cadastrado"])
+            elif valor in self.vistos:
+                resultado.erro(linha, [f"{self.chave_unica}: '{valor}' repetido no arquivo"])
+            else:
+                self.vistos.add(valor)
+                aceitos.append((linha, item))
+        return aceitos
+
+    def inserir(self, aceitos: List[Tuple[int, BaseModel]]):
+        self.db.execute(insert(self.modelo), [item.model_dump() for _, item in aceitos])
+
+    def processar_lote(self, lote, resultado: ImportResult):
+        validos = []
+        for linha, registro, erro in lote:
+            resultado.total += 1
+            if erro:
+                resultado.erro(linha, [erro])
+                continue
+            try:
+                validos.append((linha, self.schema.model_validate(self.normalizar(registro))))
+            except ValidationError as e:
+                resultado.erro(linha, _mensagens_validacao(e))
+            except ValueError as e:
+                resultado.erro(linha, [str(e)])
+        aceitos = self.resolver(validos, resultado)
+        # Com algum erro a importação inteira será desfeita: segue só validando
+        if aceitos and resultado.sucesso:
+            self.inserir(aceitos)
+            resultado.importados += len(aceitos)
+
+
+class _ImportadorDisciplinas(_Importador):
+    entidade = "disciplinas"
+    modelo = Disciplina
+    schema = DisciplinaCreate
+    chave_unica = "codigo"
+
+
+class _ImportadorRegras(_Importador):
+    entidade = "regras"
+    modelo = Regra
+    schema = RegraCreate
+
+    def normalizar(self, registro):
+        condicoes = registro.get("condicoes")
+        if isinstance(condicoes, str):
+            try:
+                registro = dict(registro, condicoes=json.loads(condicoes))
+            except json.JSONDecodeError:
+                raise ValueError("condicoes: deve ser um objeto JSON")
+        return registro
+
+    def resolver(self, validos, resultado):
+        # Regras que o motor não consegue interpretar são recusadas na importação
+        aceitos = []
+        for linha, item in validos:
+            erros = validate_rule(item.tipo, item.condicoes)
+            if erros:
+                resultado.erro(linha, [f"condicoes: {erro}" for erro in erros])
+            else:
+                aceitos.append((linha, item))
+        return aceitos
+
+
+class _ImportadorTurmas(_Importador):
+    entidade = "turmas"
+    modelo = Turma
+    schema = TurmaImport
+    chave_unica = "codigo"
+
+    def resolver(self, validos, resultado):
+        ids = {item.disciplina_id for _, item in validos if item.disciplina_id is not None}
+        codigos = {item.disciplina_codigo for _, item in validos if item.disciplina_id is None and item.disciplina_codigo}
+        ids_existentes = {
+            i for (i,) in self.db.execute(select(Disciplina.id).where(Disciplina.id.in_(ids)))
+        } if ids else set()
+        por_codigo = dict(
+            self.db.execute(select(Disciplina.codigo, Disciplina.id).where(Disciplina.codigo.in_(codigos))).all()
+        ) if codigos else {}
+
+        resolvidos = []
+        for linha, item in validos:
+            if item.disciplina_id is not None:
+                if item.disciplina_id not in ids_existentes:
+                    resultado.erro(linha, [f"disciplina_id: disciplina {item.disciplina_id} não encontrada"])
+                    continue
+            elif item.disciplina_codigo:
+                if item.disciplina_codigo not in por_codigo:
+                    resultado.erro(linha, [f"disciplina_codigo: disciplina '{item.disciplina_codigo}' não encontrada"])
+                    continue
+                item.disciplina_id = por_codigo[item.disciplina_codigo]
+            else:
+                resultado.erro(linha, ["disciplina_id: informe disciplina_id ou disciplina_codigo"])
+                continue
+            resolvidos.append((linha, item))
+        return super().resolver(resolvidos, resultado)
+
+    def inserir(self, aceitos):
+        self.db.execute(
+            insert(Turma),
+            [item.model_dump(exclude={"disciplina_codigo"}) for _, item in aceitos]
+        )
+
+
+class _ImportadorProfessores(_Importador):
+    entidade = "professores"
+    modelo = Professor
+    schema = ProfessorImport
+    chave_unica = "email"
+
+    def normalizar(self, registro):
+        disciplinas = registro.get("disciplinas")
+        if isinstance(disciplinas, str):
+            # CSV: lista separada por ";" ou "|"
+            partes = disciplinas.replace("|", ";").split(";")
+            registro = dict(registro, disciplinas=[p.strip() for p in partes if p.strip()])
+        elif isinstance(disciplinas, list):
+            registro = dict(registro, disciplinas=[str(d).strip() for d in disciplinas if str(d).strip()])
+        return registro
+
+    def resolver(self, validos, resultado):
+        referencias = {ref for _, item in validos for ref in item.disciplinas}
+        ids = {int(ref) for ref in referencias if ref.isdigit()}
+        self._por_referencia: Dict[str, int] = {}
+        if referencias:
+            consulta = select(Disciplina.id, Disciplina.codigo).where(
+                Disciplina.codigo.in_(referencias) | Disciplina.id.in_(ids)
+            )
+            for disciplina_id, codigo in self.db.execute(consulta):
+                self._por_referencia[codigo] = disciplina_id
+                self._por_referencia[str(disciplina_id)] = disciplina_id
+
+        resolvidos = []
+        for linha, item in validos:
+            faltando = [ref for ref in item.disciplinas if ref not in self._por_referencia]
+            if faltando:
+                resultado.erro(linha, [f"disciplinas: não encontradas: {', '.join(faltando)}"])
+                continue
+            resolvidos.append((linha, item))
+        return super().resolver(resolvidos, resultado)
+
+    def inserir(self, aceitos):
+        ids = self.db.execute(
+            insert(Professor).returning(Professor.id, sort_by_parameter_order=True),
+            [item.model_dump(exclude={"disciplinas"}) for _, item in aceitos]
+        ).scalars().all()
+        vinculos = [
+            {"professor_id": professor_id, "disciplina_id": disciplina_id}
+            for professor_id, (_, item) in zip(ids, aceitos)
+            for disciplina_id in {self._por_referencia[ref] for ref in item.disciplinas}
+        ]
+        if vinculos:
+            self.db.execute(insert(professor_disciplina), vinculos)
+
+
+IMPORTADORES = {
+    importador.entidade: importador
+    for importador in (_ImportadorProfessores, _ImportadorDisciplinas, _ImportadorTurmas, _ImportadorRegras)
+}
+
+
+def import_file(db: Session, entidade: str, arquivo: IO[bytes], formato: str) -> ImportResult:
+    """
+    Importa um arquivo CSV ou NDJSON numa única transação.
+
+    Os registros são validados, resolvidos e inseridos em lotes de
+    TAMANHO_LOTE; se qualquer linha tiver erro, nada é gravado e o resultado
+    traz o relatório de erros por linha.
+
+    Args:
+        db: Sessão do banco de dados
+        entidade: "professores", "disciplinas", "turmas" ou "regras"
+        arquivo: Arquivo binário posicionado no início
+        formato: FORMATO_CSV ou FORMATO_NDJSON
+
+    Returns:
+        Resultado da importação
+    """
+    importador = IMPORTADORES[entidade](db)
+    resultado = ImportResult(entidade=entidade)
+    inicio = time.perf_counter()
+    try:
+        for lote in _lotes(iter_records(arquivo, formato), TAMANHO_LOTE):
+            importador.processar_lote(lote, resultado)
+        if resultado.sucesso and resultado.total:
+            db.commit()
+            if entidade == "professores":
+                # Professores novos precisam entrar na detecção de menções
+                professor_name_index.invalidate()
+        else:
+            db.rollback()
+            resultado.importados = 0
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        resultado.importados = 0
+        resultado.erro(0, [f"Arquivo ilegível: {e}"])
+    except Exception:
+        db.rollback()
+        raise
+    resultado.tempo_segundos = round(time.perf_counter() - inicio, 4)
+    return resultado
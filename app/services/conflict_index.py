@@ -0,0 +1,306 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.horario import Horario
+from app.models.tabela_versao import get_version, lock_version
+from app.services.text_utils import format_hora, normalize_text, parse_hora
+
+# Recursos que não podem estar em dois lugares ao mesmo tempo
+RECURSOS = ("professor", "turma", "sala")
+
+# Chave em Session.info com a versão de horarios travada por begin_write
+_VERSAO_TRAVADA = "conflict_index_versao"
+
+_COLUNAS = ("id", "dia_semana", "hora_inicio", "hora_fim", "sala", "professor_id", "turma_id")
+
+
+def _campo(row, nome: str):
+    if isinstance(row, dict):
+        return row.get(nome)
+    return getattr(row, nome, None)
+
+
+def _intervalo(row) -> Tuple[int, int]:
+    inicio = parse_hora(_campo(row, "hora_inicio"))
+    fim = parse_hora(_campo(row, "hora_fim"))
+    if inicio is None or fim is None:
+        raise ValueError("Horário sem hora de início ou de fim válida")
+    return inicio, fim
+
+
+def resource_keys(row) -> List[Tuple[str, Any, str]]:
+    """Chaves (recurso, identificador, dia) ocupadas por um horário."""
+    dia = normalize_text(_campo(row, "dia_semana") or "")
+    chaves = [
+        ("professor", _campo(row, "professor_id"), dia),
+        ("turma", _campo(row, "turma_id"), dia),
+    ]
+    sala = normalize_text(_campo(row, "sala") or "")
+    if sala:
+        chaves.append(("sala", sala, dia))
+    return chaves
+
+
+def _descrever(chave: Tuple[str, Any, str], dia_original: str, a: tuple, b: tuple) -> Dict[str, Any]:
+    recurso, identificador, _ = chave
+    return {
+        "recurso": recurso,
+        "chave": identificador,
+        "dia_semana": dia_original,
+        "horarios": [a[2], b[2]],
+        "intervalos": [
+            f"{format_hora(a[0])}-{format_hora(a[1])}",
+            f"{format_hora(b[0])}-{format_hora(b[1])}",
+        ],
+    }
+
+
+def find_all_conflicts(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Encontra todos os choques de uma grade numa única varredura (sweep-line).
+
+    As aulas são ordenadas por (recurso, dia, início); para cada uma, os
+    intervalos ainda ativos do mesmo recurso que terminam depois do início
+    dela são conflitos. Custo O(n log n + k), com k conflitos.
+
+    Args:
+        rows: Horários (objetos ORM, linhas ou dicionários) com id
+
+    Returns:
+        Lista de conflitos entre pares de horários
+    """
+    eventos = []
+    dias_originais = {}
+    for posicao, row in enumerate(rows):
+        inicio, fim = _intervalo(row)
+        horario_id = _campo(row, "id")
+        if horario_id is None:
+            horario_id = posicao
+        for chave in resource_keys(row):
+            if chave[1] is None:
+                continue
+            ordem = (chave[0], str(chave[1]), chave[2])
+            eventos.append((ordem, inicio, fim, horario_id, chave))
+            dias_originais.setdefault(chave[2], _campo(row, "dia_semana"))
+    eventos.sort(key=lambda e: (e[0], e[1], e[2], str(e[3])))
+
+    conflitos = []
+    atual = None
+    ativos: List[tuple] = []  # heap de (fim, inicio, id)
+    for ordem, inicio, fim, horario_id, chave in eventos:
+        if ordem != atual:
+            atual, ativos = ordem, []
+        while ativos and ativos[0][0] <= inicio:
+            heapq.heappop(ativos)
+        for fim_ativo, inicio_ativo, id_ativo in ativos:
+            conflitos.append(_descrever(
+                chave, dias_originais[chave[2]],
+                (inicio_ativo, fim_ativo, id_ativo), (inicio, fim, horario_id),
+            ))
+        heapq.heappush(ativos, (fim, inicio, horario_id))
+    return conflitos
+
+
+class ConflictIndex:
+    """
+    Índice de ocupação por (professor_id | turma_id | sala, dia_semana).
+
+    Cada chave guarda uma lista de intervalos ordenada pelo início; a
+    verificação de uma nova aula faz uma busca binária e só examina os
+    vizinhos que podem se sobrepor, em O(log n). O índice é mantido em
+    memória no processo, carregado do banco no primeiro uso e atualizado a
+    cada escrita feita pelos endpoints.
+
+    As escritas são serializadas pelo banco, não pelo processo: check (ou
+    begin_write) trava a linha de "horarios" em tabela_versoes até o fim da
+    transação, então duas escritas em workers ou processos diferentes nunca
+    verificam a mesma versão. Com a trava, o índice é recarregado se a
+    versão que reflete não é a do banco, e commit_write aplica a escrita e
+    avança a versão sem recarga.
+
+    `lock` (RLock) protege só as estruturas em memória e nunca é mantido
+    durante consultas ao banco: nos endpoints assíncronos a função passada
+    ao run_sync roda na thread do event loop, e cada consulta devolve o
+    controle ao loop.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._intervalos: Dict[tuple, List[tuple]] = {}
+        self._por_horario: Dict[int, Tuple[List[tuple], int, int]] = {}
+        self._dias: Dict[str, str] = {}
+        self._duracao_maxima = 0
+        self.carregado = False
+        # Versão de tabela_versoes refletida pelo índice (None = desconhecida)
+        self.versao: Optional[int] = None
+
+    def _chaves(self, row) -> List[tuple]:
+        chaves = [c for c in resource_keys(row) if c[1] is not None]
+        for chave in chaves:
+            self._dias.setdefault(chave[2], _campo(row, "dia_semana"))
+        return chaves
+
+    def clear(self):
+        with self.lock:
+            self._intervalos.clear()
+            self._por_horario.clear()
+            self._duracao_maxima = 0
+            self.carregado = False
+            self.versao = None
+
+    def reset(self, rows: Iterable[Any], versao: Optional[int] = None):
+        """Recarrega o índice com os horários informados."""
+        with self.lock:
+            self.clear()
+            for row in rows:
+                self.add(row)
+            self.carregado = True
+            self.versao = versao
+
+    def load(self, db: Session, versao: Optional[int] = None):
+        """
+        Recarrega do banco. `versao` deve ter sido lida antes das linhas (ou
+        sob a trava de begin_write), para nunca rotular linhas antigas com
+        uma versão nova.
+        """
+        colunas = [getattr(Horario, c) for c in _COLUNAS]
+        rows = [row._asdict() for row in db.query(*colunas)]
+        self.reset(rows, versao)
+
+    def _sincronizar(self, db: Session, versao: int):
+        with self.lock:
+            em_dia = self.carregado and self.versao == versao
+        if not em_dia:
+            self.load(db, versao)
+
+    def ensure_loaded(self, db: Session):
+        """Carrega o índice, ou recarrega se a tabela mudou desde a última carga."""
+        self._sincronizar(db, get_version(db, Horario.__tablename__))
+
+    def begin_write(self, db: Session) -> int:
+        """
+        Trava a versão de horarios na transação da sessão e deixa o índice em
+        dia com ela. Deve ser chamada antes de verificar e gravar; a trava
+        vale até o commit_write (ou o rollback da sessão).
+        """
+        versao = lock_version(db, Horario.__tablename__)
+        self._sincronizar(db, versao)
+        db.info[_VERSAO_TRAVADA] = versao
+        return versao
+
+    def commit_write(self, db: Session, horario=None, removido_id: Optional[int] = None):
+        """
+        Confirma a escrita da sessão e a aplica ao índice: `horario` criado ou
+        atualizado, ou o id do horário removido. Chamar depois de check (ou
+        begin_write) na mesma transação.
+
+        Como a versão estava travada, a lida depois do flush é exatamente a
+        desta escrita. Se o índice foi recarregado por outra thread nesse
+        meio tempo, a escrita não é aplicada: a próxima verificação compara
+        as versões e recarrega se preciso.
+        """
+        anterior = db.info.pop(_VERSAO_TRAVADA, None)
+        db.flush()
+        versao = get_version(db, Horario.__tablename__)
+        db.commit()
+        dados = None
+        if horario is not None:
+            db.refresh(horario)
+            dados = {c: getattr(horario, c) for c in _COLUNAS}
+        with self.lock:
+            if anterior is None or not self.carregado or self.versao != anterior:
+                return
+            if dados is not None:
+                self.add(dados)
+            if removido_id is not None:
+                self.remove(removido_id)
+            self.versao = versao
+
+    def add(self, row):
+        horario_id = _campo(row, "id")
+        inicio, fim = _intervalo(row)
+        with self.lock:
+            if horario_id in self._por_horario:
+                self.remove(horario_id)
+            chaves = self._chaves(row)
+            for chave in chaves:
+                insort(self._intervalos.setdefault(chave, []), (inicio, fim, horario_id))
+            self._por_horario[horario_id] = (chaves, inicio, fim)
+            self._duracao_maxima = max(self._duracao_maxima, fim - inicio)
+
+    def remove(self, horario_id: int):
+        with self.lock:
+            registro = self._por_horario.pop(horario_id, None)
+            if registro is None:
+                return
+            chaves, inicio, fim = registro
+            for chave in chaves:
+                lista = self._intervalos.get(chave, [])
+                posicao = bisect_left(lista, (inicio, fim, horario_id))
+                if posicao < len(lista) and lista[posicao] == (inicio, fim, horario_id):
+                    lista.pop(posicao)
+                if not lista:
+                    self._intervalos.pop(chave, None)
+
+    def find_conflicts(self, row, ignorar_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Lista os horários já indexados que chocam com a aula informada.
+
+        Args:
+            row: Horário candidato (dicionário ou objeto com os campos do modelo)
+            ignorar_id: Id do próprio horário, em caso de atualização
+
+        Returns:
+            Lista de conflitos
+        """
+        inicio, fim = _intervalo(row)
+        conflitos = []
+        with self.lock:
+            for chave in self._chaves(row):
+                lista = self._intervalos.get(chave)
+                if not lista:
+                    continue
+                # Intervalos à esquerda de `posicao` começam antes do fim da aula;
+                # só os que começaram há menos de uma duração máxima podem sobrepor.
+                posicao = bisect_left(lista, (fim,))
+                limite = inicio - self._duracao_maxima
+                j = posicao - 1
+                while j >= 0 and lista[j][0] >= limite:
+                    existente = lista[j]
+                    if existente[1] > inicio and existente[2] != ignorar_id:
+                        conflitos.append(_descrever(
+                            chave, self._dias.get(chave[2], chave[2]),
+                            existente, (inicio, fim, ignorar_id),
+                        ))
+                    j -= 1
+        return conflitos
+
+    def check(self, db: Session, row, ignorar_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Trava a versão de horarios (begin_write, se ainda não foi chamada na
+        transação) e verifica a aula informada. Com conflitos, desfaz a
+        transação, liberando a trava.
+        """
+        if _VERSAO_TRAVADA not in db.info:
+            self.begin_write(db)
+        conflitos = self.find_conflicts(row, ignorar_id=ignorar_id)
+        if conflitos:
+            db.info.pop(_VERSAO_TRAVADA, None)
+            db.rollback()
+        return conflitos
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _liberar_trava(sessao):
+    # A trava de begin_write termina com a transação
+    sessao.info.pop(_VERSAO_TRAVADA, None)
+
+
+# Instância singleton do índice
+conflict_index = ConflictIndex()
@@ -0,0 +1,182 @@
+import csv
+import io
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.models.database import ReadSessionLocal
+from app.models.disciplina import Disciplina
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.services import fast_json
+from app.services.text_utils import normalize_text
+
+# Linhas buscadas por vez no cursor do servidor
+LINHAS_POR_LOTE = 1000
+
+COLUNAS_EXPORTACAO = [
+    "id", "dia_semana", "hora_inicio", "hora_fim", "sala",
+    "professor_id", "professor_nome", "turma_id", "turma_codigo", "turma_periodo",
+    "disciplina_id", "disciplina_codigo", "disciplina_nome",
+]
+
+# Dia da semana (normalizado) -> (weekday do Python, código do RRULE)
+DIAS_ICS = {
+    "segunda": (0, "MO"), "segunda-feira": (0, "MO"),
+    "terca": (1, "TU"), "terca-feira": (1, "TU"),
+    "quarta": (2, "WE"), "quarta-feira": (2, "WE"),
+    "quinta": (3, "TH"), "quinta-feira": (3, "TH"),
+    "sexta": (4, "FR"), "sexta-feira": (4, "FR"),
+    "sabado": (5, "SA"), "domingo": (6, "SU"),
+}
+
+
+def _consulta(professor_id: Optional[int] = None, turma_id: Optional[int] = None):
+    consulta = (
+        select(
+            Horario.id, Horario.dia_semana, Horario.hora_inicio, Horario.hora_fim, Horario.sala,
+            Horario.professor_id, Professor.nome.label("professor_nome"),
+            Horario.turma_id, Turma.codigo.label("turma_codigo"), Turma.periodo.label("turma_periodo"),
+            Disciplina.id.label("disciplina_id"), Disciplina.codigo.label("disciplina_codigo"),
+            Disciplina.nome.label("disciplina_nome"),
+        )
+        .join(Professor, Horario.professor_id == Professor.id)
+        .join(Turma, Horario.turma_id == Turma.id)
+        .join(Disciplina, Turma.disciplina_id == Disciplina.id)
+        .order_by(Horario.id)
+    )
+    if professor_id is not None:
+        consulta = consulta.where(Horario.professor_id == professor_id)
+    if turma_id is not None:
+        consulta = consulta.where(Horario.turma_id == turma_id)
+    return consulta
+
+
+def iter_horarios(professor_id: Optional[int] = None, turma_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre a grade com os nomes de professor, turma e disciplina.
+
+    Usa uma sessão própria (a do request já foi fechada quando a resposta
+    em streaming é consumida) e um cursor do lado do servidor com
+    yield_per, então a memória não cresce com o tamanho da grade.
+    """
+    db = ReadSessionLocal()
+    try:
+        resultado = db.execute(
+            _consulta(professor_id, turma_id).execution_options(yield_per=LINHAS_POR_LOTE)
+        )
+        for row in resultado:
+            yield row._asdict()
+    finally:
+        db.close()
+
+
+def _hora(valor) -> str:
+    return valor.strftime("%H:%M") if valor is not None else ""
+
+
+def stream_ndjson(linhas: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    lote = []
+    for row in linhas:
+        row["hora_inicio"], row["hora_fim"] = _hora(row["hora_inicio"]), _hora(row["hora_fim"])
+        lote.append(fast_json.dumps(row))
+        if len(lote) >= LINHAS_POR_LOTE:
+            yield b"\n".join(lote) + b"\n"
+            lote = []
+    if lote:
+        yield b"\n".join(lote) + b"\n"
+
+
+def stream_csv(linhas: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUNAS_EXPORTACAO)
+    escritor.writeheader()
+    # BOM para o Excel reconhecer UTF-8
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    for i, row in enumerate(linhas, start=1):
+        row["hora_inicio"], row["hora_fim"] = _hora(row["hora_inicio"]), _hora(row["hora_fim"])
+        escritor.writerow(row)
+        if i % LINHAS_POR_LOTE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _escape_ics(texto: str) -> str:
+    return (texto or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _linha_ics(linha: str) -> str:
+    """Quebra linhas com mais de 75 octetos, como exige a RFC 5545."""
+    bruto = linha.encode("utf-8")
+    if len(bruto) <= 75:
+        return linha + "\r\n"
+    partes, atual = [], b""
+    for c in linha:
+        cb = c.encode("utf-8")
+        if len(atual) + len(cb) > (75 if not partes else 74):
+            partes.append(atual.decode("utf-8"))
+            atual = b""
+        atual += cb
+    partes.append(atual.decode("utf-8"))
+    return "\r\n ".join(partes) + "\r\n"
+
+
+def stream_ics(linhas: Iterator[Dict[str, Any]], nome_calendario: str,
+               inicio: Optional[date] = None, ate: Optional[date] = None) -> Iterator[bytes]:
+    """
+    Gera um calendário iCalendar com um evento semanal recorrente por aula.
+
+    Args:
+        linhas: Aulas (ver iter_horarios)
+        nome_calendario: Nome exibido pelo cliente de calendário
+        inicio: Primeira semana do calendário (padrão: hoje)
+        ate: Último dia das recorrências (padrão: sem fim)
+    """
+    inicio = inicio or date.today()
+    carimbo = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    cabecalho = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Grade Escolar//Exportacao de Horarios//PT",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_escape_ics(nome_calendario)}",
+    ]
+    yield "".join(_linha_ics(l) for l in cabecalho).encode("utf-8")
+
+    lote = []
+    for row in linhas:
+        dia = DIAS_ICS.get(normalize_text(row["dia_semana"]))
+        if dia is None or row["hora_inicio"] is None or row["hora_fim"] is None:
+            continue
+        weekday, codigo = dia
+        primeira = inicio + timedelta(days=(weekday - inicio.weekday()) % 7)
+        rrule = f"RRULE:FREQ=WEEKLY;BYDAY={codigo}"
+        if ate is not None:
+            rrule += f";UNTIL={ate.strftime('%Y%m%d')}T235959"
+        descricao = f"Professor: {row['professor_nome']}\nTurma: {row['turma_codigo']}"
+        evento = [
+            "BEGIN:VEVENT",
+            f"UID:horario-{row['id']}@grade-escolar",
+            f"DTSTAMP:{carimbo}",
+            f"DTSTART:{primeira.strftime('%Y%m%d')}T{row['hora_inicio'].strftime('%H%M%S')}",
+            f"DTEND:{primeira.strftime('%Y%m%d')}T{row['hora_fim'].strftime('%H%M%S')}",
+            rrule,
+            f"SUMMARY:{_escape_ics(row['disciplina_nome'])} ({_escape_ics(row['turma_codigo'])})",
+            f"DESCRIPTION:{_escape_ics(descricao)}",
+        ]
+        if row.get("sala"):
+            evento.append(f"LOCATION:{_escape_ics(row['sala'])}")
+        evento.append("END:VEVENT")
+        lote.append("".join(_linha_ics(l) for l in evento))
+        if len(lote) >= 200:
+            yield "".join(lote).encode("utf-8")
+            lote = []
+    lote.append(_linha_ics("END:VCALENDAR"))
+    yield "".join(lote).encode("utf-8")
@@ -0,0 +1,43 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+try:
+    import orjson
+except ImportError:  # Dependência opcional: sem ela usa o json da biblioteca padrão
+    orjson = None
+
+
+def _padrao(valor: Any):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(dados: Any) -> bytes:
+    """
+    Serializa para JSON em bytes com orjson quando disponível. Datas e
+    horários saem em ISO 8601, como no Pydantic.
+    """
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao)
+    return json.dumps(dados, ensure_ascii=False, separators=(",", ":"), default=_padrao).encode("utf-8")
+
+
+def rows_from_select(db: Session, consulta) -> List[Dict[str, Any]]:
+    """
+    Executa um select() do Core e devolve as linhas como dicionários, sem
+    montar objetos ORM.
+    """
+    return [dict(row) for row in db.execute(consulta).mappings()]
+
+
+def columns_for(model, response_model) -> list:
+    """Colunas da tabela do modelo que correspondem aos campos do schema de resposta."""
+    colunas = model.__table__.c
+    return [colunas[campo] for campo in response_model.model_fields if campo in colunas]
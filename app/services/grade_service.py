@@ -1,31 +1,70 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Callable
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, time
+import asyncio
+import csv
+import io
 import traceback
 
-from app.models.professor import Professor
+from app.models.database import read_session
+from app.models.professor import Professor, professor_disciplina
 from app.models.disciplina import Disciplina
 from app.models.turma import Turma
 from app.models.horario import Horario
 from app.models.regra import Regra
+from app.models.tabela_versao import bump_versions, lock_version
 from app.services.ai_service import ai_service
 from app.services.rag_service import rag_service
+from app.services.solver import (
+    ScheduleScorer, SolverConfig, build_problem, infer_grid, repair_schedule, solve, solve_multistart
+)
+from app.services.conflict_index import conflict_index, find_all_conflicts
+from app.services.text_utils import parse_hora
+from app.services.weekly_grids import weekly_grids
+
+
+class ScheduleValidationError(ValueError):
+    """A grade enviada tem entradas inválidas ou conflitantes; nada foi gravado."""
+
+    def __init__(self, mensagem: str, erros: Optional[List[str]] = None):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.erros = erros or []
+
 
 class GradeService:
     def __init__(self):
         """Inicializa o serviço de grade escolar."""
         pass
     
-    def _get_all_data(self, db: Session) -> Dict[str, List[Dict[str, Any]]]:
+    def _get_all_data(self, db: Session, usar_replica: bool = True) -> Dict[str, List[Dict[str, Any]]]:
         """
         Recupera todos os dados necessários para a otimização da grade.
         
         Args:
             db: Sessão do banco de dados
+            usar_replica: Lê da réplica de leitura, se configurada. Use False
+                quando os dados acabaram de ser gravados na primária.
             
         Returns:
             Dicionário com todos os dados
         """
+        if not usar_replica:
+            return self._load_all_data(db)
+        with read_session(db) as leitura:
+            return self._load_all_data(leitura)
+    
+    def _load_all_data(self, db: Session) -> Dict[str, List[Dict[str, Any]]]:
+        """Executa as consultas de _get_all_data na sessão recebida."""
+        # Recuperar vínculos professor-disciplina numa única consulta
+        disciplinas_por_professor: Dict[int, List[int]] = {}
+        for professor_id, disciplina_id in db.execute(
+            select(professor_disciplina.c.professor_id, professor_disciplina.c.disciplina_id)
+        ):
+            disciplinas_por_professor.setdefault(professor_id, []).append(disciplina_id)
+        
         # Recuperar professores
         professors = db.query(Professor).all()
         professors_data = [
@@ -33,7 +72,8 @@ class GradeService:
                 "id": p.id,
                 "nome": p.nome,
                 "email": p.email,
-                "area": p.area
+                "area": p.area,
+                "disciplinas": sorted(disciplinas_por_professor.get(p.id, []))
             }
             for p in professors
         ]
@@ -83,39 +123,94 @@ class GradeService:
         }
     
     
-    def generate_initial_schedule(self, db: Session) -> Dict[str, Any]:
+    def generate_initial_schedule(self, db: Session, params: Optional[Dict[str, Any]] = None,
+                                  deve_parar: Optional[Callable[[], bool]] = None,
+                                  progresso: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
-        Gera uma grade inicial otimizada.
+        Gera uma grade inicial otimizada usando o motor local de restrições.
         
         Args:
             db: Sessão do banco de dados
+            params: Parâmetros opcionais do motor (ver SolverConfig)
+            deve_parar: Callback de cancelamento consultado durante a execução
+            progresso: Callback que recebe relatórios de progresso do motor
             
         Returns:
             Grade otimizada
         """
         # Recuperar todos os dados
         data = self._get_all_data(db)
-        
-        # Gerar grade otimizada usando o serviço de IA
-        result = ai_service.generate_schedule_optimization(
-            professors=data["professors"],
-            courses=data["courses"],
-            classes=data["classes"],
-            rules=data["rules"]
-        )
-        
-        if result["success"]:
-            # Aqui você poderia salvar a grade gerada no banco de dados
-            # ou fazer qualquer processamento adicional
+        return self.generate_from_data(data, params, deve_parar=deve_parar, progresso=progresso)
+    
+    def generate_from_data(self, data: Dict[str, List[Dict[str, Any]]], params: Optional[Dict[str, Any]] = None,
+                           deve_parar: Optional[Callable[[], bool]] = None,
+                           progresso: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Gera a grade a partir dos dados já carregados (ver _get_all_data),
+        sem usar o banco: pode rodar fora da sessão, numa thread à parte.
+        """
+        if not data["classes"]:
             return {
-                "schedule": result["schedule"],
-                "message": "Grade inicial gerada com sucesso!"
+                "error": "Nenhuma turma cadastrada",
+                "message": "Falha ao gerar grade inicial: cadastre turmas antes de gerar a grade."
             }
-        else:
+        if not data["professors"]:
             return {
-                "error": result.get("error", "Erro desconhecido"),
-                "message": "Falha ao gerar grade inicial."
+                "error": "Nenhum professor cadastrado",
+                "message": "Falha ao gerar grade inicial: cadastre professores antes de gerar a grade."
             }
+        
+        params = dict(params or {})
+        tentativas = params.pop("tentativas", None)
+        workers = params.pop("workers", None)
+        
+        try:
+            config = SolverConfig.from_dict(params)
+            problem = build_problem(data, config)
+        except (TypeError, ValueError) as e:
+            return {"error": str(e), "message": f"Parâmetros inválidos: {str(e)}"}
+        
+        if (tentativas or 1) > 1 or (workers or 1) > 1:
+            # Várias tentativas com seeds diferentes, uma por processo
+            result, resumo = solve_multistart(
+                problem, tentativas=tentativas, workers=workers,
+                tempo_limite=config.tempo_limite, deve_parar=deve_parar, progresso=progresso
+            )
+            if result is None:
+                return {
+                    "error": "Nenhuma tentativa concluída",
+                    "tentativas": resumo,
+                    "message": "Falha ao gerar grade inicial: nenhuma tentativa terminou dentro do tempo limite."
+                }
+            schedule = result.to_dict()
+            schedule["tentativas"] = resumo
+        else:
+            result = solve(problem, deve_parar=deve_parar, progresso=progresso)
+            schedule = result.to_dict()
+        
+        message = "Grade inicial gerada com sucesso!"
+        if result.nao_alocadas:
+            message = "Grade inicial gerada, mas algumas aulas não puderam ser alocadas."
+        return {
+            "schedule": schedule,
+            "message": message
+        }
+    
+    def _enriquecer_feedback(self, feedback: str) -> str:
+        """Acrescenta ao feedback as regras cadastradas mais relevantes (RAG)."""
+        try:
+            relevant_rules = rag_service.search_relevant_rules(feedback)
+            
+            # Enriquecer o feedback com regras relevantes, se houver
+            enhanced_feedback = feedback
+            if relevant_rules:
+                enhanced_feedback += "\n\nRegras relevantes para considerar:\n"
+                for rule in relevant_rules:
+                    enhanced_feedback += f"\n{rule['content']}\n"
+            return enhanced_feedback
+        except Exception as e:
+            print(f"Erro ao usar RAG: {e}. Continuando sem enriquecimento de feedback.")
+            return feedback
     
     def refine_schedule_with_feedback(self, feedback: str, db: Session) -> Dict[str, Any]:
         """
@@ -132,26 +227,22 @@ class GradeService:
             return {"error": "Nenhum feedback fornecido", "message": "Forneça um feedback válido."}
         
         try:
-            # Usar RAG para encontrar regras relevantes com base no feedback
-            try:
-                relevant_rules = rag_service.search_relevant_rules(feedback)
-                
-                # Enriquecer o feedback com regras relevantes, se houver
-                enhanced_feedback = feedback
-                if relevant_rules:
-                    enhanced_feedback += "\n\nRegras relevantes para considerar:\n"
-                    for rule in relevant_rules:
-                        enhanced_feedback += f"\n{rule['content']}\n"
-            except Exception as e:
-                print(f"Erro ao usar RAG: {e}. Continuando sem enriquecimento de feedback.")
-                enhanced_feedback = feedback
+            # Professores mencionados: detectados localmente no texto do
+            # usuário (as regras do RAG citariam outros professores)
+            professores = ai_service.extrair_professores_do_texto(feedback, db)
+            enhanced_feedback = self._enriquecer_feedback(feedback)
             
-            # Chama a IA para interpretar o feedback e refinar a grade
-            result = ai_service.refine_schedule_with_feedback(enhanced_feedback, db)
+            # Chama a IA para extrair as regras e refinar a grade
+            result = ai_service.refine_schedule_with_feedback(enhanced_feedback, db, professores=professores)
             
             if result["success"]:
+                schedule = result["schedule"]
+                novas_regras = result.get("regras") or []
+                if novas_regras:
+                    # Aplica as regras novas reparando só as aulas afetadas
+                    schedule = self.repair_schedule_for_rules(db, novas_regras)
                 return {
-                    "schedule": result["schedule"],
+                    "schedule": schedule,
                     "message": "Grade refinada com sucesso!"
                 }
             else:
@@ -170,114 +261,264 @@ class GradeService:
                 "message": f"Falha ao refinar a grade: {str(e)}"
             }
     
+    def repair_schedule_for_rules(self, db: Session, novas_regras: List[Dict[str, Any]],
+                                  params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Repara a grade salva para atender regras novas, realocando apenas as
+        aulas que as violam e uma vizinhança limitada ao redor delas.
+        
+        Args:
+            db: Sessão do banco de dados
+            novas_regras: Regras recém-criadas (id, tipo, condicoes)
+            params: Parâmetros opcionais do motor (seed, vizinhanca, ...)
+            
+        Returns:
+            Grade reparada (entries no formato de /grade/save) e alterações
+        """
+        horarios, data = self._carregar_reparo(db)
+        return self.repair_from_data(horarios, data, novas_regras, params)
+    
+    def _carregar_reparo(self, db: Session) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, List[Dict[str, Any]]]]]:
+        """Grade salva (com nomes) e dados do problema usados pelo reparo."""
+        rows = (
+            db.query(
+                Horario.id, Horario.dia_semana, Horario.hora_inicio, Horario.hora_fim,
+                Horario.sala, Horario.professor_id, Horario.turma_id,
+                Professor.nome.label("professor_nome"),
+                Turma.codigo.label("turma_codigo"),
+                Disciplina.nome.label("disciplina_nome")
+            )
+            .join(Professor, Horario.professor_id == Professor.id)
+            .join(Turma, Horario.turma_id == Turma.id)
+            .join(Disciplina, Turma.disciplina_id == Disciplina.id)
+            .order_by(Horario.id)
+            .all()
+        )
+        horarios = [row._asdict() for row in rows]
+        if not horarios:
+            return horarios, None
+        # As regras novas acabaram de ser gravadas: lê da primária
+        return horarios, self._get_all_data(db, usar_replica=False)
+    
+    def repair_from_data(self, horarios: List[Dict[str, Any]], data: Optional[Dict[str, List[Dict[str, Any]]]],
+                         novas_regras: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Executa o reparo sobre dados já carregados (ver _carregar_reparo)."""
+        if not horarios:
+            return {
+                "entries": [],
+                "alteracoes": [],
+                "avisos": ["Nenhuma grade salva para reparar; as regras serão usadas na próxima geração."]
+            }
+        params = dict(params or {})
+        vizinhanca = params.pop("vizinhanca", None)
+        config = SolverConfig.from_dict({**infer_grid(horarios), **params})
+        problem = build_problem(data, config)
+        kwargs = {"vizinhanca": vizinhanca} if vizinhanca is not None else {}
+        return repair_schedule(problem, horarios, novas_regras, **kwargs).to_dict()
+    
+    def score_schedule(self, db: Session, entries: Optional[List[Dict[str, Any]]] = None,
+                       params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Pontua uma grade: restrições rígidas violadas e custos flexíveis
+        (janelas, desequilíbrio diário, preferências, carga horária).
+        
+        Args:
+            db: Sessão do banco de dados
+            entries: Entradas no formato de /grade/save; sem elas, pontua a
+                grade salva
+            params: dias/horarios da grade (padrão: deduzidos das aulas)
+            
+        Returns:
+            Pontuação total e por componente
+        """
+        with read_session(db) as leitura:
+            data = self._load_all_data(leitura)
+            if entries is None:
+                rows = [
+                    row._asdict() for row in leitura.query(
+                        Horario.dia_semana, Horario.hora_inicio, Horario.hora_fim,
+                        Horario.sala, Horario.professor_id, Horario.turma_id
+                    )
+                ]
+        
+        if entries is not None:
+            rows = entries
+            intervalos = []
+            for entry in entries:
+                partes = str(entry.get("Horário") or "").split("-")
+                if len(partes) == 2:
+                    intervalos.append({"dia_semana": entry.get("Dia"), "hora_inicio": partes[0], "hora_fim": partes[1]})
+        else:
+            intervalos = rows
+        
+        config = SolverConfig.from_dict({**infer_grid(intervalos), **(params or {})})
+        problem = build_problem(data, config)
+        scorer = ScheduleScorer(problem)
+        resultado = scorer.score(scorer.encode(rows))
+        resultado["origem"] = "entries" if entries is not None else "grade_salva"
+        return resultado
+    
+    def _parse_intervalo(self, horario_str: str) -> Tuple[time, time]:
+        """Converte "08:00-09:00" em (hora_inicio, hora_fim)."""
+        partes = (horario_str or "").split("-")
+        if len(partes) != 2:
+            raise ValueError(f"Formato de horário inválido: {horario_str}")
+        inicio, fim = parse_hora(partes[0]), parse_hora(partes[1])
+        if inicio is None or fim is None or inicio >= 24 * 60 or fim >= 24 * 60:
+            raise ValueError(f"Formato de horário inválido: {horario_str}")
+        if fim <= inicio:
+            raise ValueError(f"Horário termina antes de começar: {horario_str}")
+        return time(inicio // 60, inicio % 60), time(fim // 60, fim % 60)
+    
+    def _bulk_insert_horarios(self, db: Session, rows: List[Dict[str, Any]]):
+        """
+        Insere os horários em lote na transação corrente: COPY no PostgreSQL
+        (psycopg2) e executemany nos demais bancos.
+        """
+        bind = db.get_bind()
+        if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+            colunas = ["dia_semana", "hora_inicio", "hora_fim", "sala", "professor_id", "turma_id"]
+            buffer = io.StringIO()
+            # Strings entre aspas: no COPY CSV, vazio sem aspas vira NULL
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+            for row in rows:
+                writer.writerow([
+                    row["dia_semana"], row["hora_inicio"].isoformat(), row["hora_fim"].isoformat(),
+                    row["sala"], row["professor_id"], row["turma_id"]
+                ])
+            buffer.seek(0)
+            cursor = db.connection().connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {Horario.__tablename__} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            finally:
+                cursor.close()
+        else:
+            db.execute(insert(Horario), rows)
+    
     def save_schedule_to_database(self, db: Session, schedule_data: Dict[str, Any]) -> Tuple[bool, str]:
         """
         Salva a grade otimizada no banco de dados.
         
+        Professores e turmas são resolvidos com uma consulta IN cada; todas as
+        entradas são validadas antes de qualquer escrita e a grade é gravada
+        numa única transação, com inserção em lote.
+        
         Args:
             db: Sessão do banco de dados
             schedule_data: Dados da grade otimizada
             
         Returns:
             Tupla (sucesso, mensagem)
+            
+        Raises:
+            ScheduleValidationError: Entradas inválidas ou em conflito, com
+                os erros de cada uma
         """
         try:
-            # Adicionar logs detalhados
-            print(f"Recebendo dados para salvar: {schedule_data}")
-            
             entries = schedule_data.get("entries", [])
             if not entries:
-                return False, "Nenhuma entrada de horário para salvar"
+                raise ScheduleValidationError("Nenhuma entrada de horário para salvar")
             
             print(f"Número de entradas a salvar: {len(entries)}")
             
-            # Verificar cada entrada para diagnóstico
-            for i, entry in enumerate(entries):
-                print(f"Entrada {i+1}: {entry}")
+            # Resolver nomes e códigos de uma vez
+            nomes = {e.get("Professor") for e in entries if e.get("Professor")}
+            codigos = {e.get("Turma") for e in entries if e.get("Turma")}
+            professores_por_nome: Dict[str, int] = {}
+            if nomes:
+                # Em caso de nomes repetidos vale o professor de menor id
+                for professor_id, nome in (
+                    db.query(Professor.id, Professor.nome)
+                    .filter(Professor.nome.in_(nomes))
+                    .order_by(Professor.id.desc())
+                ):
+                    professores_por_nome[nome] = professor_id
+            turmas_por_codigo: Dict[str, int] = {}
+            if codigos:
+                turmas_por_codigo = dict(
+                    db.query(Turma.codigo, Turma.id).filter(Turma.codigo.in_(codigos)).all()
+                )
             
-            # Converter a grade em objetos Horario e salvar
+            # Validar todas as entradas antes de escrever
             horarios = []
-            
-            for entry in entries:
+            erros = []
+            for i, entry in enumerate(entries, start=1):
+                erros_entrada = []
+                professor_name = entry.get("Professor")
+                professor_id = professores_por_nome.get(professor_name)
+                if professor_id is None:
+                    erros_entrada.append(f"Professor não encontrado: {professor_name}")
+                
+                turma_code = entry.get("Turma")
+                turma_id = turmas_por_codigo.get(turma_code)
+                if turma_id is None:
+                    erros_entrada.append(f"Turma não encontrada: {turma_code}")
+                
                 try:
-                    # Encontrar o ID do professor pelo nome
-                    professor_name = entry.get("Professor")
-                    professor = db.query(Professor).filter(Professor.nome == professor_name).first()
-                    if not professor:
-                        print(f"Professor não encontrado: {professor_name}")
-                        return False, f"Professor não encontrado: {professor_name}"
-                    
-                    # Encontrar o ID da turma pelo código
-                    turma_code = entry.get("Turma")
-                    turma = db.query(Turma).filter(Turma.codigo == turma_code).first()
-                    if not turma:
-                        print(f"Turma não encontrada: {turma_code}")
-                        return False, f"Turma não encontrada: {turma_code}"
-                    
-                    # Processar o formato de horário (ex: "08:00-09:00")
-                    horario_str = entry.get("Horário", "")
-                    print(f"Processando horário: {horario_str}")
-                    
-                    if "-" in horario_str:
-                        hora_inicio_str, hora_fim_str = horario_str.split("-")
-                        
-                        # Converter para o formato adequado do banco de dados
-                        hora_inicio = time(
-                            int(hora_inicio_str.split(":")[0]), 
-                            int(hora_inicio_str.split(":")[1])
-                        )
-                        hora_fim = time(
-                            int(hora_fim_str.split(":")[0]), 
-                            int(hora_fim_str.split(":")[1])
-                        )
-                        
-                        print(f"Hora início: {hora_inicio}, Hora fim: {hora_fim}")
-                    else:
-                        print(f"Formato de horário inválido: {horario_str}")
-                        return False, f"Formato de horário inválido: {horario_str}"
-                    
-                    # Criar objeto Horario
-                    horario = Horario(
-                        dia_semana=entry.get("Dia", ""),
-                        hora_inicio=hora_inicio,
-                        hora_fim=hora_fim,
-                        sala=entry.get("Sala", ""),
-                        professor_id=professor.id,
-                        turma_id=turma.id
-                    )
-                    
-                    print(f"Horário criado: {horario}")
-                    horarios.append(horario)
-                    
-                except Exception as e:
-                    print(f"Erro ao processar entrada {entry}: {e}")
-                    error_details = traceback.format_exc()
-                    print(f"Detalhes do erro: {error_details}")
-                    return False, f"Erro ao processar entrada: {str(e)}"
+                    hora_inicio, hora_fim = self._parse_intervalo(entry.get("Horário", ""))
+                except ValueError as e:
+                    erros_entrada.append(str(e))
+                
+                if not entry.get("Dia"):
+                    erros_entrada.append("Dia da semana não informado")
+                
+                if erros_entrada:
+                    erros.append(f"Entrada {i}: " + "; ".join(erros_entrada))
+                    continue
+                
+                horarios.append({
+                    "dia_semana": entry.get("Dia", ""),
+                    "hora_inicio": hora_inicio,
+                    "hora_fim": hora_fim,
+                    "sala": entry.get("Sala", ""),
+                    "professor_id": professor_id,
+                    "turma_id": turma_id
+                })
             
-            # Adicionar ao banco de dados
-            if horarios:
-                try:
-                    print(f"Salvando {len(horarios)} horários")
-                    
-                    # Limpar horários existentes (opcional)
-                    db.query(Horario).delete()
-                    
-                    # Adicionar novos horários
-                    db.add_all(horarios)
-                    db.commit()
-                    print("Commit realizado com sucesso")
-                    
-                    return True, f"{len(horarios)} horários salvos com sucesso"
-                except Exception as e:
-                    db.rollback()
-                    print(f"Erro ao salvar no banco: {e}")
-                    error_details = traceback.format_exc()
-                    print(f"Detalhes do erro: {error_details}")
-                    return False, f"Erro ao salvar no banco: {str(e)}"
-            else:
-                return False, "Nenhum horário válido para salvar"
+            if erros:
+                print(f"{len(erros)} entrada(s) inválida(s) na grade")
+                raise ScheduleValidationError(f"{len(erros)} entrada(s) inválida(s)", erros)
+            
+            # Verificar choques de professor, turma e sala dentro da nova grade
+            conflitos = find_all_conflicts(
+                dict(h, id=i + 1) for i, h in enumerate(horarios)
+            )
+            if conflitos:
+                descricoes = [
+                    f"{c['recurso']} {c['chave']} em {c['dia_semana']} "
+                    f"(entradas {c['horarios'][0]} e {c['horarios'][1]}: {', '.join(c['intervalos'])})"
+                    for c in conflitos
+                ]
+                raise ScheduleValidationError(f"A grade possui {len(conflitos)} conflito(s)", descricoes)
+            
+            # Substituir a grade numa única transação; a trava da versão de
+            # horarios a serializa com as escritas avulsas (conflict_index)
+            try:
+                lock_version(db, Horario.__tablename__)
+                db.query(Horario).delete(synchronize_session=False)
+                self._bulk_insert_horarios(db, horarios)
+                # O COPY não passa pelos eventos do ORM
+                bump_versions(db, [Horario.__tablename__])
+                weekly_grids.mark_all(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Erro ao salvar no banco: {e}")
+                error_details = traceback.format_exc()
+                print(f"Detalhes do erro: {error_details}")
+                return False, f"Erro ao salvar no banco: {str(e)}"
+            finally:
+                # A grade inteira mudou (ou pode ter mudado): o índice é
+                # recarregado na próxima consulta, fora desta transação
+                conflict_index.clear()
+            print(f"{len(horarios)} horários salvos com sucesso")
+            return True, f"{len(horarios)} horários salvos com sucesso"
             
+        except ScheduleValidationError:
+            raise
         except Exception as e:
             db.rollback()
             print(f"Erro geral ao salvar grade: {e}")
@@ -285,5 +526,66 @@ class GradeService:
             print(f"Detalhes do erro: {error_details}")
             return False, f"Erro geral ao salvar grade: {str(e)}"
 
+    # Variantes assíncronas: o banco é acessado pela AsyncSession e o que é
+    # CPU (motor) ou chamada externa (RAG, LLM) roda numa thread, sem
+    # segurar conexão do pool nesse meio tempo
+    
+    async def generate_initial_schedule_async(self, db: AsyncSession,
+                                              params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Versão assíncrona de generate_initial_schedule."""
+        # A sessão recebida já aponta para a réplica, se houver
+        data = await db.run_sync(self._get_all_data, False)
+        await db.close()
+        return await asyncio.to_thread(self.generate_from_data, data, params)
+    
+    async def refine_schedule_with_feedback_async(self, feedback: str, db: AsyncSession) -> Dict[str, Any]:
+        """Versão assíncrona de refine_schedule_with_feedback."""
+        if not feedback:
+            return {"error": "Nenhum feedback fornecido", "message": "Forneça um feedback válido."}
+        
+        try:
+            professores = await db.run_sync(
+                lambda sessao: ai_service.extrair_professores_do_texto(feedback, sessao)
+            )
+            enhanced_feedback = await asyncio.to_thread(self._enriquecer_feedback, feedback)
+            try:
+                analise = await asyncio.to_thread(ai_service.analisar_feedback, enhanced_feedback, professores)
+            except Exception as e:
+                print(f"Erro ao analisar feedback: {e}")
+                return {"error": "Erro ao extrair regras da IA.", "message": "Falha ao refinar a grade."}
+            
+            result = await db.run_sync(
+                lambda sessao: ai_service.refine_schedule_with_feedback(enhanced_feedback, sessao, analise=analise)
+            )
+            if not result["success"]:
+                error_msg = result.get("error", "Erro desconhecido")
+                print(f"Erro ao refinar grade: {error_msg}")
+                return {
+                    "error": error_msg,
+                    "message": f"Falha ao refinar a grade: {error_msg}"
+                }
+            
+            schedule = result["schedule"]
+            novas_regras = result.get("regras") or []
+            if novas_regras:
+                horarios, data = await db.run_sync(self._carregar_reparo)
+                await db.close()
+                schedule = await asyncio.to_thread(self.repair_from_data, horarios, data, novas_regras)
+            return {
+                "schedule": schedule,
+                "message": "Grade refinada com sucesso!"
+            }
+        except Exception as e:
+            print(f"Erro geral no método refine_schedule_with_feedback_async: {e}")
+            traceback.print_exc()
+            return {
+                "error": str(e),
+                "message": f"Falha ao refinar a grade: {str(e)}"
+            }
+    
+    async def save_schedule_to_database_async(self, db: AsyncSession, schedule_data: Dict[str, Any]) -> Tuple[bool, str]:
+        """Versão assíncrona de save_schedule_to_database."""
+        return await db.run_sync(self.save_schedule_to_database, schedule_data)
+
 # Instância singleton do serviço
 grade_service = GradeService()
\ No newline at end of file
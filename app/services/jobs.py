@@ -0,0 +1,283 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Estados de um job
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+CANCELADO = "cancelado"
+
+FINALIZADOS = {CONCLUIDO, FALHOU, CANCELADO}
+
+
+class QueueFullError(Exception):
+    """A fila de jobs atingiu o limite de jobs pendentes."""
+
+
+@dataclass
+class Job:
+    """Uma operação longa (geração ou refinamento de grade) executada em segundo plano."""
+
+    id: str
+    tipo: str
+    status: str = PENDENTE
+    criado_em: datetime = field(default_factory=datetime.utcnow)
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+    resultado: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+    cancelamento_solicitado: bool = False
+    # Pedido de encerramento antecipado aceitando a melhor grade até agora
+    aceite_antecipado: bool = False
+    progresso: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "status": self.status,
+            "criado_em": self.criado_em.isoformat(),
+            "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+            "concluido_em": self.concluido_em.isoformat() if self.concluido_em else None,
+            "resultado": self.resultado,
+            "erro": self.erro,
+            "cancelamento_solicitado": self.cancelamento_solicitado,
+            "aceite_antecipado": self.aceite_antecipado,
+            "progresso": self.progresso,
+        }
+
+
+class JobStore(ABC):
+    """
+    Armazenamento de jobs. Implementações alternativas (banco, Redis)
+    implementam estes métodos.
+    """
+
+    @abstractmethod
+    def save(self, job: Job):
+        """Grava (ou regrava) o estado do job."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job pelo id, ou None se não existe."""
+
+    @abstractmethod
+    def list(self) -> List[Job]:
+        """Todos os jobs guardados."""
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        """Remove o job, se existir."""
+
+
+class InMemoryJobStore(JobStore):
+    """Armazena os jobs na memória do processo, descartando os finalizados mais antigos."""
+
+    def __init__(self, max_jobs: int = 500):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            if len(self._jobs) > self.max_jobs:
+                for antigo in [j for j in self._jobs.values() if j.status in FINALIZADOS]:
+                    if len(self._jobs) <= self.max_jobs:
+                        break
+                    del self._jobs[antigo.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+class JobContext:
+    """
+    Passado à função do job para que ela possa verificar o cancelamento e
+    publicar o progresso.
+
+    `job` é a cópia do worker, a única gravada no store enquanto o job
+    existe neste processo: cancel e accept marcam os pedidos nela, e não
+    no objeto devolvido por store.get, que num store fora da memória é
+    outra cópia e seria sobrescrito pela próxima gravação do worker.
+    """
+
+    def __init__(self, job: Job, store: JobStore):
+        self.job = job
+        self.store = store
+        self.cancel_event = threading.Event()
+
+    def deve_parar(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancelar(self):
+        """Pede o cancelamento: o job termina como cancelado."""
+        self.job.cancelamento_solicitado = True
+        self.cancel_event.set()
+
+    def aceitar(self):
+        """Pede o encerramento antecipado, ficando com a melhor grade até agora."""
+        self.job.aceite_antecipado = True
+        self.cancel_event.set()
+
+    def reportar(self, progresso: Dict[str, Any]):
+        self.job.progresso = progresso
+        self.store.save(self.job)
+
+
+class JobQueue:
+    """
+    Fila de jobs com pool limitado de workers, limite de jobs pendentes e
+    cancelamento. Jobs na fila são cancelados imediatamente; jobs em
+    execução recebem um pedido de cancelamento cooperativo.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, max_workers: int = 2, max_pendentes: int = 10):
+        self.store = store or InMemoryJobStore()
+        self.max_workers = max_workers
+        self.max_pendentes = max_pendentes
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._controles: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="grade-job")
+        return self._executor
+
+    def pending_count(self) -> int:
+        return sum(1 for job in self.store.list() if job.status == PENDENTE)
+
+    def submit(self, tipo: str, func: Callable[[JobContext], Dict[str, Any]]) -> Job:
+        """
+        Enfileira uma função para execução em segundo plano.
+
+        Args:
+            tipo: Tipo do job (ex: "generate", "refine")
+            func: Função que recebe o JobContext e retorna o resultado
+
+        Returns:
+            O job criado
+
+        Raises:
+            QueueFullError: se já houver max_pendentes jobs aguardando
+        """
+        with self._lock:
+            if self.pending_count() >= self.max_pendentes:
+                raise QueueFullError(
+                    f"Fila cheia: {self.max_pendentes} jobs aguardando execução"
+                )
+            job = Job(id=uuid.uuid4().hex, tipo=tipo)
+            contexto = JobContext(job, self.store)
+            self.store.save(job)
+            future = self._get_executor().submit(self._run, contexto, func)
+            self._controles[job.id] = (future, contexto)
+        return job
+
+    def _run(self, contexto: JobContext, func: Callable[[JobContext], Dict[str, Any]]):
+        job = contexto.job
+        if contexto.deve_parar():
+            job.status = CANCELADO
+            job.concluido_em = datetime.utcnow()
+            self.store.save(job)
+            with self._lock:
+                self._controles.pop(job.id, None)
+            return
+        job.status = EXECUTANDO
+        job.iniciado_em = datetime.utcnow()
+        self.store.save(job)
+        try:
+            resultado = func(contexto)
+            if job.cancelamento_solicitado:
+                job.status = CANCELADO
+                job.resultado = resultado
+            elif isinstance(resultado, dict) and "error" in resultado:
+                job.status = FALHOU
+                job.erro = resultado.get("message") or str(resultado["error"])
+                job.resultado = resultado
+            else:
+                job.status = CONCLUIDO
+                job.resultado = resultado
+        except Exception as e:
+            traceback.print_exc()
+            job.status = FALHOU
+            job.erro = str(e)
+        finally:
+            job.concluido_em = datetime.utcnow()
+            self.store.save(job)
+            with self._lock:
+                self._controles.pop(job.id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela um job pendente ou pede a interrupção de um job em execução."""
+        job = self.store.get(job_id)
+        if job is None or job.status in FINALIZADOS:
+            return job
+        with self._lock:
+            controle = self._controles.get(job_id)
+        if controle is None:
+            # Sem worker neste processo: o pedido fica registrado no store
+            job.cancelamento_solicitado = True
+            self.store.save(job)
+            return job
+        future, contexto = controle
+        contexto.cancelar()
+        if future.cancel():
+            contexto.job.status = CANCELADO
+            contexto.job.concluido_em = datetime.utcnow()
+            with self._lock:
+                self._controles.pop(job_id, None)
+        self.store.save(contexto.job)
+        return contexto.job
+
+    def accept(self, job_id: str) -> Optional[Job]:
+        """
+        Pede que um job em execução termine agora, devolvendo a melhor grade
+        obtida até o momento como resultado normal.
+        """
+        job = self.store.get(job_id)
+        if job is None or job.status != EXECUTANDO:
+            return job
+        with self._lock:
+            controle = self._controles.get(job_id)
+        if controle is None:
+            return job
+        contexto = controle[1]
+        contexto.aceitar()
+        self.store.save(contexto.job)
+        return contexto.job
+
+    def shutdown(self):
+        for _, contexto in list(self._controles.values()):
+            contexto.cancel_event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instância singleton da fila de jobs
+job_queue = JobQueue(
+    max_workers=int(os.getenv("GRADE_JOB_WORKERS", "2")),
+    max_pendentes=int(os.getenv("GRADE_JOB_MAX_PENDENTES", "10")),
+)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+def normalize_prompt_input(texto: str) -> str:
+    """Normaliza a entrada do usuário para a chave do cache (Unicode NFC, espaços colapsados)."""
+    return " ".join(unicodedata.normalize("NFC", texto or "").split())
+
+
+class LLMCache:
+    """
+    Cache de respostas do LLM em dois níveis.
+
+    O primeiro nível é um LRU em memória com TTL; o segundo, opcional, é um
+    arquivo SQLite que sobrevive a reinicializações. A chave é o hash do
+    modelo, do template do prompt (nome e versão) e da entrada normalizada,
+    então mudar o prompt basta trocar a versão para invalidar as respostas
+    antigas.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._memoria: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conexao: Optional[sqlite3.Connection] = None
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self.escritas = 0
+        if path:
+            try:
+                path = os.path.expanduser(path)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conexao = sqlite3.connect(path, check_same_thread=False)
+                self._conexao.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira_em REAL NOT NULL)"
+                )
+                self._conexao.commit()
+            except (sqlite3.Error, OSError) as e:
+                print(f"AVISO: cache persistente do LLM desativado: {e}")
+                self._conexao = None
+
+    @staticmethod
+    def make_key(modelo: str, template: str, versao: str, entrada: str) -> str:
+        bruto = json.dumps([modelo, template, versao, normalize_prompt_input(entrada)], ensure_ascii=False)
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    def get(self, chave: str) -> Optional[Any]:
+        agora = time.time()
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None:
+                expira_em, valor = item
+                if expira_em > agora:
+                    self._memoria.move_to_end(chave)
+                    self.hits_memoria += 1
+                    return valor
+                del self._memoria[chave]
+
+            if self._conexao is not None:
+                try:
+                    row = self._conexao.execute(
+                        "SELECT valor, expira_em FROM llm_cache WHERE chave = ?", (chave,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Erro ao ler cache persistente do LLM: {e}")
+                    row = None
+                if row is not None and row[1] > agora:
+                    valor = json.loads(row[0])
+                    self._guardar_em_memoria(chave, valor, row[1])
+                    self.hits_disco += 1
+                    return valor
+
+            self.misses += 1
+            return None
+
+    def _guardar_em_memoria(self, chave: str, valor: Any, expira_em: float):
+        self._memoria[chave] = (expira_em, valor)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_entries:
+            self._memoria.popitem(last=False)
+
+    def set(self, chave: str, valor: Any):
+        expira_em = time.time() + self.ttl
+        with self._lock:
+            self._guardar_em_memoria(chave, valor, expira_em)
+            self.escritas += 1
+            if self._conexao is not None:
+                try:
+                    self._conexao.execute(
+                        "INSERT OR REPLACE INTO llm_cache (chave, valor, expira_em) VALUES (?, ?, ?)",
+                        (chave, json.dumps(valor, ensure_ascii=False), expira_em)
+                    )
+                    self._conexao.execute("DELETE FROM llm_cache WHERE expira_em <= ?", (time.time(),))
+                    self._conexao.commit()
+                except sqlite3.Error as e:
+                    print(f"Erro ao gravar cache persistente do LLM: {e}")
+
+    def get_or_compute(self, chave: str, calcular: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula, guarda e retorna. Valores None não são guardados."""
+        valor = self.get(chave)
+        if valor is not None:
+            return valor
+        valor = calcular()
+        if valor is not None:
+            self.set(chave, valor)
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._memoria.clear()
+            if self._conexao is not None:
+                self._conexao.execute("DELETE FROM llm_cache")
+                self._conexao.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        consultas = self.hits_memoria + self.hits_disco + self.misses
+        return {
+            "entradas_em_memoria": len(self._memoria),
+            "hits_memoria": self.hits_memoria,
+            "hits_disco": self.hits_disco,
+            "misses": self.misses,
+            "escritas": self.escritas,
+            "taxa_acerto": round((self.hits_memoria + self.hits_disco) / consultas, 4) if consultas else 0.0,
+            "persistente": self._conexao is not None,
+            "ttl_segundos": self.ttl,
+        }
+
+
+def cache_from_env() -> LLMCache:
+    """Cria o cache a partir de LLM_CACHE_MAX, LLM_CACHE_TTL e LLM_CACHE_PATH."""
+    return LLMCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX", "1024")),
+        ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+        path=os.getenv("LLM_CACHE_PATH") or None,
+    )
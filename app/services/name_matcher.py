@@ -0,0 +1,214 @@
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.professor import Professor
+from app.models.tabela_versao import get_version
+from app.services.text_utils import normalize_text
+
+
+@dataclass
+class NameMention:
+    """Trecho do texto que corresponde a um ou mais professores cadastrados."""
+
+    trecho: str
+    inicio: int
+    fim: int
+    professores: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def ambigua(self) -> bool:
+        return len(self.professores) > 1
+
+
+class NameAutomaton:
+    """
+    Autômato de Aho–Corasick sobre nomes normalizados (sem acentos e sem
+    caixa). Encontra todas as ocorrências em uma única passada pelo texto,
+    independentemente do número de nomes.
+    """
+
+    def __init__(self, padroes: Dict[str, Set[int]]):
+        # Cada nó: transições, link de falha e padrões que terminam nele
+        self._goto: List[Dict[str, int]] = [{}]
+        self._falha: List[int] = [0]
+        self._saida: List[List[str]] = [[]]
+        self.padroes = padroes
+        for padrao in padroes:
+            self._inserir(padrao)
+        self._construir_falhas()
+
+    def _inserir(self, padrao: str):
+        no = 0
+        for c in padrao:
+            proximo = self._goto[no].get(c)
+            if proximo is None:
+                proximo = len(self._goto)
+                self._goto[no][c] = proximo
+                self._goto.append({})
+                self._falha.append(0)
+                self._saida.append([])
+            no = proximo
+        self._saida[no].append(padrao)
+
+    def _construir_falhas(self):
+        fila = deque(self._goto[0].values())
+        while fila:
+            no = fila.popleft()
+            for c, filho in self._goto[no].items():
+                fila.append(filho)
+                f = self._falha[no]
+                while f and c not in self._goto[f]:
+                    f = self._falha[f]
+                destino = self._goto[f].get(c, 0)
+                self._falha[filho] = destino if destino != filho else 0
+                self._saida[filho] = self._saida[filho] + self._saida[self._falha[filho]]
+
+    def find(self, texto: str) -> List[Tuple[int, int, str]]:
+        """
+        Ocorrências (início, fim, padrão) em texto já normalizado, só em
+        limites de palavra e sem sobreposição (vence a mais à esquerda e,
+        em empate, a mais longa).
+        """
+        encontrados = []
+        no = 0
+        for i, c in enumerate(texto):
+            while no and c not in self._goto[no]:
+                no = self._falha[no]
+            no = self._goto[no].get(c, 0)
+            for padrao in self._saida[no]:
+                inicio, fim = i - len(padrao) + 1, i + 1
+                if (inicio == 0 or not texto[inicio - 1].isalnum()) and (fim == len(texto) or not texto[fim].isalnum()):
+                    encontrados.append((inicio, fim, padrao))
+
+        encontrados.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        selecionados, limite = [], 0
+        for inicio, fim, padrao in encontrados:
+            if inicio >= limite:
+                selecionados.append((inicio, fim, padrao))
+                limite = fim
+        return selecionados
+
+
+class ProfessorNameIndex:
+    """
+    Índice local de nomes de professores para detectar menções no feedback
+    sem chamar o LLM.
+
+    O texto é buscado pelo nome completo, por "primeiro último" e pelo
+    primeiro ou último nome sozinho apenas quando ele identifica um único
+    professor: um nome avulso comum ("Ana", "Silva") compartilhado por
+    vários professores geraria menções falsas e ambíguas. resolve() ainda
+    aceita esses nomes parciais, mas devolve todos os professores que os
+    compartilham.
+
+    O autômato guarda a versão de professores em tabela_versoes com que foi
+    montado e é reconstruído no primeiro uso depois que ela muda, então
+    escritas feitas por outros workers ou processos também são vistas.
+    invalidate() descarta a cópia local na hora, para o próprio processo.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._automato: Optional[NameAutomaton] = None
+        self._nomes: Dict[int, str] = {}
+        self._parciais: Dict[str, Set[int]] = {}
+        # Versão de professores refletida pelo autômato
+        self.versao: Optional[int] = None
+
+    @property
+    def carregado(self) -> bool:
+        return self._automato is not None
+
+    def invalidate(self):
+        with self.lock:
+            self._automato = None
+            self._nomes = {}
+            self._parciais = {}
+            self.versao = None
+
+    def reset(self, professores: Iterable[Tuple[int, str]], versao: Optional[int] = None):
+        compostos: Dict[str, Set[int]] = {}
+        avulsos: Dict[str, Set[int]] = {}
+        nomes: Dict[int, str] = {}
+        for professor_id, nome in professores:
+            normalizado = normalize_text(nome)
+            if not normalizado:
+                continue
+            nomes[professor_id] = nome
+            partes = normalizado.split()
+            compostos.setdefault(normalizado, set()).add(professor_id)
+            if len(partes) > 2:
+                compostos.setdefault(f"{partes[0]} {partes[-1]}", set()).add(professor_id)
+            for parte in {partes[0], partes[-1]}:
+                avulsos.setdefault(parte, set()).add(professor_id)
+
+        # Nome avulso só vira padrão de busca se for de um único professor
+        # (e não coincidir com um nome completo de uma palavra só)
+        padroes = dict(compostos)
+        for parte, ids in avulsos.items():
+            if len(ids) == 1 and parte not in padroes:
+                padroes[parte] = ids
+        parciais = {parte: set(ids) for parte, ids in avulsos.items()}
+        for padrao, ids in compostos.items():
+            parciais.setdefault(padrao, set()).update(ids)
+
+        automato = NameAutomaton(padroes)
+        with self.lock:
+            self._automato = automato
+            self._nomes = nomes
+            self._parciais = parciais
+            self.versao = versao
+
+    def load(self, db: Session, versao: Optional[int] = None):
+        """Recarrega do banco; `versao` deve ter sido lida antes dos nomes."""
+        if versao is None:
+            versao = get_version(db, Professor.__tablename__)
+        self.reset(db.query(Professor.id, Professor.nome).all(), versao)
+
+    def ensure_loaded(self, db: Session) -> Tuple[NameAutomaton, Dict[int, str], Dict[str, Set[int]]]:
+        """
+        Carrega o índice se preciso (nunca carregado ou versão de
+        professores diferente da do banco) e devolve, lidos sob o lock, o
+        autômato, os nomes e os nomes parciais: um invalidate() concorrente
+        não afeta quem já tem a referência. A consulta ao banco é feita
+        fora do lock.
+        """
+        versao = get_version(db, Professor.__tablename__)
+        with self.lock:
+            em_dia = self.carregado and self.versao == versao
+        if not em_dia:
+            self.load(db, versao)
+        with self.lock:
+            return self._automato, self._nomes, self._parciais
+
+    def find_mentions(self, db: Session, texto: str) -> List[NameMention]:
+        """Menções a professores cadastrados no texto, na ordem em que aparecem."""
+        automato, nomes, _ = self.ensure_loaded(db)
+        normalizado = normalize_text(texto)
+        mencoes = []
+        for inicio, fim, padrao in automato.find(normalizado):
+            ids = sorted(automato.padroes[padrao])
+            mencoes.append(NameMention(
+                trecho=normalizado[inicio:fim],
+                inicio=inicio,
+                fim=fim,
+                professores=[(i, nomes[i]) for i in ids],
+            ))
+        return mencoes
+
+    def resolve(self, db: Session, nome: str) -> List[Tuple[int, str]]:
+        """
+        Professores cadastrados que correspondem a um nome (completo ou
+        parcial), ignorando acentos e caixa. Lista vazia se nenhum.
+        """
+        _, nomes, parciais = self.ensure_loaded(db)
+        ids = parciais.get(normalize_text(nome), set())
+        return [(i, nomes[i]) for i in sorted(ids)]
+
+
+# Instância singleton do índice de nomes
+professor_name_index = ProfessorNameIndex()
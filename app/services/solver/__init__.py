@@ -0,0 +1,35 @@
+"""
+Motor local de geração de grade escolar.
+
+Recebe o snapshot de GradeService._get_all_data e produz entradas de
+horário sem conflitos de professor, turma ou sala, de forma determinística
+para uma mesma seed.
+"""
+from app.services.solver.model import DIAS_PADRAO, HORARIOS_PADRAO, Problem, SolverConfig, build_problem
+from app.services.solver.engine import ScheduleSolver, ScheduleState, SolverResult, solve
+from app.services.solver.repair import RepairResult, infer_grid, repair_schedule
+from app.services.solver.parallel import solve_multistart, solver_pool
+from app.services.solver.scoring import EncodedSchedule, ScheduleScorer
+from app.services.solver.rules import CompiledRule, compile_rule, rule_compiler
+
+__all__ = [
+    "DIAS_PADRAO",
+    "HORARIOS_PADRAO",
+    "Problem",
+    "SolverConfig",
+    "build_problem",
+    "ScheduleSolver",
+    "ScheduleState",
+    "SolverResult",
+    "solve",
+    "RepairResult",
+    "infer_grid",
+    "repair_schedule",
+    "solve_multistart",
+    "solver_pool",
+    "EncodedSchedule",
+    "ScheduleScorer",
+    "CompiledRule",
+    "compile_rule",
+    "rule_compiler",
+]
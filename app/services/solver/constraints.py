@@ -0,0 +1,49 @@
+from typing import Any, Dict, List, Tuple
+
+from app.services.solver.model import Problem
+from app.services.solver.rules import rule_compiler
+from app.services.text_utils import normalize_text
+
+
+def build_professor_masks(problem: Problem, rules: List[Dict[str, Any]]) -> Tuple[List[int], List[int], List[str]]:
+    """
+    Calcula, para cada professor, os slots permitidos (regras do tipo
+    restrição) e os preferidos (regras do tipo preferência). Regras com
+    condições inválidas são ignoradas e listadas nos avisos.
+
+    Returns:
+        Tupla (permitidos, preferidos, avisos)
+    """
+    total = problem.mascara_total
+    permitidos = [total] * len(problem.professores)
+    preferidos = [total] * len(problem.professores)
+    avisos = []
+
+    por_nome: Dict[str, List[int]] = {}
+    for i, professor in enumerate(problem.professores):
+        por_nome.setdefault(normalize_text(professor.nome), []).append(i)
+
+    # Regras compiladas (e guardadas por id e conteúdo); as que não puderam
+    # ser interpretadas ficam de fora e viram aviso
+    regras, avisos_regras = rule_compiler.compile_all(rules)
+    avisos.extend(avisos_regras)
+    for regra in regras:
+        if regra.professor_id is not None:
+            alvos = [i for i, p in enumerate(problem.professores) if p.id == regra.professor_id]
+        else:
+            alvos = por_nome.get(regra.professor, [])
+        if not alvos:
+            continue
+
+        mascara = regra.mask(problem)
+        for i in alvos:
+            if regra.preferencia:
+                preferidos[i] &= mascara
+            else:
+                permitidos[i] &= mascara
+
+    for i, professor in enumerate(problem.professores):
+        if not permitidos[i]:
+            avisos.append(f"As regras do professor {professor.nome} não deixam nenhum horário livre")
+
+    return permitidos, preferidos, avisos
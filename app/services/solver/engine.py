@@ -0,0 +1,530 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.solver.model import Problem
+
+# Pesos da função objetivo
+PESO_RIGIDO = 1000     # cada aula não alocada
+PESO_JANELA = 3        # cada tempo vago entre aulas do professor no dia
+PESO_EXCESSO = 5       # cada aula da turma acima do limite diário
+PESO_PREFERENCIA = 2   # cada aula fora do horário preferido do professor
+
+TENURE_TABU = 10
+
+# Intervalo mínimo, em segundos, entre dois relatórios de progresso
+INTERVALO_PROGRESSO = 0.5
+
+
+def _janelas(bits: int) -> int:
+    """Quantidade de tempos vagos entre a primeira e a última aula do dia."""
+    if not bits:
+        return 0
+    menor = (bits & -bits).bit_length()
+    return bits.bit_length() - menor + 1 - bits.bit_count()
+
+
+@dataclass
+class SolverResult:
+    """Resultado de uma execução do motor."""
+
+    entries: List[Dict[str, Any]]
+    score: Dict[str, int]
+    nao_alocadas: List[Dict[str, Any]] = field(default_factory=list)
+    avisos: List[str] = field(default_factory=list)
+    estatisticas: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entries": self.entries,
+            "score": self.score,
+            "nao_alocadas": self.nao_alocadas,
+            "avisos": self.avisos,
+            "estatisticas": self.estatisticas,
+        }
+
+
+class ScheduleState:
+    """
+    Estado mutável de uma grade: alocação de professores por turma e de
+    aulas por slot, com bitmasks de ocupação por professor e por turma.
+    """
+
+    def __init__(self, problem: Problem, turma_da_aula: Optional[List[int]] = None):
+        self.problem = problem
+        self.spd = problem.slots_por_dia
+        self.mascara_dia = (1 << self.spd) - 1
+        self.num_salas = len(problem.config.salas)
+
+        # Aulas: por padrão cada turma gera `aulas` entradas consecutivas
+        if turma_da_aula is None:
+            turma_da_aula = [t for t, turma in enumerate(problem.turmas) for _ in range(turma.aulas)]
+        self.turma_da_aula: List[int] = list(turma_da_aula)
+        self.aulas_da_turma: List[List[int]] = [[] for _ in problem.turmas]
+        for aula, t in enumerate(self.turma_da_aula):
+            self.aulas_da_turma[t].append(aula)
+
+        self.limite_diario = [
+            -(-len(aulas) // problem.num_dias) for aulas in self.aulas_da_turma
+        ]
+        self.professor_da_aula: List[int] = [-1] * len(self.turma_da_aula)
+        self.slot_da_aula = [-1] * len(self.turma_da_aula)
+        self.ocupacao_professor = [0] * len(problem.professores)
+        self.ocupacao_turma = [0] * len(problem.turmas)
+        self.aula_professor_slot: Dict[tuple, int] = {}
+        self.aula_turma_slot: Dict[tuple, int] = {}
+        self.aulas_no_slot: List[set] = [set() for _ in problem.slots]
+        self.slots_lotados = 0
+        self.fixas: set = set()
+
+    # ------------------------------------------------------------------
+    # Operações básicas
+    # ------------------------------------------------------------------
+    def professor_da_turma(self, t: int) -> int:
+        aulas = self.aulas_da_turma[t]
+        return self.professor_da_aula[aulas[0]] if aulas else -1
+
+    def set_professor(self, t: int, p: int):
+        for aula in self.aulas_da_turma[t]:
+            self.professor_da_aula[aula] = p
+
+    def place(self, aula: int, slot: int):
+        t = self.turma_da_aula[aula]
+        p = self.professor_da_aula[aula]
+        bit = 1 << slot
+        self.slot_da_aula[aula] = slot
+        self.ocupacao_professor[p] |= bit
+        self.ocupacao_turma[t] |= bit
+        self.aula_professor_slot[(p, slot)] = aula
+        self.aula_turma_slot[(t, slot)] = aula
+        self.aulas_no_slot[slot].add(aula)
+        if self.num_salas and len(self.aulas_no_slot[slot]) >= self.num_salas:
+            self.slots_lotados |= bit
+
+    def remove(self, aula: int):
+        slot = self.slot_da_aula[aula]
+        if slot < 0:
+            return
+        t = self.turma_da_aula[aula]
+        p = self.professor_da_aula[aula]
+        bit = 1 << slot
+        self.slot_da_aula[aula] = -1
+        self.ocupacao_professor[p] &= ~bit
+        self.ocupacao_turma[t] &= ~bit
+        self.aula_professor_slot.pop((p, slot), None)
+        self.aula_turma_slot.pop((t, slot), None)
+        self.aulas_no_slot[slot].discard(aula)
+        self.slots_lotados &= ~bit
+
+    def free_mask(self, aula: int) -> int:
+        """Slots onde a aula pode ser colocada sem conflito."""
+        t = self.turma_da_aula[aula]
+        p = self.professor_da_aula[aula]
+        if p < 0:
+            return 0
+        return (
+            self.problem.permitidos[p]
+            & ~self.ocupacao_professor[p]
+            & ~self.ocupacao_turma[t]
+            & ~self.slots_lotados
+        )
+
+    def unplaced(self) -> List[int]:
+        return [a for a, s in enumerate(self.slot_da_aula) if s < 0]
+
+    # ------------------------------------------------------------------
+    # Custos
+    # ------------------------------------------------------------------
+    def _bits_dia(self, mascara: int, dia: int) -> int:
+        return (mascara >> (dia * self.spd)) & self.mascara_dia
+
+    def local_cost(self, p: int, t: int, dias) -> int:
+        """Custo flexível do professor p e da turma t nos dias informados."""
+        custo = 0
+        limite = self.limite_diario[t]
+        for d in dias:
+            custo += PESO_JANELA * _janelas(self._bits_dia(self.ocupacao_professor[p], d))
+            excesso = self._bits_dia(self.ocupacao_turma[t], d).bit_count() - limite
+            if excesso > 0:
+                custo += PESO_EXCESSO * excesso
+        return custo
+
+    def preference_cost(self, p: int, slot: int) -> int:
+        return 0 if (self.problem.preferidos[p] >> slot) & 1 else PESO_PREFERENCIA
+
+    def insertion_cost(self, aula: int, slot: int) -> int:
+        """Variação do custo flexível ao inserir a aula no slot (sem alterar o estado)."""
+        t = self.turma_da_aula[aula]
+        p = self.professor_da_aula[aula]
+        dia = self.problem.slots[slot].dia
+        bit = 1 << slot
+        antes_p = self._bits_dia(self.ocupacao_professor[p], dia)
+        depois_p = self._bits_dia(self.ocupacao_professor[p] | bit, dia)
+        antes_t = self._bits_dia(self.ocupacao_turma[t], dia).bit_count()
+        limite = self.limite_diario[t]
+        delta = PESO_JANELA * (_janelas(depois_p) - _janelas(antes_p))
+        if antes_t + 1 > limite:
+            delta += PESO_EXCESSO
+        return delta + self.preference_cost(p, slot)
+
+    def score(self) -> Dict[str, int]:
+        problem = self.problem
+        rigido = len(self.unplaced())
+        flexivel = 0
+        for p in range(len(problem.professores)):
+            ocupacao = self.ocupacao_professor[p]
+            if not ocupacao:
+                continue
+            for d in range(problem.num_dias):
+                flexivel += PESO_JANELA * _janelas(self._bits_dia(ocupacao, d))
+            fora = ocupacao & ~problem.preferidos[p]
+            flexivel += PESO_PREFERENCIA * fora.bit_count()
+        for t in range(len(problem.turmas)):
+            limite = self.limite_diario[t]
+            for d in range(problem.num_dias):
+                excesso = self._bits_dia(self.ocupacao_turma[t], d).bit_count() - limite
+                if excesso > 0:
+                    flexivel += PESO_EXCESSO * excesso
+        return {"rigido": rigido, "flexivel": flexivel, "total": rigido * PESO_RIGIDO + flexivel}
+
+    # ------------------------------------------------------------------
+    # Saída
+    # ------------------------------------------------------------------
+    def to_entries(self) -> List[Dict[str, Any]]:
+        problem = self.problem
+        salas = problem.config.salas
+        sala_preferida: Dict[int, int] = {}
+        entries = []
+        for slot in problem.slots:
+            ocupantes = sorted(self.aulas_no_slot[slot.indice], key=lambda a: self.turma_da_aula[a])
+            livres = list(range(len(salas)))
+            sala_por_aula = {}
+            if salas:
+                # Mantém a turma na mesma sala sempre que possível
+                for aula in ocupantes:
+                    t = self.turma_da_aula[aula]
+                    preferida = sala_preferida.get(t)
+                    if preferida in livres:
+                        livres.remove(preferida)
+                        sala_por_aula[aula] = preferida
+                for aula in ocupantes:
+                    if aula not in sala_por_aula and livres:
+                        sala_por_aula[aula] = livres.pop(0)
+                        sala_preferida.setdefault(self.turma_da_aula[aula], sala_por_aula[aula])
+            for aula in ocupantes:
+                t = self.turma_da_aula[aula]
+                turma = problem.turmas[t]
+                professor = problem.professores[self.professor_da_aula[aula]]
+                sala = sala_por_aula.get(aula)
+                entries.append({
+                    "Dia": problem.config.dias[slot.dia],
+                    "Horário": slot.horario,
+                    "Professor": professor.nome,
+                    "Turma": turma.codigo,
+                    "Disciplina": turma.disciplina_nome,
+                    "Sala": salas[sala] if sala is not None else "",
+                    "professor_id": professor.id,
+                    "turma_id": turma.id,
+                })
+        return entries
+
+    def unplaced_report(self) -> List[Dict[str, Any]]:
+        faltantes: Dict[tuple, int] = {}
+        for aula in self.unplaced():
+            chave = (self.turma_da_aula[aula], self.professor_da_aula[aula])
+            faltantes[chave] = faltantes.get(chave, 0) + 1
+        relatorio = []
+        for (t, p), quantidade in sorted(faltantes.items()):
+            turma = self.problem.turmas[t]
+            relatorio.append({
+                "Turma": turma.codigo,
+                "Disciplina": turma.disciplina_nome,
+                "Professor": self.problem.professores[p].nome if p >= 0 else None,
+                "aulas_faltantes": quantidade,
+            })
+        return relatorio
+
+
+class ScheduleSolver:
+    """
+    Motor local de geração de grade.
+
+    Trabalha em três fases: (1) atribuição de professores às turmas
+    equilibrando a carga, (2) construção gulosa começando pelas aulas mais
+    restritas, (3) reparo por mínimos conflitos com lista tabu para as aulas
+    que sobraram e, por fim, busca local para reduzir janelas de professores
+    e concentração de aulas da turma no mesmo dia.
+
+    Toda escolha aleatória usa um único gerador semeado, então a mesma
+    entrada com a mesma seed produz a mesma grade (desde que o limite de
+    tempo não seja atingido).
+    """
+
+    def __init__(self, problem: Problem, seed: Optional[int] = None,
+                 deve_parar: Optional[Callable[[], bool]] = None,
+                 progresso: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.problem = problem
+        # Callback consultado periodicamente; True interrompe a execução
+        # devolvendo a melhor grade obtida até o momento
+        self.deve_parar = deve_parar
+        self.interrompido = False
+        # Callback que recebe relatórios de progresso (no máximo um a cada
+        # INTERVALO_PROGRESSO segundos)
+        self.progresso = progresso
+        self._ultimo_relatorio = 0.0
+        self.seed = problem.config.seed if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.inicio = 0.0
+        self.iteracoes_reparo = 0
+        self.iteracoes_melhoria = 0
+        self.avisos = list(problem.avisos)
+
+    def _interromper(self) -> bool:
+        if self.deve_parar is not None and self.deve_parar():
+            self.interrompido = True
+            return True
+        limite = self.problem.config.tempo_limite
+        return limite is not None and time.perf_counter() - self.inicio >= limite
+
+    def report(self, state: ScheduleState, fase: str, forcar: bool = False):
+        """Envia um relatório de progresso, respeitando o intervalo mínimo."""
+        if self.progresso is None:
+            return
+        agora = time.perf_counter()
+        if not forcar and agora - self._ultimo_relatorio < INTERVALO_PROGRESSO:
+            return
+        self._ultimo_relatorio = agora
+        decorrido = agora - self.inicio
+        iteracoes = self.iteracoes_reparo + self.iteracoes_melhoria
+        score = state.score()
+        self.progresso({
+            "fase": fase,
+            "seed": self.seed,
+            "melhor_score": score["total"],
+            "violacoes_rigidas": score["rigido"],
+            "custo_flexivel": score["flexivel"],
+            "iteracoes": iteracoes,
+            "iteracoes_por_segundo": round(iteracoes / decorrido, 1) if decorrido > 0 else 0.0,
+            "tempo_segundos": round(decorrido, 3),
+        })
+
+    def _bits(self, mascara: int) -> List[int]:
+        slots = []
+        while mascara:
+            bit = mascara & -mascara
+            slots.append(bit.bit_length() - 1)
+            mascara ^= bit
+        return slots
+
+    # ------------------------------------------------------------------
+    # Fase 1: professores
+    # ------------------------------------------------------------------
+    def assign_professors(self, state: ScheduleState):
+        problem = self.problem
+        capacidade = [m.bit_count() for m in problem.permitidos]
+        carga = [0] * len(problem.professores)
+        ordem = sorted(
+            range(len(problem.turmas)),
+            key=lambda t: (len(problem.turmas[t].candidatos), -problem.turmas[t].aulas, self.rng.random()),
+        )
+        for t in ordem:
+            if state.professor_da_turma(t) >= 0:
+                continue
+            turma = problem.turmas[t]
+            candidatos = [p for p in turma.candidatos if capacidade[p] > 0]
+            if not candidatos:
+                self.avisos.append(f"Turma {turma.codigo} não possui professor disponível")
+                continue
+            escolhido = min(
+                candidatos,
+                key=lambda p: (
+                    carga[p] + turma.aulas > capacidade[p],
+                    (carga[p] + turma.aulas) / capacidade[p],
+                    self.rng.random(),
+                ),
+            )
+            state.set_professor(t, escolhido)
+            carga[escolhido] += turma.aulas
+            if carga[escolhido] > capacidade[escolhido] >= carga[escolhido] - turma.aulas:
+                self.avisos.append(
+                    f"Professor {problem.professores[escolhido].nome} recebeu mais aulas "
+                    f"do que horários disponíveis ({capacidade[escolhido]})"
+                )
+
+    # ------------------------------------------------------------------
+    # Fase 2: construção gulosa
+    # ------------------------------------------------------------------
+    def best_free_slot(self, state: ScheduleState, aula: int) -> int:
+        melhor, melhor_custo = -1, None
+        for slot in self._bits(state.free_mask(aula)):
+            custo = state.insertion_cost(aula, slot) + self.rng.random()
+            if melhor_custo is None or custo < melhor_custo:
+                melhor, melhor_custo = slot, custo
+        return melhor
+
+    def construct(self, state: ScheduleState, aulas: List[int]) -> List[int]:
+        """Aloca as aulas gulosamente; retorna as que não couberam."""
+        problem = self.problem
+
+        def dificuldade(aula):
+            p = state.professor_da_aula[aula]
+            livres = problem.permitidos[p].bit_count() if p >= 0 else 0
+            return (livres, -problem.turmas[state.turma_da_aula[aula]].aulas, state.turma_da_aula[aula])
+
+        restantes = []
+        for aula in sorted(aulas, key=dificuldade):
+            if state.professor_da_aula[aula] < 0:
+                restantes.append(aula)
+                continue
+            slot = self.best_free_slot(state, aula)
+            if slot < 0:
+                restantes.append(aula)
+            else:
+                state.place(aula, slot)
+        return restantes
+
+    # ------------------------------------------------------------------
+    # Fase 3: reparo por mínimos conflitos
+    # ------------------------------------------------------------------
+    def _conflitos(self, state: ScheduleState, aula: int, slot: int) -> Optional[set]:
+        t = state.turma_da_aula[aula]
+        p = state.professor_da_aula[aula]
+        conflitos = set()
+        for chave, ocupacao in (((p, slot), state.aula_professor_slot), ((t, slot), state.aula_turma_slot)):
+            outra = ocupacao.get(chave)
+            if outra is not None:
+                conflitos.add(outra)
+        if state.num_salas and len(state.aulas_no_slot[slot]) - len(conflitos) >= state.num_salas:
+            moveis = sorted(a for a in state.aulas_no_slot[slot] - conflitos if a not in state.fixas)
+            if not moveis:
+                return None
+            conflitos.add(self.rng.choice(moveis))
+        if conflitos & state.fixas:
+            return None
+        return conflitos
+
+    def repair(self, state: ScheduleState, aulas: List[int]) -> List[int]:
+        """Recoloca as aulas pendentes desalojando conflitos; retorna as que sobraram."""
+        problem = self.problem
+        fila = deque(sorted(aulas))
+        tabu: Dict[tuple, int] = {}
+        impossiveis = []
+        limite = problem.config.max_iteracoes
+        while fila and self.iteracoes_reparo < limite:
+            if self.iteracoes_reparo % 256 == 0:
+                if self._interromper():
+                    break
+                self.report(state, "reparo")
+            self.iteracoes_reparo += 1
+            aula = fila.popleft()
+            p = state.professor_da_aula[aula]
+            # Sem professor, ou todos os horários permitidos do professor já
+            # ocupados por aulas dele mesmo: desalojar só trocaria uma pela outra
+            if p < 0 or not problem.permitidos[p] & ~state.ocupacao_professor[p]:
+                impossiveis.append(aula)
+                continue
+
+            livre = self.best_free_slot(state, aula)
+            if livre >= 0:
+                state.place(aula, livre)
+                continue
+
+            melhor, melhor_custo, melhor_conflitos = -1, None, None
+            for slot in self._bits(problem.permitidos[p]):
+                conflitos = self._conflitos(state, aula, slot)
+                if conflitos is None:
+                    continue
+                custo = 10 * len(conflitos) + self.rng.random()
+                if any(tabu.get((c, slot), 0) > self.iteracoes_reparo for c in conflitos):
+                    custo += 100
+                if tabu.get((aula, slot), 0) > self.iteracoes_reparo:
+                    custo += 50
+                if melhor_custo is None or custo < melhor_custo:
+                    melhor, melhor_custo, melhor_conflitos = slot, custo, conflitos
+            if melhor < 0:
+                impossiveis.append(aula)
+                continue
+
+            for outra in sorted(melhor_conflitos):
+                tabu[(outra, state.slot_da_aula[outra])] = self.iteracoes_reparo + TENURE_TABU
+                state.remove(outra)
+                fila.append(outra)
+            state.place(aula, melhor)
+            tabu[(aula, melhor)] = self.iteracoes_reparo + TENURE_TABU
+
+        return impossiveis + list(fila)
+
+    # ------------------------------------------------------------------
+    # Fase 4: busca local nas restrições flexíveis
+    # ------------------------------------------------------------------
+    def improve(self, state: ScheduleState, iteracoes: int, aulas: Optional[List[int]] = None):
+        problem = self.problem
+        moveis = [
+            a for a in (aulas if aulas is not None else range(len(state.slot_da_aula)))
+            if state.slot_da_aula[a] >= 0 and a not in state.fixas
+        ]
+        if not moveis:
+            return
+        for i in range(iteracoes):
+            if i % 512 == 0:
+                if self._interromper():
+                    break
+                self.report(state, "melhoria")
+            self.iteracoes_melhoria += 1
+            aula = self.rng.choice(moveis)
+            livres = self._bits(state.free_mask(aula))
+            if not livres:
+                continue
+            novo = self.rng.choice(livres)
+            antigo = state.slot_da_aula[aula]
+            t = state.turma_da_aula[aula]
+            p = state.professor_da_aula[aula]
+            dias = {problem.slots[antigo].dia, problem.slots[novo].dia}
+            antes = state.local_cost(p, t, dias) + state.preference_cost(p, antigo)
+            state.remove(aula)
+            state.place(aula, novo)
+            depois = state.local_cost(p, t, dias) + state.preference_cost(p, novo)
+            if depois > antes:
+                state.remove(aula)
+                state.place(aula, antigo)
+
+    # ------------------------------------------------------------------
+    # Execução completa
+    # ------------------------------------------------------------------
+    def result(self, state: ScheduleState) -> SolverResult:
+        return SolverResult(
+            entries=state.to_entries(),
+            score=state.score(),
+            nao_alocadas=state.unplaced_report(),
+            avisos=list(self.avisos),
+            estatisticas={
+                "seed": self.seed,
+                "aulas": len(state.slot_da_aula),
+                "iteracoes_reparo": self.iteracoes_reparo,
+                "iteracoes_melhoria": self.iteracoes_melhoria,
+                "tempo_segundos": round(time.perf_counter() - self.inicio, 4),
+                "interrompido": self.interrompido,
+            },
+        )
+
+    def solve(self) -> SolverResult:
+        self.inicio = time.perf_counter()
+        state = ScheduleState(self.problem)
+        self.assign_professors(state)
+        pendentes = self.construct(state, list(range(len(state.slot_da_aula))))
+        self.report(state, "construcao", forcar=True)
+        if pendentes and not self.interrompido:
+            self.repair(state, pendentes)
+        if not self.interrompido:
+            self.improve(state, self.problem.config.iteracoes_melhoria)
+        self.report(state, "concluido", forcar=True)
+        return self.result(state)
+
+
+def solve(problem: Problem, seed: Optional[int] = None,
+          deve_parar: Optional[Callable[[], bool]] = None,
+          progresso: Optional[Callable[[Dict[str, Any]], None]] = None) -> SolverResult:
+    """Executa o motor para o problema informado."""
+    return ScheduleSolver(problem, seed=seed, deve_parar=deve_parar, progresso=progresso).solve()
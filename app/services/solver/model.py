@@ -0,0 +1,206 @@
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.text_utils import format_hora, normalize_text, parse_hora
+
+DIAS_PADRAO = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+
+HORARIOS_PADRAO = [
+    "07:00-08:00", "08:00-09:00", "09:00-10:00", "10:00-11:00", "11:00-12:00",
+    "13:00-14:00", "14:00-15:00", "15:00-16:00", "16:00-17:00", "17:00-18:00",
+]
+
+
+@dataclass
+class SolverConfig:
+    """Parâmetros do motor de geração de grade."""
+
+    dias: List[str] = field(default_factory=lambda: list(DIAS_PADRAO))
+    horarios: List[str] = field(default_factory=lambda: list(HORARIOS_PADRAO))
+    # Aulas semanais de cada turma = ceil(carga_horaria / semanas_letivas),
+    # contando um tempo da grade por hora de carga. Com o padrão 1, a
+    # carga_horaria é lida como aulas POR SEMANA; se a disciplina guarda a
+    # carga total do período (ex: 80h), informe as semanas (ex: 20 -> 4
+    # aulas semanais).
+    semanas_letivas: int = 1
+    # Salas disponíveis; vazio = não alocar salas.
+    salas: List[str] = field(default_factory=list)
+    seed: int = 0
+    # Limite de iterações da fase de reparo (restrições rígidas).
+    max_iteracoes: int = 50000
+    # Iterações da busca local de melhoria (restrições flexíveis).
+    iteracoes_melhoria: int = 20000
+    # Limite opcional de tempo em segundos. Quando atingido, o resultado deixa
+    # de ser determinístico, pois depende da velocidade da máquina.
+    tempo_limite: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, dados: Optional[Dict[str, Any]]) -> "SolverConfig":
+        """Cria a configuração a partir de um dicionário, ignorando valores nulos."""
+        dados = {k: v for k, v in (dados or {}).items() if v is not None}
+        campos = cls.__dataclass_fields__
+        return cls(**{k: v for k, v in dados.items() if k in campos})
+
+
+@dataclass
+class Slot:
+    """Um tempo de aula da grade semanal."""
+
+    indice: int
+    dia: int
+    periodo: int
+    inicio: int  # minutos desde a meia-noite
+    fim: int
+
+    @property
+    def horario(self) -> str:
+        return f"{format_hora(self.inicio)}-{format_hora(self.fim)}"
+
+
+@dataclass
+class TurmaInfo:
+    id: int
+    codigo: str
+    disciplina_id: int
+    disciplina_nome: str
+    aulas: int
+    candidatos: List[int]  # índices de professores aptos
+
+
+@dataclass
+class ProfessorInfo:
+    id: int
+    nome: str
+
+
+@dataclass
+class Problem:
+    """Instância do problema de geração de grade, já indexada para o motor."""
+
+    config: SolverConfig
+    slots: List[Slot]
+    professores: List[ProfessorInfo]
+    turmas: List[TurmaInfo]
+    # Bitmask de slots permitidos (restrições) e preferidos por professor
+    permitidos: List[int]
+    preferidos: List[int]
+    avisos: List[str] = field(default_factory=list)
+
+    @property
+    def num_dias(self) -> int:
+        return len(self.config.dias)
+
+    @property
+    def slots_por_dia(self) -> int:
+        return len(self.config.horarios)
+
+    @property
+    def mascara_total(self) -> int:
+        return (1 << len(self.slots)) - 1
+
+    def slot_de(self, dia: str, inicio: int, fim: int) -> List[int]:
+        """Retorna os índices dos slots que se sobrepõem ao intervalo informado."""
+        por_dia = self.__dict__.get("_slots_por_dia")
+        if por_dia is None:
+            por_dia = {}
+            for s in self.slots:
+                por_dia.setdefault(normalize_text(self.config.dias[s.dia]), []).append(s)
+            self.__dict__["_slots_por_dia"] = por_dia
+        return [
+            s.indice for s in por_dia.get(normalize_text(dia), [])
+            if s.inicio < fim and inicio < s.fim
+        ]
+
+
+def parse_horarios(horarios: List[str]) -> List[Tuple[int, int]]:
+    """Converte strings "HH:MM-HH:MM" em intervalos (inicio, fim) em minutos."""
+    intervalos = []
+    for horario in horarios:
+        partes = str(horario).split("-")
+        if len(partes) != 2:
+            raise ValueError(f"Formato de horário inválido: {horario}")
+        inicio, fim = parse_hora(partes[0]), parse_hora(partes[1])
+        if inicio is None or fim is None or fim <= inicio:
+            raise ValueError(f"Formato de horário inválido: {horario}")
+        intervalos.append((inicio, fim))
+    return sorted(intervalos)
+
+
+def build_problem(data: Dict[str, List[Dict[str, Any]]], config: SolverConfig) -> Problem:
+    """
+    Constrói o problema a partir do snapshot retornado por GradeService._get_all_data.
+
+    Args:
+        data: Dicionário com professors, courses, classes e rules
+        config: Configuração do motor
+
+    Returns:
+        Problema indexado
+    """
+    # Import local para evitar import circular (constraints depende de model)
+    from app.services.solver.constraints import build_professor_masks
+
+    if not config.dias or not config.horarios:
+        raise ValueError("A grade precisa de pelo menos um dia e um horário")
+
+    intervalos = parse_horarios(config.horarios)
+    slots = []
+    for d in range(len(config.dias)):
+        for p, (inicio, fim) in enumerate(intervalos):
+            slots.append(Slot(indice=len(slots), dia=d, periodo=p, inicio=inicio, fim=fim))
+
+    professores_data = sorted(data.get("professors", []), key=lambda p: p["id"])
+    professores = [ProfessorInfo(id=p["id"], nome=p["nome"]) for p in professores_data]
+    indice_professor = {p.id: i for i, p in enumerate(professores)}
+
+    # Professores aptos por disciplina (tabela professor_disciplina)
+    aptos_por_disciplina: Dict[int, List[int]] = {}
+    for p in professores_data:
+        for disciplina_id in p.get("disciplinas") or []:
+            aptos_por_disciplina.setdefault(disciplina_id, []).append(indice_professor[p["id"]])
+
+    disciplinas = {c["id"]: c for c in data.get("courses", [])}
+    avisos = []
+    turmas = []
+    for t in sorted(data.get("classes", []), key=lambda t: t["id"]):
+        disciplina = disciplinas.get(t["disciplina_id"])
+        if disciplina is None:
+            avisos.append(f"Turma {t['codigo']} referencia disciplina inexistente")
+            continue
+        aulas = math.ceil((disciplina.get("carga_horaria") or 0) / max(1, config.semanas_letivas))
+        if aulas <= 0:
+            continue
+        candidatos = aptos_por_disciplina.get(disciplina["id"])
+        if not candidatos:
+            # Sem vínculo cadastrado: qualquer professor pode lecionar
+            candidatos = list(range(len(professores)))
+        turmas.append(TurmaInfo(
+            id=t["id"],
+            codigo=t["codigo"],
+            disciplina_id=disciplina["id"],
+            disciplina_nome=disciplina["nome"],
+            aulas=min(aulas, len(slots)),
+            candidatos=sorted(candidatos),
+        ))
+        if aulas > len(slots):
+            avisos.append(
+                f"Turma {t['codigo']}: {aulas} aulas semanais excedem os {len(slots)} tempos da grade"
+                + (" (se a carga horária da disciplina é a total do período, informe semanas_letivas)"
+                   if config.semanas_letivas <= 1 else "")
+            )
+
+    problem = Problem(
+        config=config,
+        slots=slots,
+        professores=professores,
+        turmas=turmas,
+        permitidos=[],
+        preferidos=[],
+        avisos=avisos,
+    )
+    problem.permitidos, problem.preferidos, avisos_regras = build_professor_masks(
+        problem, data.get("rules", [])
+    )
+    problem.avisos.extend(avisos_regras)
+    return problem
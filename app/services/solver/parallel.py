@@ -0,0 +1,282 @@
+import dataclasses
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.solver.engine import ScheduleSolver, SolverResult
+from app.services.solver.model import Problem
+
+# Espera, em segundos, para que as tentativas em execução devolvam a melhor
+# grade depois do pedido de parada; as que não responderem são encerradas
+ESPERA_PARADA = 2.0
+
+# "spawn" evita herdar locks de threads do servidor web no fork
+_CONTEXTO = multiprocessing.get_context("spawn")
+
+
+def _run_attempt(problem: Problem, seed: int, parar, prazo: Optional[float], fila=None) -> SolverResult:
+    """
+    Executa uma tentativa isolada (roda no processo filho). `parar` é o
+    evento de parada compartilhado pela chamada, `prazo` o instante
+    (time.time()) em que a tentativa deve terminar, se houver, e `fila`
+    recebe os relatórios de progresso do solver.
+    """
+    if prazo is not None:
+        restante = max(0.0, prazo - time.time())
+        limite = problem.config.tempo_limite
+        problem = dataclasses.replace(
+            problem, config=dataclasses.replace(
+                problem.config, tempo_limite=restante if limite is None else min(limite, restante)
+            )
+        )
+    progresso = fila.put if fila is not None else None
+    return ScheduleSolver(problem, seed=seed, deve_parar=parar.is_set, progresso=progresso).solve()
+
+
+class SolverPool:
+    """
+    Pool de processos de longa duração para as tentativas do multistart.
+
+    Cada chamada toma emprestado um ProcessPoolExecutor só seu (acquire) e o
+    devolve no fim (release); os processos sobem uma vez (cada um importa o
+    solver ao iniciar) e são reaproveitados pelas chamadas seguintes, junto
+    com o Manager que cria os eventos de parada e as filas de progresso.
+    Matar um worker quebra o executor inteiro, então terminate() só é
+    seguro porque o executor não é compartilhado: encerra as tentativas da
+    chamada que não atenderam ao pedido de parada, e as de outras chamadas
+    seguem nos executores delas.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_ociosos: int = 2):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.max_ociosos = max_ociosos
+        self._ociosos: List[ProcessPoolExecutor] = []
+        self._em_uso: Set[ProcessPoolExecutor] = set()
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> ProcessPoolExecutor:
+        """Executor exclusivo da chamada: um ocioso, ou um novo."""
+        with self._lock:
+            while self._ociosos:
+                executor = self._ociosos.pop()
+                if not getattr(executor, "_broken", False):
+                    break
+                executor.shutdown(wait=False)
+            else:
+                executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_CONTEXTO)
+            self._em_uso.add(executor)
+            return executor
+
+    def release(self, executor: ProcessPoolExecutor):
+        """Devolve o executor para reuso (ou o encerra, se sobram ociosos)."""
+        with self._lock:
+            self._em_uso.discard(executor)
+            if not getattr(executor, "_broken", False) and len(self._ociosos) < self.max_ociosos:
+                self._ociosos.append(executor)
+                return
+        executor.shutdown(wait=False)
+
+    def manager(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = _CONTEXTO.Manager()
+            return self._manager
+
+    def terminate(self, executor: ProcessPoolExecutor):
+        """Mata os processos de um executor emprestado e o descarta."""
+        with self._lock:
+            self._em_uso.discard(executor)
+        for processo in list((getattr(executor, "_processes", None) or {}).values()):
+            processo.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            ociosos, self._ociosos = self._ociosos, []
+            em_uso = list(self._em_uso)
+            manager, self._manager = self._manager, None
+        for executor in em_uso:
+            self.terminate(executor)
+        for executor in ociosos:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+
+def solve_multistart(
+    problem: Problem,
+    tentativas: Optional[int] = None,
+    workers: Optional[int] = None,
+    tempo_limite: Optional[float] = None,
+    deve_parar: Optional[Callable[[], bool]] = None,
+    progresso: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[Optional[SolverResult], List[Dict[str, Any]]]:
+    """
+    Executa várias tentativas com seeds diferentes em paralelo, num executor
+    emprestado do pool de processos, e devolve a de menor custo.
+
+    As seeds são config.seed, config.seed + 1, ..., então a mesma entrada
+    produz o mesmo vencedor quando nenhuma tentativa é interrompida pelo
+    tempo. Em empate de custo vence a menor seed.
+
+    Cada tentativa recebe um evento de parada e o prazo da chamada. Quando
+    deve_parar retorna True ou o prazo se esgota (ex: o aceite antecipado de
+    um job), o evento é disparado e as tentativas em execução devolvem a
+    melhor grade que já têm, que entra na escolha do vencedor; as que não
+    responderem em ESPERA_PARADA segundos são encerradas junto com o
+    executor da chamada.
+
+    O progresso de cada tentativa em execução chega por uma fila do Manager
+    e é repassado a `progresso` junto com o melhor custo entre tentativas
+    concluídas e em andamento.
+
+    Args:
+        problem: Problema indexado
+        tentativas: Número de tentativas (padrão: uma por worker)
+        workers: Tentativas simultâneas (padrão: tamanho do pool)
+        tempo_limite: Limite de tempo total, em segundos
+        deve_parar: Callback que, ao retornar True, encerra as tentativas e
+            fica com o melhor resultado obtido até o momento
+        progresso: Callback chamado com o progresso agregado (melhor custo
+            até o momento) a cada relatório das tentativas
+
+    Returns:
+        Tupla (melhor resultado ou None, resumo de cada tentativa)
+    """
+    workers = max(1, min(workers or solver_pool.max_workers, solver_pool.max_workers))
+    tentativas = max(1, tentativas or workers)
+    workers = min(workers, tentativas)
+
+    seed_base = problem.config.seed
+    resumo: Dict[int, Dict[str, Any]] = {
+        seed_base + i: {"seed": seed_base + i, "status": "pendente", "score": None}
+        for i in range(tentativas)
+    }
+    resultados: Dict[int, SolverResult] = {}
+
+    inicio = time.perf_counter()
+    # Reserva parte do prazo para trafegar o resultado de volta
+    prazo = time.time() + tempo_limite * 0.8 if tempo_limite is not None else None
+    manager = solver_pool.manager()
+    parar = manager.Event()
+    fila_progresso = manager.Queue() if progresso is not None else None
+    # Último relatório de cada tentativa em execução
+    parciais: Dict[int, Dict[str, Any]] = {}
+    fila = list(resumo)
+    futures: Dict[Future, int] = {}
+
+    def coletar(future: Future):
+        seed = futures[future]
+        parciais.pop(seed, None)
+        try:
+            resultado = future.result()
+        except Exception as e:
+            resumo[seed].update(status="erro", erro=str(e))
+            return
+        resultados[seed] = resultado
+        resumo[seed].update(
+            status="interrompida" if resultado.estatisticas.get("interrompido") else "concluida",
+            score=resultado.score,
+            tempo_segundos=resultado.estatisticas.get("tempo_segundos"),
+        )
+        reportar({"fase": "multistart", "seed": seed})
+
+    def reportar(relatorio: Dict[str, Any]):
+        if progresso is None:
+            return
+        custos = [
+            (r.score["total"], r.score["rigido"], r.score["flexivel"]) for r in resultados.values()
+        ] + [
+            (p["melhor_score"], p["violacoes_rigidas"], p["custo_flexivel"]) for p in parciais.values()
+        ]
+        decorrido = time.perf_counter() - inicio
+        iteracoes = sum(
+            r.estatisticas.get("iteracoes_reparo", 0) + r.estatisticas.get("iteracoes_melhoria", 0)
+            for r in resultados.values()
+        ) + sum(p.get("iteracoes", 0) for p in parciais.values())
+        melhor = min(custos) if custos else (None, None, None)
+        progresso({
+            "fase": relatorio.get("fase"),
+            "seed": relatorio.get("seed"),
+            "tentativas_concluidas": len(resultados),
+            "tentativas_em_execucao": len(parciais),
+            "tentativas": tentativas,
+            "melhor_score": melhor[0],
+            "violacoes_rigidas": melhor[1],
+            "custo_flexivel": melhor[2],
+            "iteracoes": iteracoes,
+            "iteracoes_por_segundo": round(iteracoes / decorrido, 1) if decorrido > 0 else 0.0,
+            "tempo_segundos": round(decorrido, 3),
+        })
+
+    def drenar():
+        if fila_progresso is None:
+            return
+        while True:
+            try:
+                relatorio = fila_progresso.get_nowait()
+            except queue.Empty:
+                return
+            # Relatórios atrasados de tentativas já encerradas são ignorados
+            if resumo.get(relatorio["seed"], {}).get("status") == "pendente":
+                parciais[relatorio["seed"]] = relatorio
+                reportar(relatorio)
+
+    executor = solver_pool.acquire()
+    pendentes = set()
+    try:
+        while fila or pendentes:
+            # Mantém no máximo `workers` tentativas em execução no executor
+            while fila and len(pendentes) < workers:
+                seed = fila.pop(0)
+                future = executor.submit(_run_attempt, problem, seed, parar, prazo, fila_progresso)
+                futures[future] = seed
+                pendentes.add(future)
+            if deve_parar is not None and deve_parar():
+                break
+            # Acorda periodicamente para consultar deve_parar e repassar o progresso
+            restante = 0.25 if deve_parar is not None or progresso is not None else None
+            if tempo_limite is not None:
+                folga = tempo_limite - (time.perf_counter() - inicio)
+                if folga <= 0:
+                    break
+                restante = min(folga, restante) if restante is not None else folga
+            concluidos, pendentes = wait(pendentes, timeout=restante, return_when=FIRST_COMPLETED)
+            drenar()
+            for future in concluidos:
+                coletar(future)
+
+        for seed in fila:
+            resumo[seed]["status"] = "cancelada"
+        if pendentes:
+            # As tentativas em execução param no próximo ponto de verificação e
+            # devolvem a melhor grade que têm
+            parar.set()
+            concluidos, pendentes = wait(pendentes, timeout=ESPERA_PARADA)
+            for future in concluidos:
+                coletar(future)
+            if pendentes:
+                for future in pendentes:
+                    resumo[futures[future]]["status"] = "descartada"
+                solver_pool.terminate(executor)
+                executor = None
+    finally:
+        if executor is not None:
+            solver_pool.release(executor)
+
+    melhor = None
+    if resultados:
+        seed = min(resultados, key=lambda s: (resultados[s].score["total"], s))
+        melhor = resultados[seed]
+        melhor.estatisticas["tempo_total_segundos"] = round(time.perf_counter() - inicio, 4)
+        melhor.estatisticas["workers"] = workers
+    return melhor, [resumo[s] for s in sorted(resumo)]
+
+
+# Instância singleton do pool de processos do solver
+solver_pool = SolverPool(max_workers=int(os.getenv("GRADE_SOLVER_WORKERS", "0")) or None)
@@ -0,0 +1,266 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.services.solver.constraints import build_professor_masks
+from app.services.solver.engine import ScheduleSolver, ScheduleState
+from app.services.solver.model import HORARIOS_PADRAO, DIAS_PADRAO, Problem, parse_horarios
+from app.services.text_utils import format_hora, normalize_text, parse_hora
+
+# Quantas aulas vizinhas (mesmo professor ou mesma turma) podem ser
+# realocadas junto com cada aula que viola uma regra nova
+VIZINHANCA_PADRAO = 4
+
+
+@dataclass
+class RepairResult:
+    """Resultado de um reparo incremental da grade."""
+
+    entries: List[Dict[str, Any]]
+    alteracoes: List[Dict[str, Any]]
+    score: Dict[str, int]
+    nao_alocadas: List[Dict[str, Any]] = field(default_factory=list)
+    avisos: List[str] = field(default_factory=list)
+    estatisticas: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entries": self.entries,
+            "alteracoes": self.alteracoes,
+            "score": self.score,
+            "nao_alocadas": self.nao_alocadas,
+            "avisos": self.avisos,
+            "estatisticas": self.estatisticas,
+        }
+
+
+def infer_grid(horarios: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Deduz dias e tempos de aula a partir de uma grade já salva, completando
+    com os tempos padrão que não se sobrepõem aos existentes.
+    """
+    dias = list(DIAS_PADRAO)
+    conhecidos = {normalize_text(d) for d in dias}
+    intervalos = set()
+    for row in horarios:
+        dia = row.get("dia_semana") or ""
+        if dia and normalize_text(dia) not in conhecidos:
+            conhecidos.add(normalize_text(dia))
+            dias.append(dia)
+        inicio, fim = parse_hora(row.get("hora_inicio")), parse_hora(row.get("hora_fim"))
+        if inicio is not None and fim is not None and fim > inicio:
+            intervalos.add((inicio, fim))
+
+    ordenados = sorted(intervalos)
+    if any(a[1] > b[0] for a, b in zip(ordenados, ordenados[1:])):
+        # Tempos sobrepostos não formam uma grade: usa o padrão
+        ordenados = []
+    for padrao in parse_horarios(HORARIOS_PADRAO):
+        if all(padrao[1] <= i[0] or i[1] <= padrao[0] for i in ordenados):
+            ordenados.append(padrao)
+    ordenados.sort()
+    return {
+        "dias": dias,
+        "horarios": [f"{format_hora(i)}-{format_hora(f)}" for i, f in ordenados],
+    }
+
+
+def repair_schedule(
+    problem: Problem,
+    horarios: List[Dict[str, Any]],
+    novas_regras: List[Dict[str, Any]],
+    vizinhanca: int = VIZINHANCA_PADRAO,
+    seed: Optional[int] = None,
+) -> RepairResult:
+    """
+    Repara uma grade existente para atender regras novas, movendo apenas as
+    aulas que as violam e uma vizinhança limitada ao redor delas.
+
+    Todas as demais aulas ficam fixas. Aulas que ocupam mais de um tempo da
+    grade ou ficam fora dela são preservadas como estão.
+
+    Args:
+        problem: Problema construído com todas as regras (inclusive as novas)
+        horarios: Grade atual (dicionários com os campos de Horario e, para a
+            saída, professor_nome, turma_codigo e disciplina_nome)
+        novas_regras: Regras recém-criadas que motivaram o reparo
+        vizinhanca: Aulas vizinhas liberadas por aula violadora
+        seed: Seed do gerador aleatório
+
+    Returns:
+        Grade reparada e lista de alterações
+    """
+    solver = ScheduleSolver(problem, seed=seed)
+    indice_turma = {t.id: i for i, t in enumerate(problem.turmas)}
+    indice_professor = {p.id: i for i, p in enumerate(problem.professores)}
+
+    # Converte as linhas em aulas do motor
+    turma_da_aula, professor_da_aula, slot_original, linha_da_aula = [], [], [], []
+    fixas = set()
+    for posicao, row in enumerate(horarios):
+        t = indice_turma.get(row.get("turma_id"))
+        p = indice_professor.get(row.get("professor_id"))
+        inicio, fim = parse_hora(row.get("hora_inicio")), parse_hora(row.get("hora_fim"))
+        if t is None or p is None or inicio is None or fim is None:
+            continue
+        slots = problem.slot_de(row.get("dia_semana") or "", inicio, fim)
+        alinhada = len(slots) == 1 and (problem.slots[slots[0]].inicio, problem.slots[slots[0]].fim) == (inicio, fim)
+        for slot in slots:
+            if not alinhada:
+                fixas.add(len(turma_da_aula))
+            turma_da_aula.append(t)
+            professor_da_aula.append(p)
+            slot_original.append(slot)
+            linha_da_aula.append(posicao)
+
+    state = ScheduleState(problem, turma_da_aula)
+    state.professor_da_aula = professor_da_aula
+    state.fixas = set(fixas)
+
+    aulas_do_professor: Dict[int, List[int]] = {}
+    for aula, p in enumerate(professor_da_aula):
+        aulas_do_professor.setdefault(p, []).append(aula)
+
+    # Fixas primeiro; aulas móveis que já chocam com outra ficam pendentes
+    pendentes = []
+    for aula in sorted(range(len(turma_da_aula)), key=lambda a: (a not in fixas, a)):
+        slot = slot_original[aula]
+        t, p = turma_da_aula[aula], professor_da_aula[aula]
+        if (p, slot) in state.aula_professor_slot or (t, slot) in state.aula_turma_slot:
+            if aula not in fixas:
+                pendentes.append(aula)
+        else:
+            state.place(aula, slot)
+
+    # Aulas que violam as regras novas
+    mascaras_novas, _, _ = build_professor_masks(problem, novas_regras)
+    violadoras = [
+        a for a in range(len(turma_da_aula))
+        if a not in fixas and state.slot_da_aula[a] >= 0
+        and not (mascaras_novas[professor_da_aula[a]] >> state.slot_da_aula[a]) & 1
+    ]
+
+    # Vizinhança: aulas do mesmo professor ou turma que ocupam horários
+    # permitidos para a violadora e podem precisar ceder o lugar
+    liberadas = set(violadoras) | set(pendentes)
+    for aula in violadoras:
+        p, t = professor_da_aula[aula], turma_da_aula[aula]
+        permitidos = problem.permitidos[p]
+        candidatas = [
+            outra for outra in sorted(set(aulas_do_professor[p]) | set(state.aulas_da_turma[t]))
+            if outra not in liberadas and outra not in fixas
+            and state.slot_da_aula[outra] >= 0
+            and (permitidos >> state.slot_da_aula[outra]) & 1
+        ]
+        solver.rng.shuffle(candidatas)
+        liberadas.update(candidatas[:vizinhanca])
+
+    # Conjunto para os testes de pertinência; lista ordenada para a ordem
+    # (determinística) de reconstrução
+    state.fixas.update(set(range(len(turma_da_aula))) - liberadas)
+    liberadas = sorted(liberadas)
+    for aula in liberadas:
+        state.remove(aula)
+
+    solver.inicio = time.perf_counter()
+    restantes = solver.construct(state, liberadas)
+    if restantes:
+        restantes = solver.repair(state, restantes)
+    solver.improve(state, min(problem.config.iteracoes_melhoria, 50 * len(liberadas)), aulas=liberadas)
+
+    avisos = list(solver.avisos)
+    for aula in state.unplaced():
+        if aula in fixas:
+            continue
+        slot = slot_original[aula]
+        t, p = turma_da_aula[aula], professor_da_aula[aula]
+        if (p, slot) not in state.aula_professor_slot and (t, slot) not in state.aula_turma_slot:
+            state.place(aula, slot)
+            avisos.append(
+                f"Aula da turma {problem.turmas[t].codigo} mantida no horário original "
+                f"por falta de alternativa"
+            )
+
+    entries, alteracoes = _montar_saida(problem, state, horarios, linha_da_aula, slot_original, fixas)
+    estatisticas = {
+        "aulas_liberadas": len(liberadas),
+        "aulas_violadoras": len(violadoras),
+        "aulas_em_conflito": len(pendentes),
+        "iteracoes_reparo": solver.iteracoes_reparo,
+        "iteracoes_melhoria": solver.iteracoes_melhoria,
+        "tempo_segundos": round(time.perf_counter() - solver.inicio, 4),
+    }
+    return RepairResult(
+        entries=entries,
+        alteracoes=alteracoes,
+        score=state.score(),
+        nao_alocadas=state.unplaced_report(),
+        avisos=avisos,
+        estatisticas=estatisticas,
+    )
+
+
+def _montar_saida(problem, state, horarios, linha_da_aula, slot_original, fixas):
+    """Gera as entradas da grade reparada no formato aceito por /grade/save."""
+    novo_slot: Dict[int, int] = {}
+    for aula, posicao in enumerate(linha_da_aula):
+        if aula not in fixas and state.slot_da_aula[aula] != slot_original[aula]:
+            novo_slot[posicao] = state.slot_da_aula[aula]
+
+    # Salas já ocupadas por aula que não mudou, por (dia, início)
+    ocupadas = {}
+    salas_conhecidas = []
+    for posicao, row in enumerate(horarios):
+        sala = row.get("sala") or ""
+        if sala and sala not in salas_conhecidas:
+            salas_conhecidas.append(sala)
+        if posicao not in novo_slot and sala:
+            chave = (normalize_text(row.get("dia_semana") or ""), parse_hora(row.get("hora_inicio")))
+            ocupadas.setdefault(chave, set()).add(sala)
+
+    entries, alteracoes = [], []
+    for posicao, row in enumerate(horarios):
+        dia = row.get("dia_semana") or ""
+        inicio, fim = parse_hora(row.get("hora_inicio")), parse_hora(row.get("hora_fim"))
+        sala = row.get("sala") or ""
+        antes = f"{dia} {format_hora(inicio)}-{format_hora(fim)}"
+        if posicao in novo_slot and novo_slot[posicao] < 0:
+            # Não coube em lugar nenhum: sai da grade e aparece em nao_alocadas
+            alteracoes.append({
+                "horario_id": row.get("id"),
+                "Turma": row.get("turma_codigo"),
+                "Professor": row.get("professor_nome"),
+                "de": antes,
+                "para": None,
+                "Sala": sala,
+            })
+            continue
+        if posicao in novo_slot:
+            destino = problem.slots[novo_slot[posicao]]
+            dia, inicio, fim = problem.config.dias[destino.dia], destino.inicio, destino.fim
+            chave = (normalize_text(dia), inicio)
+            usadas = ocupadas.setdefault(chave, set())
+            if sala in usadas:
+                sala = next((s for s in salas_conhecidas if s not in usadas), "")
+            if sala:
+                usadas.add(sala)
+            alteracoes.append({
+                "horario_id": row.get("id"),
+                "Turma": row.get("turma_codigo"),
+                "Professor": row.get("professor_nome"),
+                "de": antes,
+                "para": f"{dia} {destino.horario}",
+                "Sala": sala,
+            })
+        entries.append({
+            "Dia": dia,
+            "Horário": f"{format_hora(inicio)}-{format_hora(fim)}",
+            "Professor": row.get("professor_nome"),
+            "Turma": row.get("turma_codigo"),
+            "Disciplina": row.get("disciplina_nome"),
+            "Sala": sala,
+            "professor_id": row.get("professor_id"),
+            "turma_id": row.get("turma_id"),
+            "horario_id": row.get("id"),
+        })
+    return entries, alteracoes
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from app.services.text_utils import normalize_text, parse_hora
+
+# Valores que a IA grava quando o campo não foi informado no feedback
+_NAO_INFORMADO = {"", "nao especificado", "nao especificada", "nenhum", "nenhuma"}
+
+# Dias reconhecidos nas condições (normalizados), com e sem "-feira"
+DIAS_VALIDOS = {
+    "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo",
+    "segunda-feira", "terca-feira", "quarta-feira", "quinta-feira", "sexta-feira",
+}
+
+# Máscaras guardadas por regra (uma por grade de dias e horários)
+MAX_MASCARAS_POR_REGRA = 8
+
+
+def _vazio(valor) -> bool:
+    if valor is None:
+        return True
+    if isinstance(valor, (list, tuple, set, dict)):
+        return len(valor) == 0
+    return normalize_text(str(valor)) in _NAO_INFORMADO
+
+
+def _dias(valor, campo: str, erros: List[str]) -> Optional[FrozenSet[str]]:
+    if _vazio(valor):
+        return None
+    if isinstance(valor, str):
+        valor = valor.replace(";", ",").split(",")
+    if not isinstance(valor, (list, tuple, set)):
+        erros.append(f"{campo} deve ser uma lista de dias")
+        return None
+    dias = {normalize_text(str(d)) for d in valor if not _vazio(d)}
+    desconhecidos = sorted(d for d in dias if d not in DIAS_VALIDOS)
+    if desconhecidos:
+        erros.append(f"{campo} com dia(s) desconhecido(s): {', '.join(desconhecidos)}")
+    return frozenset(d.split("-")[0] for d in dias)
+
+
+def content_hash(regra: Dict[str, Any]) -> str:
+    """Hash do que define o comportamento da regra (tipo e condições)."""
+    conteudo = json.dumps(
+        {"tipo": regra.get("tipo"), "condicoes": regra.get("condicoes")},
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CompiledRule:
+    """
+    Regra com as condições já interpretadas: dias como conjuntos de nomes
+    normalizados e horários em minutos. A máscara de tempos permitidos é
+    calculada uma vez por grade (dias e horários) e reaproveitada.
+    """
+
+    regra_id: Optional[int]
+    content_hash: str
+    preferencia: bool = False
+    professor_id: Optional[int] = None
+    professor: str = ""  # nome normalizado
+    dias_permitidos: Optional[FrozenSet[str]] = None
+    dias_proibidos: Optional[FrozenSet[str]] = None
+    horario_minimo: Optional[int] = None
+    horario_maximo: Optional[int] = None
+    erros: List[str] = field(default_factory=list)
+    _mascaras: Dict[tuple, int] = field(default_factory=dict, repr=False)
+
+    @property
+    def valida(self) -> bool:
+        return not self.erros
+
+    @property
+    def tem_alvo(self) -> bool:
+        return self.professor_id is not None or bool(self.professor)
+
+    def allows(self, dia: str, inicio: int, fim: int) -> bool:
+        """A regra permite uma aula no dia e intervalo (em minutos) informados?"""
+        nome = normalize_text(dia).split("-")[0]
+        if self.dias_permitidos is not None and nome not in self.dias_permitidos:
+            return False
+        if self.dias_proibidos is not None and nome in self.dias_proibidos:
+            return False
+        if self.horario_minimo is not None and inicio < self.horario_minimo:
+            return False
+        if self.horario_maximo is not None and fim > self.horario_maximo:
+            return False
+        return True
+
+    def mask(self, problem) -> int:
+        """Bitmask dos tempos do problema que a regra permite."""
+        chave = (tuple(problem.config.dias), tuple(problem.config.horarios))
+        mascara = self._mascaras.get(chave)
+        if mascara is None:
+            mascara = 0
+            for slot in problem.slots:
+                if self.allows(problem.config.dias[slot.dia], slot.inicio, slot.fim):
+                    mascara |= 1 << slot.indice
+            if len(self._mascaras) >= MAX_MASCARAS_POR_REGRA:
+                self._mascaras.clear()
+            self._mascaras[chave] = mascara
+        return mascara
+
+
+def compile_rule(regra: Dict[str, Any], hash_: Optional[str] = None) -> CompiledRule:
+    """
+    Interpreta as condições de uma regra (dias_permitidos, dias_proibidos,
+    horario_minimo, horario_maximo, professor ou professor_id). Problemas
+    ficam em `erros`: uma regra com erros não é aplicada.
+    """
+    compilada = CompiledRule(
+        regra_id=regra.get("id"),
+        content_hash=hash_ or content_hash(regra),
+        preferencia=normalize_text(regra.get("tipo") or "").startswith("prefer"),
+    )
+    condicoes = regra.get("condicoes")
+    if not isinstance(condicoes, dict):
+        compilada.erros.append("condicoes deve ser um objeto")
+        return compilada
+
+    professor_id = condicoes.get("professor_id")
+    if professor_id is not None:
+        try:
+            compilada.professor_id = int(professor_id)
+        except (TypeError, ValueError):
+            compilada.erros.append(f"professor_id inválido: {professor_id}")
+    compilada.professor = normalize_text(condicoes.get("professor") or "")
+
+    compilada.dias_permitidos = _dias(condicoes.get("dias_permitidos"), "dias_permitidos", compilada.erros)
+    compilada.dias_proibidos = _dias(condicoes.get("dias_proibidos"), "dias_proibidos", compilada.erros)
+    for chave in ("horario_minimo", "horario_maximo"):
+        valor = condicoes.get(chave)
+        if _vazio(valor):
+            continue
+        minutos = parse_hora(valor)
+        if minutos is None:
+            compilada.erros.append(f"{chave} inválido: {valor}")
+        else:
+            setattr(compilada, chave, minutos)
+    if (compilada.horario_minimo is not None and compilada.horario_maximo is not None
+            and compilada.horario_minimo >= compilada.horario_maximo):
+        compilada.erros.append("horario_minimo deve ser anterior a horario_maximo")
+    return compilada
+
+
+def validate_rule(tipo: Optional[str], condicoes: Any) -> List[str]:
+    """Erros que impedem a regra de ser compilada (lista vazia se válida)."""
+    return compile_rule({"tipo": tipo, "condicoes": condicoes}).erros
+
+
+class RuleCompiler:
+    """
+    Cache de regras compiladas por id e hash do conteúdo: uma regra só é
+    interpretada de novo quando muda. update_regra e delete_regra chamam
+    invalidate(); mesmo sem isso, um hash diferente força a recompilação.
+    """
+
+    def __init__(self):
+        self._regras: Dict[int, CompiledRule] = {}
+        self._lock = threading.Lock()
+        self.compilacoes = 0
+        self.reaproveitadas = 0
+
+    def compile(self, regra: Dict[str, Any]) -> CompiledRule:
+        regra_id = regra.get("id")
+        hash_ = content_hash(regra)
+        if regra_id is not None:
+            with self._lock:
+                compilada = self._regras.get(regra_id)
+                if compilada is not None and compilada.content_hash == hash_:
+                    self.reaproveitadas += 1
+                    return compilada
+        compilada = compile_rule(regra, hash_)
+        with self._lock:
+            self.compilacoes += 1
+            if regra_id is not None:
+                self._regras[regra_id] = compilada
+        return compilada
+
+    def compile_all(self, regras: List[Dict[str, Any]]) -> Tuple[List[CompiledRule], List[str]]:
+        """Regras aplicáveis, na ordem de id, e avisos das que foram descartadas."""
+        validas, avisos = [], []
+        for regra in sorted(regras, key=lambda r: r.get("id") or 0):
+            compilada = self.compile(regra)
+            if not compilada.valida:
+                avisos.append(f"Regra {regra.get('id')} ignorada: {'; '.join(compilada.erros)}")
+            elif compilada.tem_alvo:
+                validas.append(compilada)
+        return validas, avisos
+
+    def invalidate(self, regra_id: Optional[int] = None):
+        with self._lock:
+            if regra_id is None:
+                self._regras.clear()
+            else:
+                self._regras.pop(regra_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            invalidas = [r.regra_id for r in self._regras.values() if not r.valida]
+            return {
+                "regras_compiladas": len(self._regras),
+                "invalidas": sorted(invalidas),
+                "compilacoes": self.compilacoes,
+                "reaproveitadas": self.reaproveitadas,
+            }
+
+
+# Instância singleton do compilador de regras
+rule_compiler = RuleCompiler()
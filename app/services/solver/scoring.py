@@ -0,0 +1,253 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.services.solver.engine import PESO_EXCESSO, PESO_JANELA, PESO_PREFERENCIA, PESO_RIGIDO
+from app.services.solver.model import Problem
+from app.services.text_utils import normalize_text, parse_hora
+
+try:
+    import numpy as np
+except ImportError:  # Dependência opcional, só exigida pela pontuação
+    np = None
+
+# Aula do professor acima da média diária dele (arredondada para cima)
+PESO_DESEQUILIBRIO = 1
+
+COMPONENTES_RIGIDOS = [
+    "conflitos_professor", "conflitos_turma", "conflitos_sala",
+    "violacoes_regras", "professor_inapto", "aulas_faltantes",
+]
+COMPONENTES_FLEXIVEIS = {
+    "janelas": PESO_JANELA,
+    "excesso_diario_turma": PESO_EXCESSO,
+    "desequilibrio_professor": PESO_DESEQUILIBRIO,
+    "fora_da_preferencia": PESO_PREFERENCIA,
+}
+
+
+def _bits(mascara: int, tamanho: int) -> "np.ndarray":
+    return np.array([(mascara >> i) & 1 for i in range(tamanho)], dtype=bool)
+
+
+@dataclass
+class EncodedSchedule:
+    """
+    Grade convertida em índices do problema: uma posição por aula (ou por
+    tempo da grade, se a aula ocupar mais de um).
+    """
+
+    turma: "np.ndarray"
+    professor: "np.ndarray"
+    slot: "np.ndarray"
+    sala: "np.ndarray"  # -1 quando a aula não tem sala
+    salas: List[str] = field(default_factory=list)
+    # Entradas que não puderam ser convertidas (professor, turma ou horário desconhecido)
+    ignoradas: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class ScheduleScorer:
+    """
+    Pontuação vetorizada de grades sobre arrays (entidade, dia, tempo).
+
+    Construído uma vez por Problem (máscaras de regras e preferências, aptidão
+    de professores e aulas exigidas viram arrays); evaluate() calcula todos
+    os componentes de um lote de grades com poucas contagens (bincount) e
+    reduções do NumPy, sem laço em Python por aula, então pode ser chamado
+    milhares de vezes por segundo por um otimizador.
+
+    Os pesos dos componentes flexíveis são os do motor, mais o desequilíbrio
+    diário dos professores; o componente rígido conta choques, aulas em
+    horários proibidos por regras, professores não habilitados e aulas
+    faltantes em relação à carga horária.
+    """
+
+    def __init__(self, problem: Problem):
+        if np is None:
+            raise RuntimeError("A pontuação de grades exige o pacote numpy instalado")
+        self.problem = problem
+        self.num_dias = problem.num_dias
+        self.slots_por_dia = problem.slots_por_dia
+        self.num_slots = len(problem.slots)
+        self.num_professores = len(problem.professores)
+        self.num_turmas = len(problem.turmas)
+
+        formato = (self.num_professores, self.num_dias, self.slots_por_dia)
+        self.permitidos = np.array(
+            [_bits(m, self.num_slots) for m in problem.permitidos], dtype=bool
+        ).reshape(formato)
+        self.preferidos = np.array(
+            [_bits(m, self.num_slots) for m in problem.preferidos], dtype=bool
+        ).reshape(formato)
+        self.apto = np.zeros((self.num_turmas, self.num_professores), dtype=bool)
+        for t, turma in enumerate(problem.turmas):
+            self.apto[t, turma.candidatos] = True
+        self.aulas_exigidas = np.array([t.aulas for t in problem.turmas], dtype=np.int64)
+        self.limite_diario = -(-self.aulas_exigidas // max(1, self.num_dias))
+
+        self._indice_turma = {t.id: i for i, t in enumerate(problem.turmas)}
+        self._turma_por_codigo = {normalize_text(t.codigo): i for i, t in enumerate(problem.turmas)}
+        self._indice_professor = {p.id: i for i, p in enumerate(problem.professores)}
+        self._professor_por_nome: Dict[str, int] = {}
+        for i, p in enumerate(problem.professores):
+            self._professor_por_nome.setdefault(normalize_text(p.nome), i)
+
+    # ------------------------------------------------------------------
+    # Codificação
+    # ------------------------------------------------------------------
+    def encode(self, rows: List[Dict[str, Any]]) -> EncodedSchedule:
+        """
+        Converte linhas de horário (campos de Horario: dia_semana,
+        hora_inicio, hora_fim, sala, professor_id, turma_id) ou entradas no
+        formato de /grade/save (Dia, Horário, Professor, Turma, Sala) em
+        arrays de índices.
+        """
+        turmas, professores, slots, salas_aula = [], [], [], []
+        salas: Dict[str, int] = {}
+        ignoradas = []
+        for row in rows:
+            if "Dia" in row or "Horário" in row:
+                partes = str(row.get("Horário") or "").split("-")
+                inicio, fim = (parse_hora(partes[0]), parse_hora(partes[1])) if len(partes) == 2 else (None, None)
+                dia, sala = row.get("Dia"), row.get("Sala")
+                t = self._indice_turma.get(row.get("turma_id"), self._turma_por_codigo.get(normalize_text(row.get("Turma"))))
+                p = self._indice_professor.get(
+                    row.get("professor_id"), self._professor_por_nome.get(normalize_text(row.get("Professor")))
+                )
+            else:
+                inicio, fim = parse_hora(row.get("hora_inicio")), parse_hora(row.get("hora_fim"))
+                dia, sala = row.get("dia_semana"), row.get("sala")
+                t = self._indice_turma.get(row.get("turma_id"))
+                p = self._indice_professor.get(row.get("professor_id"))
+            ocupados = self.problem.slot_de(dia or "", inicio, fim) if inicio is not None and fim is not None else []
+            if t is None or p is None or not ocupados:
+                ignoradas.append(row)
+                continue
+            indice_sala = salas.setdefault(sala, len(salas)) if sala else -1
+            for slot in ocupados:
+                turmas.append(t)
+                professores.append(p)
+                slots.append(slot)
+                salas_aula.append(indice_sala)
+        return EncodedSchedule(
+            turma=np.array(turmas, dtype=np.int64),
+            professor=np.array(professores, dtype=np.int64),
+            slot=np.array(slots, dtype=np.int64),
+            sala=np.array(salas_aula, dtype=np.int64),
+            salas=list(salas),
+            ignoradas=ignoradas,
+        )
+
+    # ------------------------------------------------------------------
+    # Pontuação
+    # ------------------------------------------------------------------
+    def _ocupacao(self, entidade: "np.ndarray", slot: "np.ndarray", quantidade: int) -> "np.ndarray":
+        """Contagem de aulas por (grade do lote, entidade, dia, tempo)."""
+        lote = slot.shape[0]
+        tamanho = lote * quantidade * self.num_slots
+        validas = (slot >= 0) & (entidade >= 0)
+        deslocamento = np.arange(lote, dtype=np.int64)[:, None] * quantidade
+        indices = np.where(validas, (deslocamento + entidade) * self.num_slots + slot, tamanho)
+        contagem = np.bincount(indices.ravel(), minlength=tamanho + 1)[:tamanho]
+        return contagem.reshape(lote, quantidade, self.num_dias, self.slots_por_dia)
+
+    def evaluate(self, turma, professor, slot, sala=None, num_salas: int = 0) -> Dict[str, "np.ndarray"]:
+        """
+        Componentes da pontuação de um lote de grades.
+
+        Args:
+            turma / professor / slot: Índices por aula, com forma (N,) para
+                uma grade ou (B, N) para B grades; slot -1 = aula não alocada
+            sala: Índice da sala por aula (-1 = sem sala), opcional
+            num_salas: Quantidade de salas distintas nos índices
+
+        Returns:
+            Dicionário componente -> array (B,), mais "rigido", "flexivel"
+            e "total"
+        """
+        turma, professor, slot = (np.atleast_2d(np.asarray(a, dtype=np.int64)) for a in (turma, professor, slot))
+        turma, professor, slot = np.broadcast_arrays(turma, professor, slot)
+        lote = slot.shape[0]
+
+        ocup_professor = self._ocupacao(professor, slot, self.num_professores)
+        ocup_turma = self._ocupacao(turma, slot, self.num_turmas)
+        eixos = (1, 2, 3)
+        componentes = {
+            "conflitos_professor": np.clip(ocup_professor - 1, 0, None).sum(axis=eixos),
+            "conflitos_turma": np.clip(ocup_turma - 1, 0, None).sum(axis=eixos),
+            "conflitos_sala": np.zeros(lote, dtype=np.int64),
+            "violacoes_regras": (ocup_professor * ~self.permitidos).sum(axis=eixos),
+        }
+        if sala is not None and num_salas:
+            sala = np.broadcast_to(np.atleast_2d(np.asarray(sala, dtype=np.int64)), slot.shape)
+            ocup_sala = self._ocupacao(sala, slot, num_salas)
+            componentes["conflitos_sala"] = np.clip(ocup_sala - 1, 0, None).sum(axis=eixos)
+
+        alocadas = slot >= 0
+        if self.num_turmas and self.num_professores:
+            inapto = ~self.apto[np.clip(turma, 0, None), np.clip(professor, 0, None)] & alocadas & (turma >= 0) & (professor >= 0)
+            componentes["professor_inapto"] = inapto.sum(axis=1)
+        else:
+            componentes["professor_inapto"] = np.zeros(lote, dtype=np.int64)
+        aulas_por_turma = ocup_turma.sum(axis=(2, 3))
+        componentes["aulas_faltantes"] = np.clip(self.aulas_exigidas - aulas_por_turma, 0, None).sum(axis=1)
+
+        # Janelas: tempos vagos entre a primeira e a última aula de cada dia
+        ocupado = ocup_professor > 0
+        tem_aula = ocupado.any(axis=3)
+        primeira = ocupado.argmax(axis=3)
+        ultima = self.slots_por_dia - 1 - ocupado[..., ::-1].argmax(axis=3)
+        janelas = np.where(tem_aula, ultima - primeira + 1 - ocupado.sum(axis=3), 0)
+        componentes["janelas"] = janelas.sum(axis=(1, 2))
+
+        por_dia_turma = ocup_turma.sum(axis=3)
+        componentes["excesso_diario_turma"] = np.clip(
+            por_dia_turma - self.limite_diario[None, :, None], 0, None
+        ).sum(axis=(1, 2))
+        por_dia_professor = ocup_professor.sum(axis=3)
+        media_professor = -(-por_dia_professor.sum(axis=2) // max(1, self.num_dias))
+        componentes["desequilibrio_professor"] = np.clip(
+            por_dia_professor - media_professor[:, :, None], 0, None
+        ).sum(axis=(1, 2))
+        componentes["fora_da_preferencia"] = (ocup_professor * ~self.preferidos).sum(axis=eixos)
+
+        rigido = sum(componentes[c] for c in COMPONENTES_RIGIDOS)
+        flexivel = sum(componentes[c] * peso for c, peso in COMPONENTES_FLEXIVEIS.items())
+        componentes.update(rigido=rigido, flexivel=flexivel, total=rigido * PESO_RIGIDO + flexivel)
+        return componentes
+
+    def score(self, codificada: EncodedSchedule) -> Dict[str, Any]:
+        """Pontuação detalhada de uma grade já codificada (ver encode)."""
+        componentes = self.evaluate(
+            codificada.turma, codificada.professor, codificada.slot,
+            sala=codificada.sala, num_salas=len(codificada.salas),
+        )
+        resultado = {nome: int(valor[0]) for nome, valor in componentes.items()}
+        resultado["rigido"] += len(codificada.ignoradas)
+
+        # Carga horária não atendida, por disciplina
+        contagem = np.bincount(codificada.turma, minlength=self.num_turmas) if self.num_turmas else np.zeros(0, dtype=np.int64)
+        faltantes: Dict[int, Dict[str, Any]] = {}
+        for t in np.nonzero(contagem < self.aulas_exigidas)[0]:
+            turma = self.problem.turmas[int(t)]
+            item = faltantes.setdefault(turma.disciplina_id, {
+                "disciplina_id": turma.disciplina_id,
+                "disciplina": turma.disciplina_nome,
+                "aulas_faltantes": 0,
+                "turmas": [],
+            })
+            item["aulas_faltantes"] += int(self.aulas_exigidas[t] - contagem[t])
+            item["turmas"].append(turma.codigo)
+
+        return {
+            "score": {
+                "rigido": resultado["rigido"],
+                "flexivel": resultado["flexivel"],
+                "total": resultado["rigido"] * PESO_RIGIDO + resultado["flexivel"],
+            },
+            "rigidas": {c: resultado[c] for c in COMPONENTES_RIGIDOS},
+            "flexiveis": {c: resultado[c] for c in COMPONENTES_FLEXIVEIS},
+            "pesos": {"rigido": PESO_RIGIDO, **COMPONENTES_FLEXIVEIS},
+            "carga_faltante": sorted(faltantes.values(), key=lambda f: f["disciplina_id"]),
+            "entradas_ignoradas": len(codificada.ignoradas),
+            "aulas": int(codificada.slot.shape[0]),
+        }
@@ -0,0 +1,42 @@
+import re
+import unicodedata
+from typing import Optional
+
+
+def normalize_text(texto: str) -> str:
+    """
+    Normaliza um texto para comparação: remove acentos, ignora caixa e
+    colapsa espaços em branco.
+    """
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+_HORA_RE = re.compile(r"^\s*(\d{1,2})\s*(?:[:h]\s*(\d{2})?)?\s*$", re.IGNORECASE)
+
+
+def parse_hora(valor) -> Optional[int]:
+    """
+    Converte um horário ("18:00", "18h", "18h30", datetime.time) em minutos
+    desde a meia-noite. Retorna None se o valor não puder ser interpretado.
+    """
+    if valor is None:
+        return None
+    if hasattr(valor, "hour") and hasattr(valor, "minute"):
+        return valor.hour * 60 + valor.minute
+    match = _HORA_RE.match(str(valor))
+    if not match:
+        return None
+    horas = int(match.group(1))
+    minutos = int(match.group(2) or 0)
+    if horas > 24 or minutos > 59 or (horas == 24 and minutos):
+        return None
+    return horas * 60 + minutos
+
+
+def format_hora(minutos: int) -> str:
+    """Formata minutos desde a meia-noite como "HH:MM"."""
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
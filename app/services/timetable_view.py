@@ -0,0 +1,103 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.services.solver import DIAS_PADRAO
+from app.services.text_utils import format_hora, normalize_text, parse_hora
+
+
+def _aula(horario: Horario) -> Dict[str, Any]:
+    """Uma aula com professor, turma e disciplina já resolvidos."""
+    turma = horario.turma
+    disciplina = turma.disciplina
+    return {
+        "id": horario.id,
+        "dia_semana": horario.dia_semana,
+        "hora_inicio": format_hora(parse_hora(horario.hora_inicio)),
+        "hora_fim": format_hora(parse_hora(horario.hora_fim)),
+        "sala": horario.sala,
+        "professor": {"id": horario.professor.id, "nome": horario.professor.nome},
+        "turma": {"id": turma.id, "codigo": turma.codigo, "periodo": turma.periodo},
+        "disciplina": {"id": disciplina.id, "codigo": disciplina.codigo, "nome": disciplina.nome},
+    }
+
+
+def load_aulas(db: Session, professor_id: Optional[int] = None, turma_id: Optional[int] = None,
+               sala: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Aulas filtradas, com professor, turma e disciplina numa única consulta.
+
+    Horario.professor, Horario.turma e Turma.disciplina são muitos-para-um
+    com chave obrigatória, então vêm por INNER JOIN (joinedload) na mesma
+    consulta, em vez de uma consulta por linha ao acessar cada relação.
+    """
+    consulta = db.query(Horario).options(
+        joinedload(Horario.professor, innerjoin=True),
+        joinedload(Horario.turma, innerjoin=True).joinedload(Turma.disciplina, innerjoin=True),
+    )
+    if professor_id is not None:
+        consulta = consulta.filter(Horario.professor_id == professor_id)
+    if turma_id is not None:
+        consulta = consulta.filter(Horario.turma_id == turma_id)
+    if sala is not None:
+        consulta = consulta.filter(Horario.sala == sala)
+    return [_aula(h) for h in consulta.order_by(Horario.hora_inicio, Horario.id)]
+
+
+def build_weekly_grid(aulas: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Organiza as aulas numa grade semanal: dias (os padrão mais os que
+    aparecerem), faixas de horário ordenadas e, para cada dia e faixa, as
+    aulas correspondentes.
+    """
+    aulas = list(aulas)
+    dias = list(DIAS_PADRAO)
+    conhecidos = {normalize_text(d): d for d in dias}
+    faixas = set()
+    for aula in aulas:
+        chave = normalize_text(aula["dia_semana"])
+        if chave not in conhecidos:
+            conhecidos[chave] = aula["dia_semana"]
+            dias.append(aula["dia_semana"])
+        faixas.add((aula["hora_inicio"], aula["hora_fim"]))
+
+    horarios = [f"{inicio}-{fim}" for inicio, fim in sorted(faixas)]
+    grade: Dict[str, Dict[str, List[Dict[str, Any]]]] = {dia: {} for dia in dias}
+    for aula in aulas:
+        dia = conhecidos[normalize_text(aula["dia_semana"])]
+        faixa = f"{aula['hora_inicio']}-{aula['hora_fim']}"
+        grade[dia].setdefault(faixa, []).append(aula)
+    return {"dias": dias, "horarios": horarios, "grade": grade, "total_aulas": len(aulas)}
+
+
+def weekly_view(db: Session, professor_id: Optional[int] = None, turma_id: Optional[int] = None,
+                sala: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Grade semanal de um professor, de uma turma ou de uma sala.
+
+    Custa uma consulta; quando não há aulas, mais uma para distinguir um
+    professor ou turma sem aulas de um inexistente (retorna None).
+    """
+    aulas = load_aulas(db, professor_id=professor_id, turma_id=turma_id, sala=sala)
+    if professor_id is not None:
+        if aulas:
+            filtro = {"professor": aulas[0]["professor"]}
+        else:
+            professor = db.query(Professor.id, Professor.nome).filter(Professor.id == professor_id).first()
+            if professor is None:
+                return None
+            filtro = {"professor": {"id": professor.id, "nome": professor.nome}}
+    elif turma_id is not None:
+        if aulas:
+            filtro = {"turma": aulas[0]["turma"], "disciplina": aulas[0]["disciplina"]}
+        else:
+            turma = db.query(Turma.id, Turma.codigo, Turma.periodo).filter(Turma.id == turma_id).first()
+            if turma is None:
+                return None
+            filtro = {"turma": {"id": turma.id, "codigo": turma.codigo, "periodo": turma.periodo}}
+    else:
+        filtro = {"sala": sala}
+    return {"filtro": filtro, **build_weekly_grid(aulas)}
@@ -0,0 +1,213 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, null, select, update
+from sqlalchemy.orm import Session
+
+from app.models.database import engine
+from app.models.disciplina import Disciplina
+from app.models.grade_semanal import GradeSemanal
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.tabela_versao import TabelaVersao, bump_versions, get_version
+from app.models.turma import Turma
+from app.services.timetable_view import weekly_view
+
+# Linha de tabela_versoes com a geração das grades: incrementá-la invalida
+# todas de uma vez
+_GERACAO = GradeSemanal.__tablename__
+
+# Atributos de cada entidade exibidos nas grades: mudar outros atributos
+# não invalida nenhuma grade
+_ENTIDADES = {
+    Professor: ("nome",),
+    Turma: ("codigo", "periodo", "disciplina_id"),
+    Disciplina: ("codigo", "nome"),
+}
+
+Chave = Tuple[str, int]
+
+
+def _tabela():
+    return GradeSemanal.__table__
+
+
+def _upsert(conexao):
+    dialeto = conexao.dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(_tabela())
+    if dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(_tabela())
+    return None
+
+
+class WeeklyGridStore:
+    """
+    Grades semanais materializadas por professor e por turma, na tabela
+    grades_semanais, no mesmo formato de /grade/view.
+
+    Escritas não recalculam grades: no flush, a transação do escritor só
+    invalida as chaves afetadas (dados = NULL, versao + 1), o que trava
+    essas linhas até o commit. Mudanças que atingem grades demais para
+    listar (escritas em massa, nomes de professores, turmas e disciplinas)
+    incrementam a geração global em tabela_versoes.
+
+    A leitura é uma busca pela chave (tipo, id); uma grade ausente,
+    invalidada ou de geração antiga é montada de novo, fora da sessão da
+    leitura, e gravada com a versão e a geração lidas antes da montagem: se
+    uma escrita concorrente invalidou a chave nesse meio tempo, a gravação
+    não acontece (ou nasce velha), em vez de sobrescrever a invalidação.
+    """
+
+    def mark(self, session: Session, chaves: Iterable[Chave]):
+        """Invalida as grades das chaves, na transação da sessão."""
+        chaves = sorted({c for c in chaves if c[1] is not None})
+        if not chaves:
+            return
+        conexao = session.connection()
+        comando = _upsert(conexao)
+        if comando is not None:
+            comando = comando.on_conflict_do_update(
+                index_elements=["tipo", "entidade_id"],
+                set_={"dados": null(), "versao": _tabela().c.versao + 1},
+            )
+            conexao.execute(comando, [
+                {"tipo": tipo, "entidade_id": i, "dados": None, "versao": 1, "geracao": 0,
+                 "atualizado_em": datetime.utcnow()}
+                for tipo, i in chaves
+            ])
+            return
+        # Outros bancos: UPDATE e, se a linha ainda não existe, INSERT
+        for tipo, entidade_id in chaves:
+            resultado = conexao.execute(
+                update(_tabela())
+                .where(_tabela().c.tipo == tipo, _tabela().c.entidade_id == entidade_id)
+                .values(dados=null(), versao=_tabela().c.versao + 1)
+            )
+            if resultado.rowcount == 0:
+                conexao.execute(_tabela().insert().values(
+                    tipo=tipo, entidade_id=entidade_id, dados=None, versao=1, geracao=0,
+                    atualizado_em=datetime.utcnow(),
+                ))
+
+    def mark_all(self, session: Session):
+        """Invalida todas as grades (ex: grade substituída por inteiro)."""
+        bump_versions(session, [_GERACAO])
+
+    def get(self, db: Session, tipo: str, entidade_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Grade semanal de um professor ou turma (None se a entidade não
+        existe). Monta e grava a grade se ela não estiver em dia.
+        """
+        geracao_atual = (
+            select(TabelaVersao.versao).where(TabelaVersao.tabela == _GERACAO).scalar_subquery()
+        )
+        linha = db.execute(
+            select(GradeSemanal.dados, GradeSemanal.versao, GradeSemanal.geracao, geracao_atual)
+            .where(GradeSemanal.tipo == tipo, GradeSemanal.entidade_id == entidade_id)
+        ).first()
+        if linha is not None:
+            dados, versao, geracao, atual = linha
+            atual = atual or 0
+            if dados is not None and geracao == atual:
+                return dados
+        else:
+            versao, atual = None, get_version(db, _GERACAO)
+
+        # Versão e geração lidas antes das aulas: se mudarem durante a
+        # montagem, a grade montada pode estar velha e não é gravada
+        dados = weekly_view(db, **{f"{tipo}_id": entidade_id})
+        if dados is not None:
+            try:
+                self._gravar(tipo, entidade_id, dados, versao, atual)
+            except Exception as e:
+                print(f"Erro ao materializar grade de {tipo} {entidade_id}: {e}")
+        return dados
+
+    def _gravar(self, tipo: str, entidade_id: int, dados: Dict[str, Any], versao: Optional[int], geracao: int):
+        """
+        Grava a grade montada numa transação própria, sem tocar na sessão da
+        leitura, se a linha ainda está na versão lida. Se a geração mudou
+        nesse meio tempo, a grade gravada já nasce velha e é montada de novo
+        na próxima leitura.
+        """
+        with engine.begin() as conexao:
+            if versao is None:
+                comando = _upsert(conexao)
+                valores = {"tipo": tipo, "entidade_id": entidade_id, "dados": dados, "versao": 0,
+                           "geracao": geracao, "atualizado_em": datetime.utcnow()}
+                if comando is not None:
+                    # Uma invalidação concorrente já criou a linha: fica a dela
+                    conexao.execute(comando.on_conflict_do_nothing(index_elements=["tipo", "entidade_id"]),
+                                    [valores])
+                    return
+                existe = conexao.execute(
+                    select(_tabela().c.versao)
+                    .where(_tabela().c.tipo == tipo, _tabela().c.entidade_id == entidade_id)
+                ).first()
+                if existe is None:
+                    conexao.execute(_tabela().insert(), [valores])
+                return
+            conexao.execute(
+                update(_tabela())
+                .where(
+                    _tabela().c.tipo == tipo,
+                    _tabela().c.entidade_id == entidade_id,
+                    _tabela().c.versao == versao,
+                )
+                .values(dados=dados, geracao=geracao, atualizado_em=datetime.utcnow())
+            )
+
+
+def _chaves_do_horario(obj: Horario) -> Set[Chave]:
+    # Valores atuais e anteriores: a aula sai de uma grade e entra em outra
+    estado = inspect(obj)
+    chaves = set()
+    for atributo, tipo in (("professor_id", "professor"), ("turma_id", "turma")):
+        historico = estado.attrs[atributo].history
+        for valor in list(historico.added) + list(historico.unchanged) + list(historico.deleted):
+            if valor is not None:
+                chaves.add((tipo, valor))
+    return chaves
+
+
+def _entidade_exibida_mudou(session: Session, obj) -> bool:
+    campos = _ENTIDADES.get(type(obj))
+    if campos is None or obj in session.new:
+        return False
+    estado = inspect(obj)
+    return obj in session.deleted or any(estado.attrs[c].history.has_changes() for c in campos)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_flush(session, flush_context):
+    """Invalida, na transação do flush, as grades afetadas pelos objetos gravados."""
+    chaves = set()
+    geral = False
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, Horario):
+            chaves |= _chaves_do_horario(obj)
+        elif _entidade_exibida_mudou(session, obj):
+            geral = True
+    if geral:
+        weekly_grids.mark_all(session)
+    elif chaves:
+        weekly_grids.mark(session, chaves)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidar_bulk(orm_execute_state):
+    """Escritas em massa não dizem quais linhas mudaram: invalida todas as grades."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    if mapper.class_ is Horario or (mapper.class_ in _ENTIDADES and not orm_execute_state.is_insert):
+        weekly_grids.mark_all(orm_execute_state.session)
+
+
+# Instância singleton das grades materializadas
+weekly_grids = WeeklyGridStore()
@@ -1,26 +1,73 @@
+import time
+_inicio_processo = time.perf_counter()
+
+import os
+import threading
 import uvicorn
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from app.models.database import init_db
 from contextlib import asynccontextmanager
 
+# Relatório de tempos da inicialização, exposto em /health/startup
+startup_report = {"routers": []}
+
 # Tentar importar o router da API
+_inicio = time.perf_counter()
 try:
-    from app.api.router import api_router
+    from app.api.router import api_router, router_report
     has_api_router = True
-except ImportError:
-    print("AVISO: Router da API não encontrado ou com erro")
+    startup_report["routers"] = router_report
+except ImportError as e:
+    print(f"AVISO: Router da API não encontrado ou com erro: {e}")
     has_api_router = False
+startup_report["import_routers_segundos"] = round(time.perf_counter() - _inicio, 4)
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+def _aquecer_servicos():
+    """Carrega em segundo plano os clientes de IA, sem atrasar a subida da API."""
+    from app.services.ai_service import ai_service
+    from app.services.rag_service import rag_service
+    aquecimento = {"status": "executando"}
+    startup_report["aquecimento"] = aquecimento
+    inicio = time.perf_counter()
+    for nome, servico in (("ai_service", ai_service), ("rag_service", rag_service)):
+        inicio_servico = time.perf_counter()
+        try:
+            servico.warm_up()
+            aquecimento[f"{nome}_segundos"] = round(time.perf_counter() - inicio_servico, 4)
+        except Exception as e:
+            print(f"Erro ao aquecer {nome}: {e}")
+            aquecimento[f"{nome}_erro"] = str(e)
+    aquecimento["tempo_segundos"] = round(time.perf_counter() - inicio, 4)
+    aquecimento["status"] = "concluido"
+    print(f"Serviços de IA aquecidos em {aquecimento['tempo_segundos']}s")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Aplicação iniciando...")
+    inicio = time.perf_counter()
     init_db()  # Inicializar o banco de dados na inicialização
+    startup_report["init_db_segundos"] = round(time.perf_counter() - inicio, 4)
+    if os.getenv("WARMUP_SERVICES", "true").strip().lower() not in ("0", "false", "nao", "no", "off"):
+        threading.Thread(target=_aquecer_servicos, name="aquecimento", daemon=True).start()
+    startup_report["pronto_em_segundos"] = round(time.perf_counter() - _inicio_processo, 4)
+    erros = [r["router"] for r in startup_report["routers"] if r["status"] != "ok"]
+    print(
+        f"API pronta em {startup_report['pronto_em_segundos']}s "
+        f"(routers: {startup_report['import_routers_segundos']}s, banco: {startup_report['init_db_segundos']}s)"
+        + (f"; routers com erro: {', '.join(erros)}" if erros else "")
+    )
     yield
     print("Aplicação encerrando...")
+    from app.services.jobs import job_queue
+    job_queue.shutdown()
+    from app.services.solver.parallel import solver_pool
+    solver_pool.shutdown()
+    from app.models.database import dispose_async_engines
+    await dispose_async_engines()
 
 # Criar a aplicação FastAPI
 app = FastAPI(
@@ -44,5 +91,10 @@ async def root():
 def health_check():
     return {"status": "ok", "message": "API funcionando corretamente"}
 
+# Tempos de inicialização e routers que falharam ao carregar
+@app.get("/health/startup")
+def startup_check():
+    return startup_report
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,105 @@
+"""
+Compara o caminho padrão de serialização das listagens (objetos ORM
+validados por response_model e codificados pelo FastAPI) com o caminho
+rápido (select() do Core + fast_json).
+
+Uso:
+    python scripts/bench_serialization.py [--linhas 5000] [--repeticoes 20]
+
+Roda num SQLite em memória; defina DATABASE_URI para medir contra outro banco
+(as tabelas de teste são criadas e populadas nele).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import time as hora
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+
+from app.models.database import Base, SessionLocal, engine
+from app.models.disciplina import Disciplina
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.schemas.horario import HorarioResponse
+from app.services import fast_json
+from app.services.fast_json import columns_for, rows_from_select
+
+
+def popular(db, linhas: int):
+    Base.metadata.create_all(engine, tables=[t.__table__ for t in (Professor, Disciplina, Turma, Horario)])
+    db.query(Horario).delete()
+    db.commit()
+    if not db.query(Disciplina).first():
+        db.execute(insert(Disciplina), [{"nome": "Matemática", "codigo": "BENCH-MAT", "carga_horaria": 60}])
+        db.execute(insert(Professor), [{"nome": f"Professor {i}", "email": f"bench{i}@escola"} for i in range(50)])
+        db.execute(insert(Turma), [{"codigo": f"BENCH-T{i}", "periodo": "2024.1", "disciplina_id": 1} for i in range(100)])
+    dias = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+    db.execute(insert(Horario), [
+        {
+            "dia_semana": dias[i % 5], "hora_inicio": hora(7 + i % 10), "hora_fim": hora(8 + i % 10),
+            "sala": f"Sala {i % 30}", "professor_id": 1 + i % 50, "turma_id": 1 + i % 100,
+        }
+        for i in range(linhas)
+    ])
+    db.commit()
+
+
+def caminho_padrao(db, limite: int) -> bytes:
+    """Equivalente ao que o FastAPI faz com response_model=List[HorarioResponse]."""
+    objetos = db.query(Horario).order_by(Horario.id).limit(limite).all()
+    validados = TypeAdapter(List[HorarioResponse]).validate_python(objetos, from_attributes=True)
+    return json.dumps(jsonable_encoder(validados)).encode("utf-8")
+
+
+def caminho_rapido(db, limite: int) -> bytes:
+    consulta = select(*columns_for(Horario, HorarioResponse)).order_by(Horario.id).limit(limite)
+    return fast_json.dumps(rows_from_select(db, consulta))
+
+
+def medir(funcao, db, limite: int, repeticoes: int) -> List[float]:
+    tempos = []
+    for _ in range(repeticoes):
+        db.expunge_all()
+        inicio = time.perf_counter()
+        funcao(db, limite)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        popular(db, args.linhas)
+        # Os dois caminhos precisam produzir o mesmo documento
+        assert json.loads(caminho_padrao(db, args.linhas)) == json.loads(caminho_rapido(db, args.linhas))
+
+        print(f"{args.linhas} horários, {args.repeticoes} repetições "
+              f"(encoder: {'orjson' if fast_json.orjson else 'json'})")
+        resultados = {}
+        for nome, funcao in (("padrão (ORM + Pydantic + json)", caminho_padrao), ("rápido (Core + fast_json)", caminho_rapido)):
+            tempos = medir(funcao, db, args.linhas, args.repeticoes)
+            resultados[nome] = statistics.median(tempos)
+            print(f"  {nome:32s} mediana {statistics.median(tempos):8.2f} ms   mínimo {min(tempos):8.2f} ms")
+        padrao, rapido = resultados.values()
+        print(f"  ganho: {padrao / rapido:.1f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
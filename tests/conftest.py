@@ -0,0 +1,80 @@
+"""
+Configuração comum dos testes: um banco SQLite temporário no lugar do
+PostgreSQL e um TestClient da aplicação. As variáveis de ambiente precisam
+estar definidas antes do primeiro import de app.
+"""
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+_BANCO = os.path.join(tempfile.mkdtemp(prefix="grade-escolar-testes-"), "testes.db")
+os.environ["DATABASE_URI"] = f"sqlite:///{_BANCO}"
+os.environ["DATABASE_READ_URI"] = ""
+os.environ["WARMUP_SERVICES"] = "false"
+os.environ.pop("LLM_CACHE_PATH", None)
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(tipo, compilador, **kw):
+    # O SQLite não tem JSONB; os modelos usam JSONB do PostgreSQL
+    return "JSON"
+
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from app.models.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.tabela_versao import TabelaVersao, bump_versions  # noqa: E402
+from app.services.conflict_index import conflict_index  # noqa: E402
+from app.services.name_matcher import professor_name_index  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture(autouse=True)
+def banco_limpo(client):
+    """
+    Esvazia as tabelas antes de cada teste. As versões das tabelas não voltam
+    a zero (são incrementadas), para que nenhum cache por versão sirva dados
+    de um teste anterior.
+    """
+    tabelas = [t for t in reversed(Base.metadata.sorted_tables) if t.name != TabelaVersao.__tablename__]
+    with engine.begin() as conexao:
+        for tabela in tabelas:
+            conexao.execute(tabela.delete())
+        bump_versions(conexao, [t.name for t in tabelas])
+    conflict_index.clear()
+    professor_name_index.invalidate()
+    yield
+
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+@pytest.fixture
+def consultas():
+    """Lista dos comandos SQL executados enquanto o teste roda."""
+    executados = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        executados.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield executados
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from app.models.disciplina import Disciplina
+from app.models.professor import Professor, professor_disciplina
+from app.models.regra import Regra
+from app.models.turma import Turma
+from app.services import bulk_import
+from app.services.name_matcher import professor_name_index
+
+CSV = {"content-type": "text/csv"}
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+def _ndjson(registros) -> str:
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros)
+
+
+def _importar_disciplinas(client, quantidade: int = 2):
+    corpo = "nome,codigo,carga_horaria\n" + "".join(
+        f"Disciplina {i},D{i},4\n" for i in range(quantidade)
+    )
+    resposta = client.post("/api/disciplinas/import", content=corpo, headers=CSV)
+    assert resposta.status_code == 200, resposta.json()
+
+
+def test_importa_professores_com_disciplinas(client, db):
+    _importar_disciplinas(client)
+    corpo = "nome,email,area,disciplinas\nAna Souza,ana@escola.br,Exatas,D0;D1\nBeto Lima,beto@escola.br,,D1\n"
+
+    resposta = client.post("/api/professores/import", content=corpo, headers=CSV)
+
+    assert resposta.status_code == 200
+    assert resposta.json()["importados"] == 2
+    assert db.query(Professor).count() == 2
+    assert db.query(professor_disciplina).count() == 3
+    # O índice de nomes enxerga os professores importados
+    mencoes = professor_name_index.find_mentions(db, "a professora Ana Souza")
+    assert [nome for m in mencoes for _, nome in m.professores] == ["Ana Souza"]
+
+
+def test_linha_invalida_desfaz_lotes_ja_inseridos(client, db, monkeypatch):
+    # Lotes de 2: as linhas válidas dos primeiros lotes já foram inseridas
+    # quando a última linha falha, e precisam ser desfeitas
+    monkeypatch.setattr(bulk_import, "TAMANHO_LOTE", 2)
+    registros = [{"nome": f"Disciplina {i}", "codigo": f"D{i}", "carga_horaria": 4} for i in range(5)]
+    registros.append({"nome": "Sem carga", "codigo": "X"})
+
+    resposta = client.post("/api/disciplinas/import", content=_ndjson(registros), headers=NDJSON)
+
+    assert resposta.status_code == 422
+    corpo = resposta.json()
+    assert corpo["success"] is False
+    assert corpo["importados"] == 0
+    assert corpo["total"] == 6
+    assert [e["linha"] for e in corpo["erros"]] == [6]
+    assert db.query(Disciplina).count() == 0
+
+
+def test_referencia_inexistente_desfaz_importacao(client, db):
+    _importar_disciplinas(client, 1)
+    corpo = "codigo,periodo,disciplina_codigo\nT1,2024.1,D0\nT2,2024.1,NAO_EXISTE\nT3,2024.1,D0\n"
+
+    resposta = client.post("/api/turmas/import", content=corpo, headers=CSV)
+
+    assert resposta.status_code == 422
+    erros = resposta.json()["erros"]
+    # Linha 3 do arquivo (o cabeçalho é a linha 1)
+    assert erros == [{"linha": 3, "erros": ["disciplina_codigo: disciplina 'NAO_EXISTE' não encontrada"]}]
+    assert db.query(Turma).count() == 0
+
+
+def test_chave_unica_repetida_no_arquivo_e_no_banco(client, db):
+    _importar_disciplinas(client, 1)
+    corpo = "nome,codigo,carga_horaria\nOutra,D0,2\nNova,N1,2\nRepetida,N1,2\n"
+
+    resposta = client.post("/api/disciplinas/import", content=corpo, headers=CSV)
+
+    assert resposta.status_code == 422
+    erros = {e["linha"]: e["erros"][0] for e in resposta.json()["erros"]}
+    assert erros == {2: "codigo: 'D0' já cadastrado", 4: "codigo: 'N1' repetido no arquivo"}
+    assert db.query(Disciplina).count() == 1
+
+
+def test_json_invalido_e_regra_nao_interpretavel(client, db):
+    corpo = (
+        '{"nome": "Ok", "tipo": "Restrição", "condicoes": {"professor": "Ana", "dias_permitidos": ["Segunda"]}}\n'
+        '{"nome": "Quebrada"\n'
+        '{"nome": "Dia errado", "tipo": "Restrição", "condicoes": {"professor": "Ana", "dias_permitidos": ["Feriado"]}}\n'
+    )
+
+    resposta = client.post("/api/regras/import", content=corpo, headers=NDJSON)
+
+    assert resposta.status_code == 422
+    linhas = [e["linha"] for e in resposta.json()["erros"]]
+    assert linhas == [2, 3]
+    assert db.query(Regra).count() == 0
+
+
+def test_upload_multipart(client, db):
+    arquivo = _ndjson([{"nome": "Matemática", "codigo": "MAT", "carga_horaria": 4}]).encode("utf-8")
+
+    resposta = client.post(
+        "/api/disciplinas/import",
+        files={"arquivo": ("disciplinas.ndjson", arquivo, "application/octet-stream")},
+    )
+
+    assert resposta.status_code == 200
+    assert db.query(Disciplina.codigo).scalar() == "MAT"
+
+
+@pytest.mark.parametrize("params, arquivos, codigo", [
+    ({"formato": "xml"}, None, 400),
+    (None, {"outro": ("d.csv", b"nome\n", "text/csv")}, 400),
+])
+def test_requisicoes_invalidas(client, params, arquivos, codigo):
+    resposta = client.post("/api/disciplinas/import", params=params, files=arquivos,
+                           content=None if arquivos else b"nome\n")
+    assert resposta.status_code == codigo
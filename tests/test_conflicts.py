@@ -0,0 +1,141 @@
+import datetime
+
+import pytest
+
+from app.models.database import SessionLocal
+from app.models.disciplina import Disciplina
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.services.conflict_index import conflict_index, find_all_conflicts
+
+URL = "/api/horarios/"
+
+
+def _aula(inicio: str, fim: str, dia: str = "Segunda", sala: str = "A", professor_id=1, turma_id=1, id=None):
+    return {"id": id, "dia_semana": dia, "hora_inicio": inicio, "hora_fim": fim,
+            "sala": sala, "professor_id": professor_id, "turma_id": turma_id}
+
+
+@pytest.fixture
+def cadastro(db):
+    """Dois professores e duas turmas; retorna os ids."""
+    disciplina = Disciplina(nome="Matemática", codigo="MAT", carga_horaria=4)
+    db.add(disciplina)
+    db.flush()
+    professores = [Professor(nome=f"Professor {i}", email=f"p{i}@escola.br") for i in range(2)]
+    turmas = [Turma(codigo=f"T{i}", periodo="2024.1", disciplina_id=disciplina.id) for i in range(2)]
+    db.add_all(professores + turmas)
+    db.commit()
+    return {"professores": [p.id for p in professores], "turmas": [t.id for t in turmas]}
+
+
+def _json(cadastro, inicio: str, fim: str, sala: str = "A", professor: int = 0, turma: int = 0):
+    return {"dia_semana": "Segunda", "hora_inicio": inicio, "hora_fim": fim, "sala": sala,
+            "professor_id": cadastro["professores"][professor], "turma_id": cadastro["turmas"][turma]}
+
+
+def test_find_all_conflicts_por_recurso():
+    aulas = [
+        _aula("07:00", "08:00", id=1),
+        # Encosta na primeira: não é choque
+        _aula("08:00", "09:00", id=2),
+        # Mesma sala, outro professor e turma
+        _aula("08:30", "09:30", professor_id=2, turma_id=2, id=3),
+        # Mesmo horário da primeira, mas em outro dia
+        _aula("07:00", "08:00", dia="Terça", id=4),
+    ]
+
+    conflitos = find_all_conflicts(aulas)
+
+    assert [(c["recurso"], c["horarios"]) for c in conflitos] == [("sala", [2, 3])]
+    assert conflitos[0]["intervalos"] == ["08:00-09:00", "08:30-09:30"]
+
+
+def test_find_all_conflicts_sala_normalizada_e_todos_os_pares():
+    aulas = [
+        _aula("07:00", "10:00", sala="Sala 1", id=1),
+        _aula("07:30", "08:00", sala="sala 1", professor_id=2, turma_id=2, id=2),
+        _aula("09:00", "09:30", sala="SALA 1 ", professor_id=3, turma_id=3, id=3),
+    ]
+
+    conflitos = find_all_conflicts(aulas)
+
+    assert sorted(tuple(c["horarios"]) for c in conflitos) == [(1, 2), (1, 3)]
+
+
+def test_check_trava_e_desfaz_com_conflito(db, cadastro):
+    professor, turma = cadastro["professores"][0], cadastro["turmas"][0]
+    db.add(Horario(dia_semana="Segunda", hora_inicio=datetime.time(7), hora_fim=datetime.time(8),
+                   sala="A", professor_id=professor, turma_id=turma))
+    db.commit()
+
+    conflitos = conflict_index.check(db, _aula("07:30", "08:30", sala="B", professor_id=professor, turma_id=0))
+
+    assert [c["recurso"] for c in conflitos] == ["professor"]
+    # A transação foi desfeita; sem conflito, a escrita segue normalmente
+    assert not db.in_transaction()
+    assert conflict_index.check(db, _aula("08:00", "09:00", professor_id=professor, turma_id=turma)) == []
+    db.rollback()
+
+
+def test_check_recarrega_apos_escrita_de_outro_processo(db, cadastro):
+    professor, turma = cadastro["professores"][0], cadastro["turmas"][0]
+    assert conflict_index.check(db, _aula("07:00", "08:00", professor_id=professor, turma_id=turma)) == []
+    db.rollback()
+    versao = conflict_index.versao
+
+    # Escrita que não passa pelo índice deste processo
+    outra = SessionLocal()
+    try:
+        outra.add(Horario(dia_semana="Segunda", hora_inicio=datetime.time(7), hora_fim=datetime.time(8),
+                          sala="A", professor_id=professor, turma_id=turma))
+        outra.commit()
+    finally:
+        outra.close()
+
+    conflitos = conflict_index.check(db, _aula("07:00", "08:00", sala="B", professor_id=professor, turma_id=0))
+
+    assert conflict_index.versao > versao
+    assert [c["recurso"] for c in conflitos] == ["professor"]
+
+
+def test_endpoints_recusam_choques(client, cadastro):
+    primeira = client.post(URL, json=_json(cadastro, "07:00", "08:00"))
+    assert primeira.status_code == 201
+
+    choque = client.post(URL, json=_json(cadastro, "07:30", "08:30", sala="B", turma=1))
+    assert choque.status_code == 409
+    assert [c["recurso"] for c in choque.json()["detail"]["conflitos"]] == ["professor"]
+
+    segunda = client.post(URL, json=_json(cadastro, "08:00", "09:00", professor=1, turma=1))
+    assert segunda.status_code == 201
+    # Mover a segunda aula para a sala e horário da primeira
+    movida = client.put(f"{URL}{segunda.json()['id']}", json={"hora_inicio": "07:00", "hora_fim": "08:00"})
+    assert movida.status_code == 409
+    assert [c["recurso"] for c in movida.json()["detail"]["conflitos"]] == ["sala"]
+
+    # Removida a primeira, o horário fica livre
+    assert client.delete(f"{URL}{primeira.json()['id']}").status_code == 204
+    assert client.put(f"{URL}{segunda.json()['id']}",
+                      json={"hora_inicio": "07:00", "hora_fim": "08:00"}).status_code == 200
+
+
+def test_endpoint_conflicts_varre_a_grade(client, db, cadastro):
+    professor, turma = cadastro["professores"][0], cadastro["turmas"]
+    # Gravadas direto no banco, sem a verificação dos endpoints
+    db.add_all([
+        Horario(dia_semana="Terça", hora_inicio=datetime.time(7), hora_fim=datetime.time(9),
+                sala="A", professor_id=professor, turma_id=turma[0]),
+        Horario(dia_semana="Terça", hora_inicio=datetime.time(8), hora_fim=datetime.time(10),
+                sala="B", professor_id=professor, turma_id=turma[1]),
+    ])
+    db.commit()
+
+    resposta = client.get(f"{URL}conflicts")
+
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["total"] == 1
+    assert corpo["conflitos"][0]["recurso"] == "professor"
+    assert corpo["conflitos"][0]["intervalos"] == ["07:00-09:00", "08:00-10:00"]
@@ -0,0 +1,148 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+
+from app.models.disciplina import Disciplina
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.services import export_service
+from app.services.export_service import _escape_ics, _linha_ics, iter_horarios, stream_ics
+
+URL = "/api/horarios/export"
+
+
+@pytest.fixture
+def grade(db):
+    """Duas turmas de Ana e uma de Beto; a aula de "Feriado" não entra no .ics."""
+    disciplina = Disciplina(nome="Álgebra, Geometria; Cálculo", codigo="MAT", carga_horaria=4)
+    db.add(disciplina)
+    db.flush()
+    ana = Professor(nome="Ana", email="ana@escola.br")
+    beto = Professor(nome="Beto", email="beto@escola.br")
+    turmas = [Turma(codigo=f"T{i}", periodo="2024.1", disciplina_id=disciplina.id) for i in range(2)]
+    db.add_all([ana, beto] + turmas)
+    db.flush()
+    for dia, hora, professor, turma, sala in [
+        ("Segunda", 7, ana, turmas[0], "Sala 1"),
+        ("Terça-feira", 9, ana, turmas[1], None),
+        ("Feriado", 8, ana, turmas[0], "Sala 1"),
+        ("Sexta", 10, beto, turmas[1], "Lab"),
+    ]:
+        db.add(Horario(dia_semana=dia, hora_inicio=datetime.time(hora), hora_fim=datetime.time(hora + 1),
+                       sala=sala, professor_id=professor.id, turma_id=turma.id))
+    db.commit()
+    return {"ana": ana.id, "beto": beto.id, "turmas": [t.id for t in turmas]}
+
+
+def test_iter_horarios_filtra_e_traz_os_nomes(grade):
+    linhas = list(iter_horarios(professor_id=grade["ana"]))
+
+    assert [l["dia_semana"] for l in linhas] == ["Segunda", "Terça-feira", "Feriado"]
+    assert set(linhas[0]) == set(export_service.COLUNAS_EXPORTACAO)
+    assert linhas[0]["professor_nome"] == "Ana"
+    assert linhas[0]["disciplina_codigo"] == "MAT"
+    assert [l["professor_nome"] for l in iter_horarios(turma_id=grade["turmas"][1])] == ["Ana", "Beto"]
+
+
+def test_exporta_ndjson(client, grade):
+    resposta = client.get(URL, params={"professor_id": grade["beto"]})
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    linhas = [json.loads(l) for l in resposta.text.splitlines()]
+    assert len(linhas) == 1
+    assert linhas[0]["hora_inicio"] == "10:00" and linhas[0]["hora_fim"] == "11:00"
+    assert linhas[0]["sala"] == "Lab"
+
+
+def test_exporta_csv(client, grade):
+    resposta = client.get(URL, params={"formato": "CSV"})
+
+    assert resposta.status_code == 200
+    assert resposta.content.startswith(b"\xef\xbb\xbf")
+    linhas = list(csv.DictReader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+    assert len(linhas) == 4
+    assert linhas[0]["disciplina_nome"] == "Álgebra, Geometria; Cálculo"
+    assert linhas[0]["hora_inicio"] == "07:00"
+
+
+def test_formato_invalido(client):
+    assert client.get(URL, params={"formato": "xml"}).status_code == 400
+
+
+@pytest.mark.parametrize("gerar, blocos", [
+    # 4 linhas em lotes de 2
+    (export_service.stream_ndjson, 2),
+    # Cabeçalho sozinho, depois os lotes
+    (export_service.stream_csv, 3),
+])
+def test_streaming_em_lotes(grade, monkeypatch, gerar, blocos):
+    monkeypatch.setattr(export_service, "LINHAS_POR_LOTE", 2)
+
+    partes = list(gerar(iter_horarios()))
+
+    assert len(partes) == blocos
+    texto = b"".join(partes).decode("utf-8-sig")
+    assert len(texto.splitlines()) == 4 + (gerar is export_service.stream_csv)
+
+
+def test_escape_ics():
+    assert _escape_ics("a\\b;c,d\ne") == "a\\\\b\\;c\\,d\\ne"
+    assert _escape_ics(None) == ""
+
+
+def test_linha_ics_dobra_em_75_octetos():
+    assert _linha_ics("SUMMARY:curta") == "SUMMARY:curta\r\n"
+
+    # Caracteres de 2 octetos: a quebra não pode cair no meio de um deles
+    linha = "DESCRIPTION:" + "çã" * 60
+    dobrada = _linha_ics(linha)
+
+    fisicas = dobrada[:-2].split("\r\n")
+    assert len(fisicas) > 1
+    assert all(len(l.encode("utf-8")) <= 75 for l in fisicas)
+    assert all(l.startswith(" ") for l in fisicas[1:])
+    # Desdobrar (remover CRLF + espaço) devolve a linha original
+    assert dobrada[:-2].replace("\r\n ", "") == linha
+
+
+def test_stream_ics(grade):
+    # 2024-01-03 é uma quarta-feira
+    calendario = b"".join(stream_ics(
+        iter_horarios(professor_id=grade["ana"]), "Aulas - Ana",
+        inicio=datetime.date(2024, 1, 3), ate=datetime.date(2024, 6, 30),
+    )).decode("utf-8")
+
+    assert calendario.startswith("BEGIN:VCALENDAR\r\n")
+    assert calendario.endswith("END:VCALENDAR\r\n")
+    desdobrado = calendario.replace("\r\n ", "")
+    eventos = desdobrado.split("BEGIN:VEVENT\r\n")[1:]
+    # A aula de "Feriado" não tem dia da semana
+    assert len(eventos) == 2
+    segunda, terca = eventos
+    assert "DTSTART:20240108T070000\r\n" in segunda
+    assert "DTEND:20240108T080000\r\n" in segunda
+    assert "RRULE:FREQ=WEEKLY;BYDAY=MO;UNTIL=20240630T235959\r\n" in segunda
+    assert "LOCATION:Sala 1\r\n" in segunda
+    assert "SUMMARY:Álgebra\\, Geometria\\; Cálculo (T0)\r\n" in segunda
+    assert "DESCRIPTION:Professor: Ana\\nTurma: T0\r\n" in segunda
+    assert "DTSTART:20240109T090000\r\n" in terca
+    assert "BYDAY=TU" in terca
+    assert "LOCATION" not in terca
+
+
+def test_endpoint_ics(client, grade):
+    resposta = client.get(f"{URL}/ics", params={"turma_id": grade["turmas"][1]})
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/calendar")
+    assert 'filename="turma-' in resposta.headers["content-disposition"]
+    assert "X-WR-CALNAME:Aulas - Turma T1" in resposta.text
+    assert resposta.text.count("BEGIN:VEVENT") == 2
+
+    assert client.get(f"{URL}/ics").status_code == 400
+    assert client.get(f"{URL}/ics", params={"professor_id": 999}).status_code == 404
@@ -0,0 +1,113 @@
+import copy
+import threading
+import time
+
+import pytest
+
+from app.services.jobs import (
+    CANCELADO, CONCLUIDO, EXECUTANDO, FINALIZADOS, PENDENTE,
+    InMemoryJobStore, JobQueue, QueueFullError,
+)
+
+
+class CopiasJobStore(InMemoryJobStore):
+    """Como um store em banco ou Redis: grava e devolve cópias do job."""
+
+    def save(self, job):
+        super().save(copy.deepcopy(job))
+
+    def get(self, job_id):
+        return copy.deepcopy(super().get(job_id))
+
+
+@pytest.fixture
+def fila():
+    fila = JobQueue(store=CopiasJobStore(), max_workers=1, max_pendentes=1)
+    yield fila
+    fila.shutdown()
+
+
+def _esperar(fila, job_id, condicao, limite: float = 5.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        job = fila.get(job_id)
+        if condicao(job):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} não chegou ao estado esperado: {fila.get(job_id)}")
+
+
+def _ate_parar(iniciou: threading.Event):
+    """Job que roda até receber o pedido de parada e devolve a melhor grade."""
+    def executar(contexto):
+        iniciou.set()
+        while not contexto.deve_parar():
+            contexto.reportar({"iteracao": 1})
+            time.sleep(0.01)
+        return {"schedule": ["melhor"]}
+    return executar
+
+
+def test_fila_cheia(fila):
+    iniciou = threading.Event()
+    rodando = fila.submit("generate", _ate_parar(iniciou))
+    assert iniciou.wait(5)
+    aguardando = fila.submit("generate", lambda contexto: {})
+
+    with pytest.raises(QueueFullError):
+        fila.submit("generate", lambda contexto: {})
+
+    assert fila.get(aguardando.id).status == PENDENTE
+    fila.cancel(rodando.id)
+
+
+def test_cancelar_job_pendente(fila):
+    iniciou = threading.Event()
+    chamadas = []
+    rodando = fila.submit("generate", _ate_parar(iniciou))
+    assert iniciou.wait(5)
+    pendente = fila.submit("generate", lambda contexto: chamadas.append(1) or {})
+
+    cancelado = fila.cancel(pendente.id)
+
+    assert cancelado.status == CANCELADO
+    assert fila.get(pendente.id).status == CANCELADO
+    assert fila.get(pendente.id).cancelamento_solicitado is True
+    fila.cancel(rodando.id)
+    _esperar(fila, rodando.id, lambda j: j.status in FINALIZADOS)
+    assert chamadas == []
+
+
+def test_cancelar_job_em_execucao(fila):
+    iniciou = threading.Event()
+    job = fila.submit("generate", _ate_parar(iniciou))
+    assert iniciou.wait(5)
+    assert fila.get(job.id).status == EXECUTANDO
+
+    fila.cancel(job.id)
+
+    # O pedido sobrevive às gravações de progresso feitas pelo worker
+    final = _esperar(fila, job.id, lambda j: j.status in FINALIZADOS)
+    assert final.status == CANCELADO
+    assert final.cancelamento_solicitado is True
+
+
+def test_aceite_antecipado_conclui_com_a_melhor_grade(fila):
+    iniciou = threading.Event()
+    job = fila.submit("generate", _ate_parar(iniciou))
+    assert iniciou.wait(5)
+
+    fila.accept(job.id)
+
+    final = _esperar(fila, job.id, lambda j: j.status in FINALIZADOS)
+    assert final.status == CONCLUIDO
+    assert final.aceite_antecipado is True
+    assert final.resultado == {"schedule": ["melhor"]}
+
+
+def test_aceite_ignora_job_que_nao_esta_em_execucao(fila):
+    job = fila.submit("generate", lambda contexto: {"schedule": []})
+    _esperar(fila, job.id, lambda j: j.status in FINALIZADOS)
+
+    assert fila.accept(job.id).aceite_antecipado is False
+    assert fila.accept("inexistente") is None
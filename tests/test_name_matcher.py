@@ -0,0 +1,36 @@
+from app.models.database import SessionLocal
+from app.models.professor import Professor
+from app.services.name_matcher import professor_name_index
+
+
+def _mencionados(db, texto: str):
+    return [nome for m in professor_name_index.find_mentions(db, texto) for _, nome in m.professores]
+
+
+def test_recarrega_quando_outro_processo_altera_professores(db):
+    db.add(Professor(nome="Ana Souza", email="ana@escola.br"))
+    db.commit()
+    assert _mencionados(db, "a professora Ana e o professor Beto") == ["Ana Souza"]
+
+    # Escrita sem invalidate(), como a de outro worker
+    outra = SessionLocal()
+    try:
+        outra.add(Professor(nome="Beto Lima", email="beto@escola.br"))
+        outra.commit()
+    finally:
+        outra.close()
+
+    assert _mencionados(db, "a professora Ana e o professor Beto") == ["Ana Souza", "Beto Lima"]
+
+
+def test_nome_avulso_compartilhado_so_resolve(db):
+    db.add_all([
+        Professor(nome="Ana Souza", email="ana@escola.br"),
+        Professor(nome="Ana Lima", email="analima@escola.br"),
+    ])
+    db.commit()
+
+    # "Ana" é de dois professores: não vira menção, mas resolve para ambos
+    assert _mencionados(db, "aulas da Ana na segunda") == []
+    assert [nome for _, nome in professor_name_index.resolve(db, "ana")] == ["Ana Souza", "Ana Lima"]
+    assert _mencionados(db, "aulas da Ana Lima na segunda") == ["Ana Lima"]
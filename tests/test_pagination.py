@@ -0,0 +1,100 @@
+import pytest
+
+from app.api.pagination import decode_cursor, encode_cursor
+
+URL = "/api/professores/"
+
+
+def _criar_professores(client, quantidade: int):
+    ids = []
+    for i in range(quantidade):
+        resposta = client.post(URL, json={"nome": f"Professor {i}", "email": f"p{i}@escola.br"})
+        assert resposta.status_code == 201
+        ids.append(resposta.json()["id"])
+    return ids
+
+
+def _percorrer(client, limit: int, **params):
+    """Segue X-Next-Cursor até a última página; retorna os ids e o número de páginas."""
+    ids, paginas, cursor = [], 0, None
+    while True:
+        consulta = {"limit": limit, **params}
+        if cursor:
+            consulta["cursor"] = cursor
+        resposta = client.get(URL, params=consulta)
+        assert resposta.status_code == 200
+        ids += [p["id"] for p in resposta.json()]
+        paginas += 1
+        cursor = resposta.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids, paginas
+        assert 'rel="next"' in resposta.headers["Link"]
+
+
+def test_cursor_ida_e_volta():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+
+@pytest.mark.parametrize("rapido", [False, True])
+def test_cursor_percorre_todos_os_registros_em_ordem(client, rapido):
+    ids = _criar_professores(client, 7)
+
+    vistos, paginas = _percorrer(client, 3, rapido=rapido)
+
+    assert vistos == sorted(ids)
+    assert paginas == 3
+
+
+def test_cursor_nao_repete_registros_apos_remocao(client):
+    ids = _criar_professores(client, 6)
+    primeira = client.get(URL, params={"limit": 3})
+    cursor = primeira.headers["X-Next-Cursor"]
+    # Com offset, remover um item já visto pularia um registro
+    assert client.delete(f"{URL}{ids[0]}").status_code in (200, 204)
+
+    segunda = client.get(URL, params={"limit": 3, "cursor": cursor})
+
+    assert [p["id"] for p in segunda.json()] == ids[3:]
+
+
+def test_cursor_invalido(client):
+    assert client.get(URL, params={"cursor": "nao-e-um-cursor"}).status_code == 400
+
+
+def test_etag_responde_304_sem_consultar_os_registros(client, consultas):
+    _criar_professores(client, 3)
+    resposta = client.get(URL)
+    etag = resposta.headers["ETag"]
+
+    consultas.clear()
+    condicional = client.get(URL, headers={"If-None-Match": etag})
+
+    assert condicional.status_code == 304
+    assert condicional.headers["ETag"] == etag
+    assert condicional.content == b""
+    # Só a leitura da versão da tabela
+    assert len(consultas) == 1
+    assert "tabela_versoes" in consultas[0]
+
+
+def test_etag_muda_quando_a_tabela_muda(client):
+    ids = _criar_professores(client, 2)
+    etag = client.get(URL).headers["ETag"]
+
+    client.put(f"{URL}{ids[0]}", json={"area": "Exatas"})
+    resposta = client.get(URL, headers={"If-None-Match": etag})
+
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+    assert resposta.json()[0]["area"] == "Exatas"
+
+
+def test_etag_depende_da_pagina(client):
+    _criar_professores(client, 4)
+    primeira = client.get(URL, params={"limit": 2})
+    segunda = client.get(URL, params={"limit": 2, "cursor": primeira.headers["X-Next-Cursor"]})
+
+    assert primeira.headers["ETag"] != segunda.headers["ETag"]
+    assert client.get(
+        URL, params={"limit": 2}, headers={"If-None-Match": segunda.headers["ETag"]}
+    ).status_code == 200
@@ -0,0 +1,213 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.models.rag_index import RegraIndexada  # noqa: E402
+from app.models.regra import Regra  # noqa: E402
+from app.services import rag_service as modulo  # noqa: E402
+from app.services.rag_service import NumpyVectorStore, RAGService  # noqa: E402
+
+
+class Erro429(Exception):
+    status_code = 429
+
+
+class FakeEmbeddings:
+    """Embeddings determinísticos (contagem de cada letra do texto), sem rede."""
+
+    def __init__(self, falhas: int = 0, atraso=None):
+        self.falhas = falhas
+        self.atraso = atraso
+        self.lotes = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def vetor(texto: str):
+        contagem = [0.0] * 26
+        for c in texto.lower():
+            if "a" <= c <= "z":
+                contagem[ord(c) - ord("a")] += 1
+        return contagem
+
+    def embed_documents(self, textos):
+        with self._lock:
+            if self.falhas:
+                self.falhas -= 1
+                raise Erro429("Rate limit reached")
+            self.lotes.append(list(textos))
+        if self.atraso is not None:
+            time.sleep(self.atraso(textos))
+        return [self.vetor(t) for t in textos]
+
+    def embed_query(self, texto):
+        return self.vetor(texto)
+
+
+def _servico(monkeypatch, caminho) -> RAGService:
+    monkeypatch.setenv("OPENAI_API_KEY", "teste")
+    monkeypatch.setenv("RAG_BACKEND", "numpy")
+    monkeypatch.setenv("RAG_NUMPY_PATH", str(caminho))
+    servico = RAGService()
+    servico._embeddings = FakeEmbeddings()
+    return servico
+
+
+def _regra(nome: str, descricao: str) -> Regra:
+    return Regra(nome=nome, descricao=descricao, tipo="Restrição",
+                 condicoes={"professor": "Ana", "dias_permitidos": ["Segunda"]})
+
+
+# NumpyVectorStore
+
+def _store(caminho, embeddings=None) -> NumpyVectorStore:
+    return NumpyVectorStore(embeddings or FakeEmbeddings(), str(caminho))
+
+
+def test_store_adiciona_substitui_e_remove(tmp_path):
+    store = _store(tmp_path)
+    store.add_embeddings(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]], ids=["a", "b", "c"])
+
+    store.add_embeddings(["b2"], [[0, 3]], ids=["b"])
+    assert sorted(store._ids) == ["a", "b", "c"]
+    assert store._matriz.shape == (3, 2)
+    assert store._documentos[store._ids.index("b")]["page_content"] == "b2"
+
+    store.delete(ids=["a", "inexistente"])
+    assert sorted(store._ids) == ["b", "c"]
+    assert store._matriz.shape == (2, 2)
+    # Vetores normalizados
+    assert np.allclose(np.linalg.norm(store._matriz, axis=1), 1.0)
+
+
+def test_store_persiste_e_reabre_por_mmap(tmp_path):
+    store = _store(tmp_path)
+    store.add_embeddings(["a", "b"], [[3, 4], [0, 2]], metadatas=[{"id": 1}, {"id": 2}], ids=["a", "b"])
+    store.delete(ids=["b"])
+
+    reaberto = _store(tmp_path)
+
+    assert isinstance(reaberto._matriz, np.memmap)
+    assert reaberto._ids == ["a"]
+    assert reaberto._documentos == [{"page_content": "a", "metadata": {"id": 1}}]
+    assert np.allclose(reaberto._matriz[0], [0.6, 0.8])
+
+
+def test_store_remove_tudo_e_recusa_dimensao_diferente(tmp_path):
+    store = _store(tmp_path)
+    store.add_embeddings(["a"], [[1, 0]], ids=["a"])
+    with pytest.raises(ValueError):
+        store.add_embeddings(["b"], [[1, 0, 0]], ids=["b"])
+
+    store.delete(ids=["a"])
+
+    assert store._ids == [] and store._matriz is None
+    assert _store(tmp_path)._ids == []
+
+
+def test_store_ordena_por_similaridade(tmp_path):
+    pytest.importorskip("langchain")
+    store = _store(tmp_path)
+    textos = ["zzzz", "abab", "aaaa"]
+    store.add_embeddings(textos, [FakeEmbeddings.vetor(t) for t in textos], ids=textos)
+
+    resultados = store.similarity_search_with_score("aaa", k=2)
+
+    assert [doc.page_content for doc, _ in resultados] == ["aaaa", "abab"]
+    distancias = [distancia for _, distancia in resultados]
+    assert distancias[0] == pytest.approx(0.0, abs=1e-6)
+    assert distancias[0] < distancias[1]
+
+
+# embed_documents_batched
+
+def test_lotes_voltam_na_ordem_dos_textos(monkeypatch, tmp_path):
+    servico = _servico(monkeypatch, tmp_path)
+    servico.embed_batch_size, servico.embed_concurrency = 2, 3
+    # O primeiro lote termina por último
+    servico._embeddings = FakeEmbeddings(atraso=lambda textos: 0.1 if len(textos[0]) == 1 else 0)
+    textos = ["a" * (i + 1) for i in range(7)]
+
+    embeddings, estatisticas = servico.embed_documents_batched(textos)
+
+    assert [v[0] for v in embeddings] == [i + 1 for i in range(7)]
+    assert sorted(len(lote) for lote in servico._embeddings.lotes) == [1, 2, 2, 2]
+    assert estatisticas["lotes"] == 4
+    assert estatisticas["documentos_embutidos"] == 7
+    assert estatisticas["novas_tentativas"] == 0
+
+
+def test_backoff_em_limite_de_taxa(monkeypatch, tmp_path):
+    servico = _servico(monkeypatch, tmp_path)
+    servico._embeddings = FakeEmbeddings(falhas=2)
+    esperas = []
+    monkeypatch.setattr(modulo.time, "sleep", esperas.append)
+    monkeypatch.setattr(modulo.random, "random", lambda: 0.5)
+
+    embeddings, estatisticas = servico.embed_documents_batched(["ab", "b"])
+
+    # Espera exponencial: 1s e 2s (jitter fixo em 1x)
+    assert esperas == [1.0, 2.0]
+    assert estatisticas["novas_tentativas"] == 2
+    assert embeddings == [FakeEmbeddings.vetor("ab"), FakeEmbeddings.vetor("b")]
+
+
+def test_desiste_apos_o_limite_de_tentativas(monkeypatch, tmp_path):
+    servico = _servico(monkeypatch, tmp_path)
+    servico.embed_max_retries = 1
+    servico._embeddings = FakeEmbeddings(falhas=2)
+    monkeypatch.setattr(modulo.time, "sleep", lambda segundos: None)
+
+    with pytest.raises(Erro429):
+        servico.embed_documents_batched(["a"])
+
+
+# index_rules
+
+def test_indexacao_incremental(monkeypatch, tmp_path, db):
+    pytest.importorskip("langchain")
+    servico = _servico(monkeypatch, tmp_path / "indice")
+    regras = [_regra(f"Regra {i}", f"Descrição {i}") for i in range(3)]
+    db.add_all(regras)
+    db.commit()
+
+    primeira = servico.index_rules()
+    assert (primeira["adicionadas"], primeira["ignoradas"]) == (3, 0)
+    assert servico.index_rules()["ignoradas"] == 3
+    assert len(servico._embeddings.lotes) == 1
+
+    regras[0].descricao = "Descrição alterada"
+    removida = regras[1].id
+    db.delete(regras[1])
+    db.commit()
+    terceira = servico.index_rules()
+
+    assert (terceira["adicionadas"], terceira["atualizadas"], terceira["removidas"], terceira["ignoradas"]) == (0, 1, 1, 1)
+    manifesto = {e.regra_id: e.vector_ids for e in db.query(RegraIndexada)}
+    assert removida not in manifesto
+    # O vectorstore tem exatamente os trechos do manifesto
+    assert sorted(servico.vectorstore._ids) == sorted(i for ids in manifesto.values() for i in ids)
+    alterada = servico.vectorstore._ids.index(manifesto[regras[0].id][0])
+    assert "Descrição alterada" in servico.vectorstore._documentos[alterada]["page_content"]
+
+
+def test_manifesto_separado_por_indice(monkeypatch, tmp_path, db):
+    pytest.importorskip("langchain")
+    db.add_all([_regra("Regra A", "a"), _regra("Regra B", "b")])
+    db.commit()
+    primeiro = _servico(monkeypatch, tmp_path / "primeiro")
+    assert primeiro.index_rules()["adicionadas"] == 2
+
+    # Outro vectorstore começa com o manifesto vazio e indexa tudo
+    segundo = _servico(monkeypatch, tmp_path / "segundo")
+    assert segundo.indice != primeiro.indice
+    assert segundo.index_rules()["adicionadas"] == 2
+    assert primeiro.index_rules()["ignoradas"] == 2
+
+    por_indice = {}
+    for entrada in db.query(RegraIndexada):
+        por_indice.setdefault(entrada.indice, set()).add(entrada.regra_id)
+    assert len(por_indice) == 2
+    assert all(len(ids) == 2 for ids in por_indice.values())
@@ -0,0 +1,164 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.models.disciplina import Disciplina  # noqa: E402
+from app.models.professor import Professor  # noqa: E402
+from app.models.turma import Turma  # noqa: E402
+from app.services.solver import ScheduleScorer, SolverConfig, build_problem, solve  # noqa: E402
+from app.services.solver.engine import PESO_JANELA, PESO_RIGIDO  # noqa: E402
+
+DIAS = ["Segunda", "Terça"]
+HORARIOS = ["07:00-08:00", "08:00-09:00", "09:00-10:00"]
+
+
+def _dados(regras=None):
+    """Dois professores aptos a uma disciplina cada; turmas T1 (Ana) e T2 (Beto), 2 aulas cada."""
+    return {
+        "courses": [
+            {"id": 1, "nome": "Matemática", "codigo": "MAT", "carga_horaria": 2},
+            {"id": 2, "nome": "História", "codigo": "HIS", "carga_horaria": 2},
+        ],
+        "professors": [
+            {"id": 1, "nome": "Ana", "email": "ana@escola.br", "area": None, "disciplinas": [1]},
+            {"id": 2, "nome": "Beto", "email": "beto@escola.br", "area": None, "disciplinas": [2]},
+        ],
+        "classes": [
+            {"id": 1, "codigo": "T1", "periodo": "2024.1", "disciplina_id": 1},
+            {"id": 2, "codigo": "T2", "periodo": "2024.1", "disciplina_id": 2},
+        ],
+        "rules": regras or [],
+    }
+
+
+def _scorer(regras=None) -> ScheduleScorer:
+    return ScheduleScorer(build_problem(_dados(regras), SolverConfig(dias=DIAS, horarios=HORARIOS)))
+
+
+def _aula(dia, horario, professor, turma, sala=None):
+    return {"Dia": dia, "Horário": horario, "Professor": professor, "Turma": turma, "Sala": sala}
+
+
+GRADE_VALIDA = [
+    _aula("Segunda", "07:00-08:00", "Ana", "T1", "A"),
+    _aula("Terça", "07:00-08:00", "Ana", "T1", "A"),
+    _aula("Segunda", "07:00-08:00", "Beto", "T2", "B"),
+    _aula("Terça", "07:00-08:00", "Beto", "T2", "B"),
+]
+
+
+def _pontuar(scorer, entradas):
+    return scorer.score(scorer.encode(entradas))
+
+
+def test_grade_valida_nao_tem_violacoes():
+    resultado = _pontuar(_scorer(), GRADE_VALIDA)
+
+    assert resultado["score"] == {"rigido": 0, "flexivel": 0, "total": 0}
+    assert resultado["carga_faltante"] == []
+    assert resultado["aulas"] == 4
+
+
+@pytest.mark.parametrize("troca, componente", [
+    # Beto na mesma sala e horário de Ana
+    ({2: _aula("Segunda", "07:00-08:00", "Beto", "T2", "A")}, "conflitos_sala"),
+    # T1 com duas aulas no mesmo horário
+    ({1: _aula("Segunda", "07:00-08:00", "Ana", "T1", "C")}, "conflitos_turma"),
+    # Beto dando aula de Matemática, que não leciona
+    ({1: _aula("Terça", "08:00-09:00", "Beto", "T1", "A")}, "professor_inapto"),
+])
+def test_componentes_rigidos(troca, componente):
+    entradas = [troca.get(i, aula) for i, aula in enumerate(GRADE_VALIDA)]
+
+    resultado = _pontuar(_scorer(), entradas)
+
+    assert resultado["rigidas"][componente] == 1
+    assert resultado["score"]["rigido"] == sum(resultado["rigidas"].values())
+    assert resultado["score"]["total"] == resultado["score"]["rigido"] * PESO_RIGIDO + resultado["score"]["flexivel"]
+
+
+def test_conflito_de_professor():
+    entradas = GRADE_VALIDA + [_aula("Segunda", "07:00-08:00", "Ana", "T2", "C")]
+
+    resultado = _pontuar(_scorer(), entradas)
+    assert resultado["rigidas"]["conflitos_professor"] == 1
+
+
+def test_regra_violada():
+    regras = [{"id": 1, "nome": "r", "descricao": "", "tipo": "Restrição",
+               "condicoes": {"professor": "Ana", "dias_permitidos": ["Segunda"]}}]
+    entradas = GRADE_VALIDA[:1] + [_aula("Segunda", "08:00-09:00", "Ana", "T1", "A")] + GRADE_VALIDA[2:]
+
+    assert _pontuar(_scorer(regras), entradas)["rigidas"]["violacoes_regras"] == 0
+    assert _pontuar(_scorer(regras), GRADE_VALIDA)["rigidas"]["violacoes_regras"] == 1
+
+
+def test_carga_faltante_e_entrada_desconhecida():
+    entradas = GRADE_VALIDA[1:] + [_aula("Segunda", "07:00-08:00", "Ninguém", "T1", "A")]
+
+    resultado = _pontuar(_scorer(), entradas)
+
+    assert resultado["rigidas"]["aulas_faltantes"] == 1
+    assert resultado["entradas_ignoradas"] == 1
+    # A entrada ignorada também conta como violação rígida
+    assert resultado["score"]["rigido"] == 2
+    assert resultado["carga_faltante"] == [
+        {"disciplina_id": 1, "disciplina": "Matemática", "aulas_faltantes": 1, "turmas": ["T1"]}
+    ]
+
+
+def test_janela_do_professor():
+    entradas = [
+        _aula("Segunda", "07:00-08:00", "Ana", "T1", "A"),
+        _aula("Segunda", "09:00-10:00", "Ana", "T1", "A"),
+    ] + GRADE_VALIDA[2:]
+
+    resultado = _pontuar(_scorer(), entradas)
+
+    assert resultado["flexiveis"]["janelas"] == 1
+    assert resultado["score"]["flexivel"] >= PESO_JANELA
+
+
+def test_lote_vetorizado_igual_a_pontuacao_individual():
+    scorer = _scorer()
+    base = scorer.encode(GRADE_VALIDA)
+    rng = random.Random(3)
+    slots = np.array([[rng.randrange(scorer.num_slots) for _ in base.slot] for _ in range(16)])
+
+    lote = scorer.evaluate(base.turma, base.professor, slots, sala=base.sala, num_salas=len(base.salas))
+
+    for i, linha in enumerate(slots):
+        individual = scorer.evaluate(base.turma, base.professor, linha, sala=base.sala, num_salas=len(base.salas))
+        for componente, valores in lote.items():
+            assert valores[i] == individual[componente][0], componente
+
+
+def test_grade_do_solver_pontua_sem_violacoes_rigidas():
+    problema = build_problem(_dados(), SolverConfig(dias=DIAS, horarios=HORARIOS, salas=["A", "B"]))
+    resultado = solve(problema)
+    scorer = ScheduleScorer(problema)
+
+    pontuacao = _pontuar(scorer, resultado.entries)
+
+    assert pontuacao["score"]["rigido"] == resultado.score["rigido"] == 0
+
+
+def test_endpoint_score(client, db):
+    disciplina = Disciplina(nome="Matemática", codigo="MAT", carga_horaria=2)
+    db.add(disciplina)
+    db.flush()
+    professor = Professor(nome="Ana", email="ana@escola.br")
+    professor.disciplinas.append(disciplina)
+    db.add_all([professor, Turma(codigo="T1", periodo="2024.1", disciplina_id=disciplina.id)])
+    db.commit()
+    entradas = [_aula("Segunda", "07:00-08:00", "Ana", "T1", "A"), _aula("Segunda", "07:00-08:00", "Ana", "T1", "B")]
+
+    resposta = client.post("/api/grade/score", json={"entries": entradas})
+
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["origem"] == "entries"
+    assert corpo["rigidas"]["conflitos_professor"] == 1
+    assert corpo["rigidas"]["conflitos_turma"] == 1
@@ -0,0 +1,127 @@
+import random
+import time
+from collections import Counter
+
+from app.services.solver import SolverConfig, build_problem, solve
+from app.services.solver.parallel import SolverPool
+from app.services.text_utils import parse_hora
+
+SALAS = ["A", "B", "C", "D", "E", "F"]
+
+
+def _dados(turmas: int = 60, professores: int = 12, disciplinas: int = 10, seed: int = 1):
+    """
+    Snapshot no formato de GradeService._get_all_data. A última disciplina
+    só pode ser dada pela "Professora Restrita", alvo da única regra.
+    """
+    rng = random.Random(seed)
+    cursos = [
+        {"id": i + 1, "nome": f"Disciplina {i}", "codigo": f"D{i}", "carga_horaria": rng.choice([2, 3, 4])}
+        for i in range(disciplinas)
+    ]
+    restrita = {"id": disciplinas + 1, "nome": "Restrita", "codigo": "R", "carga_horaria": 3}
+    professores = [
+        {"id": i + 1, "nome": f"Professor {i}", "email": f"p{i}@escola.br", "area": None,
+         "disciplinas": rng.sample(range(1, disciplinas + 1), 4)}
+        for i in range(professores)
+    ]
+    professores.append({"id": len(professores) + 1, "nome": "Professora Restrita", "email": "r@escola.br",
+                        "area": None, "disciplinas": [restrita["id"]]})
+    classes = [
+        {"id": i + 1, "codigo": f"T{i}", "periodo": "2024.1", "disciplina_id": rng.randint(1, disciplinas)}
+        for i in range(turmas)
+    ]
+    classes += [
+        {"id": turmas + i + 1, "codigo": f"R{i}", "periodo": "2024.1", "disciplina_id": restrita["id"]}
+        for i in range(2)
+    ]
+    return {
+        "courses": cursos + [restrita],
+        "professors": professores,
+        "classes": classes,
+        "rules": [{
+            "id": 1, "nome": "Regra", "descricao": "", "tipo": "Restrição",
+            "condicoes": {"professor": "Professora Restrita", "dias_permitidos": ["Segunda", "Quarta"],
+                          "horario_maximo": "12:00"},
+        }],
+    }
+
+
+def test_grade_gerada_nao_tem_conflitos():
+    dados = _dados()
+    resultado = solve(build_problem(dados, SolverConfig(salas=SALAS)))
+
+    assert resultado.score["rigido"] == 0
+    assert resultado.nao_alocadas == []
+    for campo in ("Professor", "Turma", "Sala"):
+        ocupacao = Counter((e[campo], e["Dia"], e["Horário"]) for e in resultado.entries)
+        repetidos = [chave for chave, total in ocupacao.items() if total > 1]
+        assert repetidos == [], f"{campo} em duas aulas ao mesmo tempo: {repetidos}"
+
+
+def test_grade_gerada_atende_carga_e_aptidao():
+    dados = _dados()
+    resultado = solve(build_problem(dados, SolverConfig(salas=SALAS)))
+
+    carga = {c["id"]: c["carga_horaria"] for c in dados["courses"]}
+    disciplina_da_turma = {t["id"]: t["disciplina_id"] for t in dados["classes"]}
+    aptos = {p["id"]: set(p["disciplinas"]) for p in dados["professors"]}
+    aulas = Counter(e["turma_id"] for e in resultado.entries)
+    for turma_id, disciplina_id in disciplina_da_turma.items():
+        # carga_horaria é lida como aulas por semana (semanas_letivas = 1)
+        assert aulas[turma_id] == carga[disciplina_id]
+    for entrada in resultado.entries:
+        assert disciplina_da_turma[entrada["turma_id"]] in aptos[entrada["professor_id"]]
+    professores_por_turma = {}
+    for entrada in resultado.entries:
+        professores_por_turma.setdefault(entrada["turma_id"], set()).add(entrada["professor_id"])
+    assert all(len(p) == 1 for p in professores_por_turma.values())
+
+
+def test_grade_gerada_respeita_regras():
+    resultado = solve(build_problem(_dados(), SolverConfig(salas=SALAS)))
+
+    restritas = [e for e in resultado.entries if e["Professor"] == "Professora Restrita"]
+    assert len(restritas) == 6
+    for entrada in restritas:
+        assert entrada["Dia"] in ("Segunda", "Quarta")
+        assert parse_hora(entrada["Horário"].split("-")[1]) <= parse_hora("12:00")
+
+
+def test_mesma_seed_gera_a_mesma_grade():
+    dados = _dados()
+    primeira = solve(build_problem(dados, SolverConfig(salas=SALAS, seed=7)))
+    segunda = solve(build_problem(dados, SolverConfig(salas=SALAS, seed=7)))
+    assert primeira.entries == segunda.entries
+
+
+def test_semanas_letivas_converte_carga_total():
+    dados = _dados(turmas=10)
+    for curso in dados["courses"]:
+        curso["carga_horaria"] *= 20
+    resultado = solve(build_problem(dados, SolverConfig(salas=SALAS, semanas_letivas=20)))
+
+    carga = {c["id"]: c["carga_horaria"] // 20 for c in dados["courses"]}
+    aulas = Counter(e["turma_id"] for e in resultado.entries)
+    for turma in dados["classes"]:
+        assert aulas[turma["id"]] == carga[turma["disciplina_id"]]
+
+
+def test_terminate_encerra_so_o_executor_da_chamada():
+    pool = SolverPool(max_workers=1)
+    try:
+        presa, outra = pool.acquire(), pool.acquire()
+        assert presa is not outra
+        travada = presa.submit(time.sleep, 60)
+        em_andamento = outra.submit(time.sleep, 0.5)
+        while not travada.running():
+            time.sleep(0.05)
+
+        pool.terminate(presa)
+
+        # A tentativa da outra chamada termina normalmente
+        assert em_andamento.result(timeout=30) is None
+        pool.release(outra)
+        assert pool.acquire() is outra
+    finally:
+        pool.shutdown()
@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+
+from app.models.disciplina import Disciplina
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.services.timetable_view import weekly_view
+
+DIAS = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+
+
+def _popular(db, aulas_por_professor: int):
+    """
+    Recria três professores e três turmas, cada professor com o número de
+    aulas pedido. Retorna os filtros (professor_id, turma_id e sala) de uma
+    grade com aulas.
+    """
+    for modelo in (Horario, Turma, Professor, Disciplina):
+        db.query(modelo).delete()
+    disciplinas = [Disciplina(nome=f"Disciplina {i}", codigo=f"D{i}", carga_horaria=4) for i in range(3)]
+    db.add_all(disciplinas)
+    db.flush()
+    professores = [Professor(nome=f"Professor {i}", email=f"p{i}@escola.br") for i in range(3)]
+    turmas = [Turma(codigo=f"T{i}", periodo="2024.1", disciplina_id=d.id) for i, d in enumerate(disciplinas)]
+    db.add_all(professores + turmas)
+    db.flush()
+    for p, professor in enumerate(professores):
+        for i in range(aulas_por_professor):
+            hora = 7 + i // len(DIAS)
+            db.add(Horario(
+                dia_semana=DIAS[i % len(DIAS)],
+                hora_inicio=datetime.time(hora),
+                hora_fim=datetime.time(hora + 1),
+                sala=f"Sala {p}",
+                professor_id=professor.id,
+                turma_id=turmas[(p + i) % len(turmas)].id,
+            ))
+    db.commit()
+    return {"professor_id": professores[0].id, "turma_id": turmas[0].id, "sala": "Sala 0"}
+
+
+@pytest.mark.parametrize("filtro", ["professor_id", "turma_id", "sala"])
+def test_weekly_view_faz_uma_consulta_independente_do_tamanho(db, consultas, filtro):
+    totais = []
+    for aulas in (5, 40):
+        valor = _popular(db, aulas)[filtro]
+        consultas.clear()
+        resultado = weekly_view(db, **{filtro: valor})
+        totais.append(len(consultas))
+        assert resultado["total_aulas"] > 0
+        for faixas in resultado["grade"].values():
+            for aula in (a for lista in faixas.values() for a in lista):
+                # Professor, turma e disciplina vêm na mesma consulta
+                assert aula["professor"]["nome"] and aula["turma"]["codigo"] and aula["disciplina"]["nome"]
+    assert totais == [1, 1]
+
+
+def test_weekly_view_sem_aulas_distingue_entidade_inexistente(db, consultas):
+    db.add(Professor(nome="Sem Aulas", email="sem@escola.br"))
+    db.commit()
+    professor_id = db.query(Professor.id).scalar()
+
+    consultas.clear()
+    resultado = weekly_view(db, professor_id=professor_id)
+    assert len(consultas) == 2
+    assert resultado["total_aulas"] == 0
+    assert resultado["filtro"]["professor"]["nome"] == "Sem Aulas"
+    assert weekly_view(db, professor_id=professor_id + 1) is None
+
+
+@pytest.mark.parametrize("filtro", ["professor_id", "turma_id", "sala"])
+def test_endpoint_view_consultas_constantes(client, db, consultas, filtro):
+    totais = []
+    for aulas in (5, 40):
+        valor = _popular(db, aulas)[filtro]
+        # A primeira leitura pode materializar a grade; conta-se a segunda
+        assert client.get("/api/grade/view", params={filtro: valor}).status_code == 200
+        consultas.clear()
+        resposta = client.get("/api/grade/view", params={filtro: valor})
+        assert resposta.status_code == 200
+        totais.append(len(consultas))
+    assert totais[0] == totais[1]
+    assert totais[1] <= 2
+
+
+def test_endpoint_view_valida_filtro(client):
+    assert client.get("/api/grade/view").status_code == 400
+    assert client.get("/api/grade/view", params={"professor_id": 1, "sala": "A"}).status_code == 400
+    assert client.get("/api/grade/view", params={"professor_id": 999}).status_code == 404
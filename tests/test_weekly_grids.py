@@ -0,0 +1,134 @@
+import datetime
+
+import pytest
+
+from app.models.database import SessionLocal
+from app.models.disciplina import Disciplina
+from app.models.grade_semanal import GradeSemanal
+from app.models.horario import Horario
+from app.models.professor import Professor
+from app.models.turma import Turma
+from app.services import weekly_grids as modulo
+from app.services.weekly_grids import weekly_grids
+
+VIEW = "/api/grade/view"
+
+
+@pytest.fixture
+def cadastro(db):
+    """Um professor com uma aula na turma T0 e uma turma T1 sem aulas; retorna os ids."""
+    disciplina = Disciplina(nome="Matemática", codigo="MAT", carga_horaria=4)
+    db.add(disciplina)
+    db.flush()
+    professor = Professor(nome="Ana", email="ana@escola.br")
+    turmas = [Turma(codigo=f"T{i}", periodo="2024.1", disciplina_id=disciplina.id) for i in range(2)]
+    db.add_all([professor] + turmas)
+    db.flush()
+    aula = Horario(dia_semana="Segunda", hora_inicio=datetime.time(7), hora_fim=datetime.time(8),
+                   sala="A", professor_id=professor.id, turma_id=turmas[0].id)
+    db.add(aula)
+    db.commit()
+    return {"professor": professor.id, "turmas": [t.id for t in turmas], "aula": aula.id}
+
+
+def _total(client, **filtro) -> int:
+    resposta = client.get(VIEW, params=filtro)
+    assert resposta.status_code == 200
+    return resposta.json()["total_aulas"]
+
+
+def _materializada(db, tipo: str, entidade_id: int):
+    db.expire_all()
+    return db.query(GradeSemanal.dados).filter_by(tipo=tipo, entidade_id=entidade_id).scalar()
+
+
+def test_primeira_leitura_materializa_sem_commit_na_sessao(client, db, cadastro):
+    assert _materializada(db, "professor", cadastro["professor"]) is None
+
+    assert _total(client, professor_id=cadastro["professor"]) == 1
+
+    assert _materializada(db, "professor", cadastro["professor"])["total_aulas"] == 1
+
+
+def test_criacao_invalida_as_grades(client, db, cadastro):
+    assert _total(client, professor_id=cadastro["professor"]) == 1
+    assert _total(client, turma_id=cadastro["turmas"][1]) == 0
+
+    resposta = client.post("/api/horarios/", json={
+        "dia_semana": "Terça", "hora_inicio": "07:00", "hora_fim": "08:00", "sala": "A",
+        "professor_id": cadastro["professor"], "turma_id": cadastro["turmas"][1],
+    })
+    assert resposta.status_code == 201
+
+    # A escrita só invalida; a grade volta na próxima leitura
+    assert _materializada(db, "professor", cadastro["professor"]) is None
+    assert _total(client, professor_id=cadastro["professor"]) == 2
+    assert _total(client, turma_id=cadastro["turmas"][1]) == 1
+
+
+def test_atualizacao_move_a_aula_entre_grades(client, cadastro):
+    antiga, nova = cadastro["turmas"]
+    assert (_total(client, turma_id=antiga), _total(client, turma_id=nova)) == (1, 0)
+
+    resposta = client.put(f"/api/horarios/{cadastro['aula']}", json={"turma_id": nova})
+    assert resposta.status_code == 200
+
+    assert (_total(client, turma_id=antiga), _total(client, turma_id=nova)) == (0, 1)
+
+
+def test_remocao_invalida_as_grades(client, cadastro):
+    assert _total(client, professor_id=cadastro["professor"]) == 1
+
+    assert client.delete(f"/api/horarios/{cadastro['aula']}").status_code == 204
+
+    assert _total(client, professor_id=cadastro["professor"]) == 0
+    assert _total(client, turma_id=cadastro["turmas"][0]) == 0
+
+
+def test_escrita_em_massa_invalida_todas(client, db, cadastro):
+    assert _total(client, professor_id=cadastro["professor"]) == 1
+    assert _total(client, turma_id=cadastro["turmas"][0]) == 1
+
+    db.query(Horario).filter(Horario.sala == "A").update({"turma_id": cadastro["turmas"][1]})
+    db.commit()
+
+    assert _total(client, turma_id=cadastro["turmas"][0]) == 0
+    assert _total(client, turma_id=cadastro["turmas"][1]) == 1
+
+
+def test_nome_do_professor_invalida_as_grades_em_que_aparece(client, cadastro):
+    assert _total(client, turma_id=cadastro["turmas"][0]) == 1
+
+    assert client.put(f"/api/professores/{cadastro['professor']}", json={"nome": "Ana Lima"}).status_code == 200
+
+    grade = client.get(VIEW, params={"turma_id": cadastro["turmas"][0]}).json()
+    aulas = [a for faixas in grade["grade"].values() for lista in faixas.values() for a in lista]
+    assert [a["professor"]["nome"] for a in aulas] == ["Ana Lima"]
+
+
+def test_grade_montada_antes_de_escrita_concorrente_nao_e_gravada(client, db, cadastro, monkeypatch):
+    professor = cadastro["professor"]
+    assert _total(client, professor_id=professor) == 1
+    # Invalida a grade para forçar a remontagem
+    assert client.put(f"/api/horarios/{cadastro['aula']}", json={"sala": "B"}).status_code == 200
+    montar = modulo.weekly_view
+
+    def montar_com_escrita_concorrente(sessao, **filtro):
+        dados = montar(sessao, **filtro)
+        # Outra transação grava uma aula depois que as aulas foram lidas
+        outra = SessionLocal()
+        try:
+            outra.add(Horario(dia_semana="Quarta", hora_inicio=datetime.time(9), hora_fim=datetime.time(10),
+                              sala="C", professor_id=professor, turma_id=cadastro["turmas"][1]))
+            outra.commit()
+        finally:
+            outra.close()
+        return dados
+
+    monkeypatch.setattr(modulo, "weekly_view", montar_com_escrita_concorrente)
+    assert weekly_grids.get(db, "professor", professor)["total_aulas"] == 1
+    monkeypatch.setattr(modulo, "weekly_view", montar)
+
+    # A grade velha não sobrescreveu a invalidação da escrita concorrente
+    assert _materializada(db, "professor", professor) is None
+    assert _total(client, professor_id=professor) == 2